@@ -1,103 +1,96 @@
 import os
+import threading
 import time
 import uuid
 import json
-import threading
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 from werkzeug.utils import secure_filename
 
 # Import from your existing transcriber
-import whisper
-from language_utils import SUPPORTED_LANGUAGES, is_language_supported, get_language_name
-from transcriber import transcribe_audio, save_transcription
+from language_utils import SUPPORTED_LANGUAGES, is_language_supported
+from audio_probe import probe_duration
+from job_queue import JobScheduler
+from job_store import CHANGE_POLL_SECONDS, FINISHED_STATUSES, JobStore, JobSweeper, temp_export_base
+from live_transcriber import PCM_FORMAT
+from segment_writers import EXTENSIONS, WRITERS
+from transcript_artifact import export_artifact
+from web_worker import init_worker, process_file, process_live_session
+import metrics
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['RESULT_FOLDER'] = 'results'
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB max upload size
 app.config['ALLOWED_EXTENSIONS'] = {'mp3', 'wav', 'ogg'}
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('TRANSCRIBER_WORKERS', 1))  # Inference worker processes
+app.config['MAX_QUEUE_SIZE'] = int(os.environ.get('TRANSCRIBER_MAX_QUEUE', 20))  # Waiting jobs before HTTP 429
+app.config['JOB_DB'] = os.environ.get('TRANSCRIBER_JOB_DB', 'jobs.sqlite')  # Job records shared by every web process
+app.config['EVENT_KEEPALIVE_SECONDS'] = 15  # Comment sent on idle event streams so proxies keep them open
+app.config['LONG_POLL_MAX_SECONDS'] = 30  # Longest a /status?wait= request is held open
+# Concurrent /live streams; each holds a worker for its whole length, so by default one worker stays free for uploads
+app.config['LIVE_MAX_SESSIONS'] = int(os.environ.get('TRANSCRIBER_LIVE_SESSIONS',
+                                                     max(0, app.config['INFERENCE_WORKERS'] - 1)))
+app.config['LIVE_FORMATS'] = {PCM_FORMAT, 'ogg', 'webm'}  # Raw s16le PCM, or Opus in an Ogg or WebM container
+app.config['LIVE_READ_BYTES'] = 3200  # Request body read per call (100 ms of PCM)
 
 # Create necessary directories
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['RESULT_FOLDER'], exist_ok=True)
 
-# Store job status
-jobs = {}
-
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+# Store job status (persistent, and removed with their files once expired)
+jobs = JobStore(app.config['JOB_DB'])
+sweeper = JobSweeper(jobs, [app.config['UPLOAD_FOLDER'], app.config['RESULT_FOLDER']])
 
-def process_file(job_id, file_path, model_size, language):
-    """Process a single file and update job status"""
-    try:
-        # Update job status
-        jobs[job_id]['status'] = 'processing'
-        jobs[job_id]['progress'] = 0
-        
-        # Create a custom progress callback
-        def progress_callback(stage, progress):
-            jobs[job_id]['stage'] = stage
-            jobs[job_id]['progress'] = progress
+def update_job(job_id, fields):
+    """Apply a status update reported by an inference worker"""
+    job = jobs.get(job_id)
+    if job is not None:
+        metrics.observe_job_update(job, fields)
         
-        # Transcribe the audio
-        result = transcribe_audio_for_web(file_path, model_size, language, progress_callback)
+        # Stamp the transitions the latency metrics are measured between
+        status = fields.get('status')
+        if status == 'processing' and 'started_at' not in job:
+            fields = {**fields, 'started_at': time.time()}
+        elif status in ('completed', 'failed') and 'finished_at' not in job:
+            fields = {**fields, 'finished_at': time.time()}
         
-        # Save the transcription
-        output_file = os.path.join(app.config['RESULT_FOLDER'], f"{job_id}.txt")
-        save_transcription(result, output_file)
-        
-        # Update job status
-        jobs[job_id]['status'] = 'completed'
-        jobs[job_id]['result_file'] = output_file
-        
-        # Add language info if auto-detection was used
-        if language == "auto" and "language" in result:
-            detected_code = result["language"]
-            detected_name = get_language_name(detected_code)
-            jobs[job_id]['detected_language'] = {
-                'code': detected_code,
-                'name': detected_name
-            }
-        
-    except Exception as e:
-        # Update job status with error
-        jobs[job_id]['status'] = 'failed'
-        jobs[job_id]['error'] = str(e)
+        jobs.update(job_id, fields)
 
-def transcribe_audio_for_web(file_path, model_size="base", language=None, progress_callback=None):
-    """Modified version of transcribe_audio for web use with progress callbacks"""
-    # Check if file exists
-    if not os.path.exists(file_path):
-        raise FileNotFoundError(f"Audio file not found: {file_path}")
-    
-    # Load the Whisper model
-    if progress_callback:
-        progress_callback("loading_model", 0)
-    
-    model = whisper.load_model(model_size)
-    
-    if progress_callback:
-        progress_callback("loading_model", 100)
-    
-    # Prepare transcription options
-    transcribe_options = {}
-    
-    # Handle language option
-    if language and language != "auto":
-        transcribe_options["language"] = language
-    
-    # Transcribe the audio
-    if progress_callback:
-        progress_callback("transcribing", 0)
-    
-    # Run transcription
-    result = model.transcribe(file_path, **transcribe_options)
-    
-    if progress_callback:
-        progress_callback("transcribing", 100)
-    
-    return result
+# Jobs are queued here and run by worker processes that keep their models loaded
+scheduler = JobScheduler(
+    process_file,
+    update_job,
+    num_workers=app.config['INFERENCE_WORKERS'],
+    max_queue_size=app.config['MAX_QUEUE_SIZE'],
+    initializer=init_worker,
+    session_handler=process_live_session
+)
+
+# Values read from the scheduler and the processes when /metrics is scraped
+metrics.registry.gauge("transcriber_queue_depth", "Jobs waiting for an inference worker.", scheduler.queue_depth)
+metrics.registry.gauge("transcriber_active_workers", "Inference workers currently running a job or live stream.",
+                       scheduler.active_workers)
+metrics.registry.gauge("transcriber_live_sessions", "Inference workers currently running a live stream.",
+                       scheduler.live_sessions)
+metrics.registry.gauge("transcriber_workers", "Inference worker processes.", lambda: app.config['INFERENCE_WORKERS'])
+metrics.registry.gauge("transcriber_jobs", "Jobs currently stored, by status.",
+                       lambda: {(('status', status),): count for status, count in jobs.count_by_status().items()})
+
+def process_memory():
+    """Resident memory of the web process and of every inference worker"""
+    processes = {(('process', 'web'),): metrics.process_rss_bytes()}
+    for worker_id, pid in scheduler.worker_pids().items():
+        processes[(('process', f'worker-{worker_id}'),)] = metrics.process_rss_bytes(pid)
+    return {labels: rss for labels, rss in processes.items() if rss is not None}
+
+metrics.registry.gauge("transcriber_resident_memory_bytes", "Resident memory per process.", process_memory)
+
+# Live streams hold an inference worker for their whole length, so their number is capped
+live_sessions = threading.BoundedSemaphore(app.config['LIVE_MAX_SESSIONS'])
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 @app.route('/')
 def index():
@@ -133,6 +126,13 @@ def upload_file():
     if language and not is_language_supported(language):
         return jsonify({'error': 'Unsupported language code'}), 400
     
+    # Apply backpressure before accepting the upload
+    scheduler.start()
+    sweeper.start()
+    if scheduler.is_full():
+        metrics.jobs_rejected.inc()
+        return jsonify({'error': 'Server is busy, please try again later'}), 429
+    
     # Generate a unique job ID
     job_id = str(uuid.uuid4())
     
@@ -141,52 +141,202 @@ def upload_file():
     file_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{job_id}_{filename}")
     file.save(file_path)
     
+    # Read the duration from the file headers for progress estimates
+    try:
+        duration = probe_duration(file_path)
+    except Exception:
+        duration = None
+    
     # Create job entry
-    jobs[job_id] = {
+    jobs.create({
         'id': job_id,
         'filename': filename,
         'file_path': file_path,
         'model': model_size,
         'language': language,
+        'duration': duration,
         'status': 'queued',
         'created_at': time.time()
-    }
+    })
     
-    # Start processing in a background thread
-    threading.Thread(
-        target=process_file,
-        args=(job_id, file_path, model_size, language)
-    ).start()
+    # Queue the job for the inference workers
+    payload = {
+        'file_path': os.path.abspath(file_path),
+        'model': model_size,
+        'language': language,
+        'result_folder': os.path.abspath(app.config['RESULT_FOLDER'])
+    }
+    if not scheduler.submit(job_id, payload):
+        jobs.delete([job_id])
+        os.remove(file_path)
+        metrics.jobs_rejected.inc()
+        return jsonify({'error': 'Server is busy, please try again later'}), 429
+    metrics.jobs_submitted.inc()
     
     # Return job ID to client
     return jsonify({
         'job_id': job_id,
-        'status': 'queued'
+        'status': 'queued',
+        'queue_position': scheduler.queue_position(job_id)
     })
 
+def job_view(job):
+    """Job record as sent to the browser"""
+    if job['status'] == 'queued':
+        job['queue_position'] = scheduler.queue_position(job['id'])
+    return job
+
 @app.route('/status/<job_id>')
 def job_status(job_id):
-    if job_id not in jobs:
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # Long-poll fallback for clients without EventSource: with ?wait=N&since=<updated_at>
+    # the request is held until the job changes or N seconds pass
+    wait = min(request.args.get('wait', 0, type=float), app.config['LONG_POLL_MAX_SECONDS'])
+    since = request.args.get('since', type=float)
+    if wait > 0 and since is not None:
+        job = jobs.wait(job_id, since, wait) or job
+    
+    return jsonify(job_view(job))
+
+@app.route('/events/<job_id>')
+def job_events(job_id):
+    """Server-Sent Events stream of a job's status, stage and progress until it finishes"""
+    job = jobs.get(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    return jsonify(jobs[job_id])
+    # A reconnecting browser resumes after the last update it received
+    since = request.headers.get('Last-Event-ID', type=float) or 0.0
+    keepalive = app.config['EVENT_KEEPALIVE_SECONDS']
+    
+    def stream():
+        nonlocal since
+        last_sent = None
+        last_write = time.monotonic()
+        while True:
+            # A queued job's position changes without an update, so re-check it more often
+            timeout = CHANGE_POLL_SECONDS if last_sent and last_sent['status'] == 'queued' else keepalive
+            job = jobs.wait(job_id, since, timeout)
+            if job is None:
+                yield "event: error\ndata: {\"error\": \"Job not found\"}\n\n"
+                return
+            
+            view = job_view(job)
+            if view != last_sent:
+                yield f"id: {job['updated_at']!r}\ndata: {json.dumps(view)}\n\n"
+                last_sent = view
+                last_write = time.monotonic()
+                since = job['updated_at']
+            elif time.monotonic() - last_write >= keepalive:
+                yield ": keepalive\n\n"
+                last_write = time.monotonic()
+            
+            if job['status'] in FINISHED_STATUSES:
+                return
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/live', methods=['POST'])
+def live_transcription():
+    """Transcribe audio streamed in the request body, streaming segments back as NDJSON"""
+    model_size = request.args.get('model', 'base')
+    language = request.args.get('language', None)
+    input_format = request.args.get('format', PCM_FORMAT)
+    
+    if model_size not in ["tiny", "base", "small", "medium", "large"]:
+        return jsonify({'error': 'Invalid model size'}), 400
+    if language and not is_language_supported(language):
+        return jsonify({'error': 'Unsupported language code'}), 400
+    if input_format not in app.config['LIVE_FORMATS']:
+        return jsonify({'error': 'Unsupported stream format'}), 400
+    if app.config['LIVE_MAX_SESSIONS'] <= 0:
+        return jsonify({'error': 'Live transcription is disabled (set TRANSCRIBER_LIVE_SESSIONS)'}), 503
+    if not live_sessions.acquire(blocking=False):
+        return jsonify({'error': 'Too many live streams, please try again later'}), 429
+    
+    # The stream is transcribed by an inference worker that is free right now
+    scheduler.start()
+    session_id = str(uuid.uuid4())
+    events = scheduler.open_session(session_id, {'model': model_size, 'language': language, 'format': input_format})
+    if events is None:
+        live_sessions.release()
+        return jsonify({'error': 'All workers are busy, please try again later'}), 429
+    
+    # Chunked request bodies are read as they arrive
+    read_bytes = app.config['LIVE_READ_BYTES']
+    chunks = iter(lambda: request.stream.read(read_bytes), b'')
+    
+    def stream():
+        # Forward audio to the worker, passing on the events it has reported so far after each read
+        for chunk in chunks:
+            if not scheduler.send_audio(session_id, chunk):
+                break
+            while not events.empty():
+                event = events.get()
+                if event is None:
+                    return
+                yield json.dumps(event) + "\n"
+        scheduler.close_session(session_id)
+        
+        # The final pass runs once the stream has ended
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield json.dumps(event) + "\n"
+    
+    def close():
+        scheduler.close_session(session_id)
+        live_sessions.release()
+    
+    response = Response(stream_with_context(stream()), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Ends the session even if the client disconnects before the stream starts
+    response.call_on_close(close)
+    return response
 
 @app.route('/download/<job_id>')
 def download_result(job_id):
-    if job_id not in jobs:
+    job = jobs.get(job_id)
+    if job is None:
         return jsonify({'error': 'Job not found'}), 404
     
-    job = jobs[job_id]
-    
     if job['status'] != 'completed':
         return jsonify({'error': 'Transcription not completed'}), 400
     
+    # ?format=srt (vtt, tsv, json...) is exported from the job's stored artifact, without transcribing again
+    output_format = request.args.get('format', 'txt')
+    if output_format not in WRITERS:
+        return jsonify({'error': f"Unsupported format (choose from {', '.join(WRITERS)})"}), 400
+    
+    output_file = job['result_file']
+    if output_format != 'txt':
+        artifact_file = job.get('artifact_file')
+        if not artifact_file or not os.path.isdir(artifact_file):
+            return jsonify({'error': 'No stored result to export for this job'}), 404
+        output_file = os.path.join(os.path.dirname(artifact_file), f"{job_id}.{EXTENSIONS[output_format]}")
+        if not os.path.exists(output_file):
+            # Exported under a unique name and renamed, so concurrent downloads never see a partial file;
+            # the sweeper removes the export with the other old result files
+            temp_base = temp_export_base(os.path.dirname(artifact_file), job_id)
+            paths = export_artifact(artifact_file, temp_base, [output_format])
+            os.replace(paths[output_format], output_file)
+    
     return send_file(
-        job['result_file'],
+        output_file,
         as_attachment=True,
-        download_name=f"{os.path.splitext(job['filename'])[0]}_transcript.txt"
+        download_name=f"{os.path.splitext(job['filename'])[0]}_transcript.{EXTENSIONS[output_format]}"
     )
 
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/languages')
 def get_languages():
     # Return the list of supported languages
@@ -195,25 +345,11 @@ def get_languages():
         'sorted': sorted(SUPPORTED_LANGUAGES.items(), key=lambda x: x[1])
     })
 
-# Clean up old jobs and files periodically (would be implemented with a scheduler in production)
-def cleanup_old_jobs():
-    current_time = time.time()
-    for job_id in list(jobs.keys()):
-        # Remove jobs older than 24 hours
-        if current_time - jobs[job_id]['created_at'] > 86400:
-            # Delete files
-            try:
-                if os.path.exists(jobs[job_id]['file_path']):
-                    os.remove(jobs[job_id]['file_path'])
-                
-                if 'result_file' in jobs[job_id] and os.path.exists(jobs[job_id]['result_file']):
-                    os.remove(jobs[job_id]['result_file'])
-            except:
-                pass
-            
-            # Remove job from dictionary
-            del jobs[job_id]
-
 if __name__ == '__main__':
+    # Start the workers (which preload their models) before serving requests;
+    # with the debug reloader only the serving child process starts them
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        scheduler.start()
+        sweeper.start()
     app.run(debug=True)
 
@@ -0,0 +1,278 @@
+"""Fast audio duration probing from container and frame headers.
+
+Durations are read without decoding the audio:
+
+- WAV: the ``fmt `` and ``data`` chunks of the RIFF header
+- MP3: the Xing/Info or VBRI header of the first frame, or the bitrate of
+  the first frame for constant-bitrate files
+- OGG: the sample rate in the Vorbis/Opus identification header and the
+  granule position of the last page
+
+When a header cannot be parsed the probe falls back to ffprobe, and only if
+that is unavailable to a full decode.
+"""
+
+import concurrent.futures
+import os
+import struct
+import subprocess
+from typing import Dict, List, Optional
+
+from tracing import PROBE, span
+
+# Bytes read from the end of an OGG file to find the last page
+OGG_TAIL_BYTES = 64 * 1024
+
+# Bytes scanned from the start of an MP3 file to find the first frame
+MP3_SCAN_BYTES = 64 * 1024
+
+# Default number of concurrent probes in probe_durations
+PROBE_WORKERS = 16
+
+# Bitrates in kbit/s indexed by [version key][layer][bitrate index]
+MP3_BITRATES = {
+    "1": {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    "2": {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+
+# Sample rates indexed by MPEG version bits
+MP3_SAMPLE_RATES = {
+    0b11: [44100, 48000, 32000],  # MPEG 1
+    0b10: [22050, 24000, 16000],  # MPEG 2
+    0b00: [11025, 12000, 8000],   # MPEG 2.5
+}
+
+def probe_wav_duration(file_path: str) -> Optional[float]:
+    """Read the duration of a WAV file from its RIFF chunks."""
+    file_size = os.path.getsize(file_path)
+    byte_rate = None
+
+    with open(file_path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] not in (b'RIFF', b'RF64') or riff[8:12] != b'WAVE':
+            return None
+
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+
+            if chunk_id == b'fmt ':
+                fmt = f.read(chunk_size)
+                if len(fmt) < 16:
+                    return None
+                byte_rate = struct.unpack('<I', fmt[8:12])[0]
+                f.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    return None
+                # Streamed or RF64 files leave the size unset; use the file size
+                if chunk_size in (0, 0xFFFFFFFF) or f.tell() + chunk_size > file_size:
+                    chunk_size = file_size - f.tell()
+                return chunk_size / byte_rate
+            else:
+                # Chunks are word aligned
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+def _skip_id3v2(data: bytes) -> int:
+    """Return the offset of the first byte after an ID3v2 tag, if any."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _parse_mp3_header(header: bytes) -> Optional[dict]:
+    """Decode a 4-byte MPEG audio frame header."""
+    value = struct.unpack('>I', header)[0]
+    if (value >> 21) & 0x7FF != 0x7FF:
+        return None
+
+    version_bits = (value >> 19) & 0x3
+    layer_bits = (value >> 17) & 0x3
+    bitrate_index = (value >> 12) & 0xF
+    sample_rate_index = (value >> 10) & 0x3
+    channel_mode = (value >> 6) & 0x3
+
+    if version_bits == 0b01 or layer_bits == 0 or bitrate_index == 0xF or sample_rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    version_key = "1" if version_bits == 0b11 else "2"
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 2 or version_key == "1":
+        samples_per_frame = 1152
+    else:
+        samples_per_frame = 576
+
+    return {
+        "version_key": version_key,
+        "layer": layer,
+        "bitrate": MP3_BITRATES[version_key][layer][bitrate_index] * 1000,
+        "sample_rate": MP3_SAMPLE_RATES[version_bits][sample_rate_index],
+        "mono": channel_mode == 0b11,
+        "samples_per_frame": samples_per_frame,
+    }
+
+def probe_mp3_duration(file_path: str) -> Optional[float]:
+    """Read the duration of an MP3 file from its frame headers."""
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as f:
+        head = f.read(10)
+        start = _skip_id3v2(head)
+        f.seek(start)
+        data = f.read(MP3_SCAN_BYTES)
+
+        # Subtract a trailing ID3v1 tag from the audio payload
+        tail_tag = 0
+        if file_size >= 128:
+            f.seek(file_size - 128)
+            if f.read(3) == b'TAG':
+                tail_tag = 128
+
+    # Find the first valid frame header
+    frame = None
+    offset = 0
+    while offset + 4 <= len(data):
+        offset = data.find(b'\xff', offset)
+        if offset < 0 or offset + 4 > len(data):
+            return None
+        frame = _parse_mp3_header(data[offset:offset + 4])
+        if frame:
+            break
+        offset += 1
+    if not frame:
+        return None
+
+    # VBR files carry a frame count in a Xing/Info or VBRI header
+    if frame["version_key"] == "1":
+        side_info = 17 if frame["mono"] else 32
+    else:
+        side_info = 9 if frame["mono"] else 17
+    xing = offset + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+            return frames * frame["samples_per_frame"] / frame["sample_rate"]
+    vbri = offset + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI':
+        frames = struct.unpack('>I', data[vbri + 14:vbri + 18])[0]
+        return frames * frame["samples_per_frame"] / frame["sample_rate"]
+
+    # Otherwise assume a constant bitrate
+    if not frame["bitrate"]:
+        return None
+    audio_bytes = file_size - start - offset - tail_tag
+    return audio_bytes * 8 / frame["bitrate"]
+
+def probe_ogg_duration(file_path: str) -> Optional[float]:
+    """Read the duration of an OGG Vorbis/Opus file from its page headers."""
+    file_size = os.path.getsize(file_path)
+
+    with open(file_path, 'rb') as f:
+        first_page = f.read(512)
+        f.seek(max(0, file_size - OGG_TAIL_BYTES))
+        tail = f.read()
+
+    if first_page[:4] != b'OggS' or len(first_page) < 28:
+        return None
+
+    # The identification packet starts right after the segment table
+    packet = first_page[27 + first_page[26]:]
+    pre_skip = 0
+    if packet[:7] == b'\x01vorbis':
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+    elif packet[:8] == b'OpusHead':
+        # Opus granule positions always count 48 kHz samples
+        sample_rate = 48000
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+    else:
+        return None
+
+    last_page = tail.rfind(b'OggS')
+    if last_page < 0 or last_page + 14 > len(tail) or not sample_rate:
+        return None
+    granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+    if granule < 0:
+        return None
+
+    return max(0, granule - pre_skip) / sample_rate
+
+HEADER_PROBES = {
+    '.wav': probe_wav_duration,
+    '.mp3': probe_mp3_duration,
+    '.ogg': probe_ogg_duration,
+}
+
+def probe_with_ffprobe(file_path: str) -> Optional[float]:
+    """Ask ffprobe for the container duration, if ffprobe is installed."""
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", file_path],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        return float(output)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+def probe_duration(file_path: str, decode_fallback: bool = True) -> Optional[float]:
+    """Get the duration of an audio file in seconds without decoding it.
+
+    Falls back to ffprobe and then to a full decode only when the headers
+    cannot be parsed. With ``decode_fallback`` off, None is returned instead
+    of decoding the file.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Audio file not found: {file_path}")
+
+    file_ext = os.path.splitext(file_path)[1].lower()
+    probe = HEADER_PROBES.get(file_ext)
+
+    with span(PROBE):
+        duration = None
+        if probe:
+            try:
+                duration = probe(file_path)
+            except (OSError, struct.error):
+                duration = None
+
+        if duration is None:
+            duration = probe_with_ffprobe(file_path)
+
+    if duration is None and decode_fallback:
+        from audio_utils import audio_duration, load_audio
+        duration = audio_duration(load_audio(file_path))
+
+    return duration
+
+def probe_durations(file_paths: List[str], max_workers: int = PROBE_WORKERS) -> Dict[str, Optional[float]]:
+    """Probe the durations of many files concurrently.
+
+    Header reads are small and I/O bound, so a thread pool keeps the disk
+    busy. Files that cannot be probed map to ``None``.
+    """
+    def safe_probe(file_path):
+        try:
+            return probe_duration(file_path)
+        except Exception:
+            return None
+
+    with span(PROBE, files=len(file_paths)):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            durations = executor.map(safe_probe, file_paths)
+            return dict(zip(file_paths, durations))
@@ -0,0 +1,220 @@
+"""Audio decoding helpers shared by the transcriber, diarization and subtitle tools."""
+
+import os
+import subprocess
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+
+from progress import DECODING, report
+from tracing import DECODE_AUDIO, record_span, span
+
+# Whisper models expect 16 kHz mono input (whisper.audio.SAMPLE_RATE)
+SAMPLE_RATE = 16000
+
+# Audio formats accepted by every entry point
+SUPPORTED_EXTENSIONS = ['.mp3', '.wav', '.ogg']
+
+# Length of the windows yielded by the streaming decoder (whisper's context size)
+WINDOW_SECONDS = 30
+
+# Bytes read from the ffmpeg pipe per read() call
+BLOCK_SIZE = 64 * 1024
+
+# Bytes read per call when a whole file is decoded into memory
+DECODE_BLOCK_SIZE = 1024 * 1024
+
+# Length of the analysis frames used for energy measurements
+FRAME_SECONDS = 0.02
+
+def check_audio_file(input_file: str) -> None:
+    """Raise if the file is missing or has an unsupported extension."""
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Audio file not found: {input_file}")
+
+    file_ext = os.path.splitext(input_file)[1].lower()
+    if file_ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+
+def load_audio(input_file: str, progress: Optional[Callable] = None) -> np.ndarray:
+    """Decode an audio file once into a 16 kHz mono float32 array.
+
+    The file is piped through ffmpeg straight into memory, so no temporary
+    WAV file is written next to the input. With a ``progress`` callback the
+    seconds of audio decoded so far are reported as the pipe is read.
+    """
+    check_audio_file(input_file)
+
+    total = None
+    if progress is not None:
+        from audio_probe import probe_duration
+        total = probe_duration(input_file, decode_fallback=False)
+
+    with span(DECODE_AUDIO):
+        pcm = bytearray()
+        for block in read_pcm(input_file, DECODE_BLOCK_SIZE):
+            pcm += block
+            report(progress, DECODING, len(pcm) / 2 / SAMPLE_RATE, total)
+        report(progress, DECODING, len(pcm) / 2 / SAMPLE_RATE, len(pcm) / 2 / SAMPLE_RATE)
+
+        # Drop a dangling odd byte
+        return pcm16_to_float(memoryview(pcm)[:len(pcm) - len(pcm) % 2])
+
+def ensure_audio(audio: Union[str, np.ndarray]) -> np.ndarray:
+    """Return a decoded waveform, decoding it first if a path was given."""
+    if isinstance(audio, np.ndarray):
+        return audio
+    return load_audio(audio)
+
+def audio_duration(audio: np.ndarray) -> float:
+    """Duration in seconds of a decoded 16 kHz waveform."""
+    return len(audio) / SAMPLE_RATE
+
+def pcm16_to_float(pcm) -> np.ndarray:
+    """Convert little-endian 16-bit PCM bytes to a float32 waveform in [-1, 1]."""
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+def read_pcm(input_file: str, block_size: int = BLOCK_SIZE, start_seconds: float = 0.0) -> Iterator[bytes]:
+    """Decode an audio file with ffmpeg and yield 16 kHz mono PCM blocks as they arrive.
+
+    With ``start_seconds`` ffmpeg seeks in the input and decoding starts there.
+    """
+    seek = ["-ss", f"{start_seconds:.6f}"] if start_seconds > 0 else []
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-loglevel", "error",
+        *seek, "-i", input_file,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-"
+    ]
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            block = process.stdout.read(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        stderr = process.stderr.read().decode(errors="replace")
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"Failed to decode audio: {stderr.strip()}")
+
+def decode_stream(chunks: Iterable[bytes], input_format: str, block_size: int = BLOCK_SIZE) -> Iterator[bytes]:
+    """Decode an encoded audio stream (e.g. Ogg/Opus) arriving in chunks to 16 kHz mono PCM.
+
+    One ffmpeg process decodes the whole stream: a thread feeds it the
+    chunks as they arrive and PCM is yielded as soon as ffmpeg produces it,
+    so live audio is never buffered up or decoded twice.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-fflags", "nobuffer",
+        "-f", input_format, "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-"
+    ]
+
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def feed():
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+                process.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            # ffmpeg exited or the reader gave up
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            # read1 returns whatever is available instead of waiting for a full block
+            block = process.stdout.read1(block_size)
+            if not block:
+                break
+            yield block
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        stderr = process.stderr.read().decode(errors="replace")
+        process.stderr.close()
+        returncode = process.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"Failed to decode audio stream: {stderr.strip()}")
+
+def stream_audio(input_file: str, window_seconds: float = WINDOW_SECONDS,
+                 block_size: int = BLOCK_SIZE, start_seconds: float = 0.0) -> Iterator[np.ndarray]:
+    """Decode an audio file incrementally and yield fixed-length windows.
+
+    ffmpeg writes 16 kHz mono PCM to a pipe that is read ``block_size`` bytes
+    at a time. Only the window being filled is kept in memory, so peak memory
+    stays flat regardless of the length of the recording. The last window may
+    be shorter than ``window_seconds``. Decoding begins at ``start_seconds``.
+    """
+    check_audio_file(input_file)
+
+    window_bytes = int(window_seconds * SAMPLE_RATE) * 2
+    buffer = bytearray()
+
+    # Decoding happens between yields, so each window's decode time is recorded separately
+    started = time.perf_counter()
+    for block in read_pcm(input_file, block_size, start_seconds):
+        buffer += block
+
+        # Emit every complete window as soon as it has been decoded
+        while len(buffer) >= window_bytes:
+            window = pcm16_to_float(bytes(buffer[:window_bytes]))
+            del buffer[:window_bytes]
+            record_span(DECODE_AUDIO, started)
+            yield window
+            started = time.perf_counter()
+
+    # Flush the final partial window (dropping a dangling odd byte)
+    if len(buffer) >= 2:
+        window = pcm16_to_float(bytes(buffer[:len(buffer) - len(buffer) % 2]))
+        record_span(DECODE_AUDIO, started)
+        yield window
+
+def frame_energy(audio: np.ndarray, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """RMS energy of consecutive non-overlapping frames of a waveform."""
+    frame_length = int(frame_seconds * SAMPLE_RATE)
+    num_frames = len(audio) // frame_length
+    frames = audio[:num_frames * frame_length].reshape(num_frames, frame_length)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+def find_split_points(audio: np.ndarray, chunk_seconds: float, search_seconds: float = 10.0) -> List[int]:
+    """Choose sample positions close to every ``chunk_seconds`` that fall in silence.
+
+    Around each nominal boundary the quietest frame within ``search_seconds``
+    is chosen, so chunks are not cut in the middle of a word. The returned
+    list starts at 0 and ends at ``len(audio)``.
+    """
+    frame_length = int(FRAME_SECONDS * SAMPLE_RATE)
+    energy = frame_energy(audio)
+    total_seconds = len(audio) / SAMPLE_RATE
+
+    points = [0]
+    boundary = chunk_seconds
+    while boundary < total_seconds - search_seconds:
+        lo = int((boundary - search_seconds) / FRAME_SECONDS)
+        hi = int((boundary + search_seconds) / FRAME_SECONDS)
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+        points.append(quietest * frame_length)
+        boundary = quietest * FRAME_SECONDS + chunk_seconds
+    points.append(len(audio))
+    return points
@@ -0,0 +1,149 @@
+"""Persistent manifest that makes batch runs resumable.
+
+A SQLite database in the output directory records every input file's path,
+size, modification time, the options it was transcribed with and its status.
+When a run is restarted, files already completed with the same options (and
+unchanged on disk) are skipped. Long files transcribed window by window or
+chunk by chunk also store each finished piece, so a restart continues in the
+middle of the file instead of at its start.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from transcription_cache import _json_default
+
+# File name of the manifest inside the output directory
+MANIFEST_NAME = ".transcriber-manifest.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime REAL,
+    options TEXT,
+    status TEXT,
+    output TEXT,
+    error TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    path TEXT,
+    chunk INTEGER,
+    size INTEGER,
+    mtime REAL,
+    options TEXT,
+    start REAL,
+    end REAL,
+    result TEXT,
+    PRIMARY KEY (path, chunk)
+);
+"""
+
+def file_fingerprint(input_file: str) -> Tuple[int, float]:
+    """Size and modification time, used to notice files changed since the last run."""
+    stat = os.stat(input_file)
+    return stat.st_size, stat.st_mtime
+
+def manifest_options(model_size: str, options: dict, **extra) -> str:
+    """Serialize everything that changes a file's output into a comparable string."""
+    return json.dumps({"model": model_size, "options": options, **extra}, sort_keys=True, default=str)
+
+class BatchManifest:
+    """Status of every file in a batch, stored in ``output_dir``."""
+
+    def __init__(self, output_dir: str, path: Optional[str] = None):
+        os.makedirs(output_dir, exist_ok=True)
+        self.path = path or os.path.join(output_dir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def is_done(self, input_file: str, options: str) -> bool:
+        """True when the file was completed with these options and has not changed since."""
+        key = os.path.abspath(input_file)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime, options, status, output FROM files WHERE path = ?", (key,)
+            ).fetchone()
+        if row is None or row[3] != "completed" or row[2] != options:
+            return False
+        try:
+            if (row[0], row[1]) != file_fingerprint(input_file):
+                return False
+        except OSError:
+            return False
+        return bool(row[4]) and os.path.exists(row[4])
+
+    def mark(self, input_file: str, options: str, status: str, output: Optional[str] = None,
+             error: Optional[str] = None) -> None:
+        """Record a file's status ("running", "completed" or "failed")."""
+        key = os.path.abspath(input_file)
+        size, mtime = file_fingerprint(input_file)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, options, status, output, error, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, size, mtime, options, status, output, error, time.time())
+            )
+            # A finished file no longer needs its partial results
+            if status == "completed":
+                self._db.execute("DELETE FROM chunks WHERE path = ?", (key,))
+            self._db.commit()
+
+    def checkpoint(self, input_file: str, options: str) -> "ChunkCheckpoint":
+        """Per-chunk checkpoint store for one file transcribed with ``options``."""
+        return ChunkCheckpoint(self, input_file, options)
+
+    def summary(self) -> Dict[str, int]:
+        """Number of files per status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM files GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+class ChunkCheckpoint:
+    """Finished windows or chunks of one long file.
+
+    Stored pieces are only returned while the file is unchanged on disk and
+    is transcribed with the same options, so a resumed run never mixes in
+    output from a different recording or configuration.
+    """
+
+    def __init__(self, manifest: BatchManifest, input_file: str, options: str):
+        self.manifest = manifest
+        self.path = os.path.abspath(input_file)
+        self.fingerprint = file_fingerprint(input_file)
+        self.options = options
+
+    def completed(self) -> Dict[int, Tuple[float, float, dict]]:
+        """Map of chunk index to ``(start, end, result)`` for every stored chunk."""
+        with self.manifest._lock:
+            rows = self.manifest._db.execute(
+                "SELECT chunk, size, mtime, options, start, end, result FROM chunks WHERE path = ?", (self.path,)
+            ).fetchall()
+        return {
+            chunk: (start, end, json.loads(result))
+            for chunk, size, mtime, options, start, end, result in rows
+            if (size, mtime) == self.fingerprint and options == self.options
+        }
+
+    def save(self, chunk: int, start: float, end: float, result: dict) -> None:
+        """Store one finished chunk; committed immediately so a crash keeps it."""
+        size, mtime = self.fingerprint
+        encoded = json.dumps(result, default=_json_default)
+        with self.manifest._lock:
+            self.manifest._db.execute(
+                "INSERT OR REPLACE INTO chunks (path, chunk, size, mtime, options, start, end, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.path, chunk, size, mtime, self.options, start, end, encoded)
+            )
+            self.manifest._db.commit()
@@ -0,0 +1,165 @@
+"""Batched Whisper inference across files and windows.
+
+``model.transcribe`` walks one file one 30-second window at a time, so the
+encoder always runs with a batch size of one. This module cuts every file
+into windows of at most 30 seconds (at quiet points), stacks the log-mel
+spectrograms of many windows from many files into one tensor, and runs the
+encoder and the decoder over the whole batch with ``whisper.decode``.
+Decoded windows are parsed into segments and routed back to their files.
+
+Windows are decoded independently: there is no conditioning on the text of
+the previous window and no temperature fallback, which is the trade-off for
+batching. This suits collections of short clips best.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_SAMPLES, log_mel_spectrogram, pad_or_trim
+from whisper.tokenizer import get_tokenizer
+
+from audio_utils import SAMPLE_RATE, find_split_points
+from tracing import MEL, span
+
+# Windows stacked into one encoder/decoder pass
+BATCH_SIZE = 16
+
+# Nominal window length; cuts are moved to the quietest point up to
+# WINDOW_SEARCH_SECONDS earlier or later, so windows never exceed 30 seconds
+WINDOW_SECONDS = 27
+WINDOW_SEARCH_SECONDS = 3
+
+# Seconds per timestamp token
+TIME_PRECISION = 0.02
+
+# Whisper's defaults for treating a window as silence
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+def split_windows(audio: np.ndarray) -> List[Tuple[float, np.ndarray]]:
+    """Cut a waveform into ``(offset_seconds, window)`` pairs of at most 30 seconds."""
+    if len(audio) <= N_SAMPLES:
+        return [(0.0, audio)]
+    points = find_split_points(audio, WINDOW_SECONDS, WINDOW_SEARCH_SECONDS)
+    return [(start / SAMPLE_RATE, audio[start:end]) for start, end in zip(points[:-1], points[1:])]
+
+def parse_segments(tokens: List[int], tokenizer, offset: float, window_seconds: float) -> List[dict]:
+    """Split a decoded token sequence into timed segments at timestamp tokens."""
+    segments = []
+    start = 0.0
+    text_tokens = []
+
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            t = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if text_tokens:
+                segments.append((start, t, text_tokens))
+                text_tokens = []
+            start = t
+        elif token < tokenizer.eot:
+            text_tokens.append(token)
+
+    # Text after the last timestamp runs to the end of the window
+    if text_tokens:
+        segments.append((start, window_seconds, text_tokens))
+
+    return [
+        {
+            "start": offset + seg_start,
+            "end": offset + max(seg_start, seg_end),
+            "text": tokenizer.decode(seg_tokens),
+            "tokens": seg_tokens
+        }
+        for seg_start, seg_end, seg_tokens in segments
+    ]
+
+def _detect_languages(model, mels: torch.Tensor) -> List[str]:
+    """Detect the language of each mel window in one batched pass."""
+    _, probs = model.detect_language(mels)
+    return [max(p, key=p.get) for p in probs]
+
+def transcribe_batch(model, audios: Dict[str, np.ndarray], language: Optional[str] = None,
+                     batch_size: int = BATCH_SIZE) -> Dict[str, dict]:
+    """Transcribe many waveforms with batched encoder and decoder passes.
+
+    Args:
+        model: Loaded Whisper model
+        audios: Mapping of a key (e.g. file path) to a 16 kHz waveform
+        language: Language code, or None/"auto" to detect it per file
+        batch_size: Number of 30-second windows per forward pass
+
+    Returns:
+        Mapping of each key to a result dict with text, segments and language
+    """
+    fp16 = model.device.type != "cpu"
+    dtype = torch.float16 if fp16 else torch.float32
+    multilingual = model.is_multilingual
+
+    # Collect every window of every file
+    windows = []
+    for key, audio in audios.items():
+        for offset, window in split_windows(audio):
+            windows.append((key, offset, len(window) / SAMPLE_RATE, window))
+
+    def mel_batch(items):
+        with span(MEL, windows=len(items)):
+            mels = [log_mel_spectrogram(pad_or_trim(window), model.dims.n_mels) for _, _, _, window in items]
+            return torch.stack(mels).to(model.device, dtype=dtype)
+
+    # Decide each file's language from its first window, batched as well
+    if language and language != "auto":
+        languages = {key: language for key in audios}
+    elif not multilingual:
+        languages = {key: "en" for key in audios}
+    else:
+        first_windows = {}
+        for item in windows:
+            first_windows.setdefault(item[0], item)
+        keys = list(first_windows)
+        languages = {}
+        for i in range(0, len(keys), batch_size):
+            batch_keys = keys[i:i + batch_size]
+            detected = _detect_languages(model, mel_batch([first_windows[k] for k in batch_keys]))
+            languages.update(zip(batch_keys, detected))
+
+    # Decoding options are per batch, so group windows by language
+    by_language = {}
+    for item in windows:
+        by_language.setdefault(languages[item[0]], []).append(item)
+
+    segments_by_key = {key: [] for key in audios}
+    for lang, items in by_language.items():
+        tokenizer = get_tokenizer(multilingual, num_languages=model.num_languages, language=lang, task="transcribe")
+        options = whisper.DecodingOptions(language=lang, task="transcribe", fp16=fp16)
+
+        for i in range(0, len(items), batch_size):
+            batch = items[i:i + batch_size]
+            decoded = whisper.decode(model, mel_batch(batch), options)
+
+            for (key, offset, seconds, _), result in zip(batch, decoded):
+                # Skip windows the model considers silent
+                if result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD:
+                    continue
+                for segment in parse_segments(result.tokens, tokenizer, offset, seconds):
+                    segment.update({
+                        "temperature": result.temperature,
+                        "avg_logprob": result.avg_logprob,
+                        "compression_ratio": result.compression_ratio,
+                        "no_speech_prob": result.no_speech_prob
+                    })
+                    segments_by_key[key].append(segment)
+
+    # Put each file's segments back in time order
+    results = {}
+    for key, segments in segments_by_key.items():
+        segments.sort(key=lambda s: s["start"])
+        for i, segment in enumerate(segments):
+            segment["id"] = i
+        results[key] = {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": languages[key]
+        }
+    return results
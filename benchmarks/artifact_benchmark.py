@@ -0,0 +1,116 @@
+"""Transcript artifact size and load time against indented JSON.
+
+Usage:
+    python benchmarks/artifact_benchmark.py --sizes 10000 100000 1000000 --words-per-segment 8
+
+Synthetic results (segments with whisper's statistics, speakers and
+optional word timestamps) are stored with ``transcript_artifact.save_artifact``
+and, as ``diarization.save_diarized_transcription`` used to, as indented
+JSON. For each the size on disk, the save time, the time to open it and
+read one column (the artifact is memory-mapped, JSON is parsed whole) and
+the time to rebuild every segment are reported, plus the time to export
+SRT from the artifact.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from export_benchmark import synthetic_result
+from transcript_artifact import export_artifact, load_artifact, save_artifact
+
+def directory_bytes(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path))
+
+def run(size: int, words_per_segment: int, seed: int) -> dict:
+    result = synthetic_result(size, words_per_segment, seed)
+    for i, segment in enumerate(result["segments"]):
+        segment.update({"avg_logprob": -0.25, "no_speech_prob": 0.02, "compression_ratio": 1.4,
+                        "temperature": 0.0, "speaker": f"SPEAKER_{i % 4:02d}"})
+        for word in segment.get("words", []):
+            word["probability"] = 0.9
+
+    directory = tempfile.mkdtemp(prefix="artifact-benchmark-")
+    try:
+        artifact_path = os.path.join(directory, "result.transcript")
+        start = time.perf_counter()
+        save_artifact(result, artifact_path)
+        artifact_save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        artifact = load_artifact(artifact_path)
+        last_end = float(artifact["segment_end"][-1])
+        artifact_open = time.perf_counter() - start
+
+        start = time.perf_counter()
+        segments = list(artifact.iter_segments())
+        artifact_rebuild = time.perf_counter() - start
+        assert len(segments) == size and segments[-1]["end"] == last_end
+
+        start = time.perf_counter()
+        export_artifact(artifact_path, os.path.join(directory, "export"), ["srt"])
+        artifact_export = time.perf_counter() - start
+
+        json_path = os.path.join(directory, "result.json")
+        start = time.perf_counter()
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        json_save = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with open(json_path, encoding="utf-8") as f:
+            json.load(f)
+        json_load = time.perf_counter() - start
+
+        artifact_mb = directory_bytes(artifact_path) / 1e6
+        json_mb = os.path.getsize(json_path) / 1e6
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "segments": size,
+        "words": size * words_per_segment,
+        "artifact_mb": artifact_mb,
+        "json_mb": json_mb,
+        "artifact_save_seconds": artifact_save,
+        "json_save_seconds": json_save,
+        "artifact_open_seconds": artifact_open,
+        "json_load_seconds": json_load,
+        "artifact_rebuild_seconds": artifact_rebuild,
+        "artifact_export_srt_seconds": artifact_export
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript artifacts against indented JSON")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Numbers of segments (default: 10000 100000 1000000)")
+    parser.add_argument("--words-per-segment", type=int, default=0,
+                        help="Timed words per segment, 0 for none (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = [run(size, args.words_per_segment, args.seed) for size in args.sizes]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'Segments':>9} {'Words':>9} {'Artifact':>10} {'JSON':>10} {'Save':>8} {'JSON save':>10} "
+          f"{'Open':>9} {'JSON load':>10} {'Rebuild':>8} {'SRT':>7}")
+    print("-" * 100)
+    for row in rows:
+        print(f"{row['segments']:>9} {row['words']:>9} {row['artifact_mb']:>8.1f}MB {row['json_mb']:>8.1f}MB "
+              f"{row['artifact_save_seconds']:>7.2f}s {row['json_save_seconds']:>9.2f}s "
+              f"{row['artifact_open_seconds'] * 1000:>7.1f}ms {row['json_load_seconds']:>9.2f}s "
+              f"{row['artifact_rebuild_seconds']:>7.2f}s {row['artifact_export_srt_seconds']:>6.2f}s")
+
+if __name__ == "__main__":
+    main()
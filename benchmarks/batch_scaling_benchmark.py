@@ -0,0 +1,112 @@
+"""Files/hour of the process-pool batch engine from 1 to N worker processes.
+
+Usage:
+    python benchmarks/batch_scaling_benchmark.py --files 16 --seconds 30 --workers 1 2 4 8
+
+A set of synthetic speech-like WAV files (amplitude-modulated harmonic tones
+with pauses) is written to a temporary directory and transcribed with
+``parallel_processor.parallel_batch_process`` for each worker count. Every
+worker count runs in a fresh subprocess, so no run forks its pool from a
+process in which an earlier run already did inference (torch's OpenMP
+thread pool does not survive a fork). The model is loaded before the clock
+starts so load time does not skew the comparison.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model_registry import get_model
+from parallel_processor import parallel_batch_process, plan_workers
+from synthetic_audio import synthetic_speech, write_wav
+
+def run_config(config: dict) -> dict:
+    """Transcribe the files with one worker count in this process and return the measurements."""
+    input_files = config["files"]
+    get_model(config["model"])
+
+    workers, threads = plan_workers(len(input_files), config["max_workers"])
+    start = time.perf_counter()
+    results = parallel_batch_process(input_files, config["output_dir"], config["model"],
+                                     max_workers=config["max_workers"], language="en")
+    elapsed = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "threads_per_worker": threads,
+        "files": len(input_files),
+        "failed": len(results["failed"]),
+        "seconds": elapsed,
+        "files_per_hour": len(input_files) / elapsed * 3600,
+        "real_time_factor": elapsed / (len(input_files) * config["seconds"])
+    }
+
+def measure(config: dict) -> dict:
+    """Run one worker count in a fresh interpreter."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", json.dumps(config)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        sys.exit(f"Run with {config['max_workers']} workers failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch throughput against worker count")
+    parser.add_argument("--files", type=int, default=16, help="Number of synthetic files")
+    parser.add_argument("--seconds", type=float, default=30, help="Length of each file in seconds")
+    parser.add_argument("--model", default="tiny", help="Whisper model size (default: tiny)")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="Worker counts to benchmark (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run a single worker count and print its measurements
+    if args.run:
+        print(json.dumps(run_config(json.loads(args.run))))
+        return
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers
+    if not worker_counts:
+        worker_counts = []
+        n = 1
+        while n <= cpu_count:
+            worker_counts.append(n)
+            n *= 2
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_files = []
+        for i in range(args.files):
+            path = os.path.join(tmp_dir, f"synthetic_{i:03d}.wav")
+            write_wav(path, synthetic_speech(args.seconds, seed=i))
+            input_files.append(path)
+        output_dir = os.path.join(tmp_dir, "out")
+        os.makedirs(output_dir)
+
+        for max_workers in worker_counts:
+            print(f"Running with {max_workers} workers...", file=sys.stderr)
+            rows.append(measure({"files": input_files, "output_dir": output_dir, "model": args.model,
+                                 "max_workers": max_workers, "seconds": args.seconds}))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    baseline = rows[0]["files_per_hour"]
+    print(f"\n{'Workers':>8} {'Threads':>8} {'Seconds':>9} {'Files/hour':>11} {'Speedup':>8} {'RTF':>7}")
+    print("-" * 56)
+    for row in rows:
+        print(f"{row['workers']:>8} {row['threads_per_worker']:>8} {row['seconds']:>9.1f} "
+              f"{row['files_per_hour']:>11.0f} {row['files_per_hour'] / baseline:>7.2f}x "
+              f"{row['real_time_factor']:>7.3f}")
+
+if __name__ == "__main__":
+    main()
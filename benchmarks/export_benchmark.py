@@ -0,0 +1,143 @@
+"""Transcript export time for every output format against the number of segments.
+
+Usage:
+    python benchmarks/export_benchmark.py --sizes 10000 100000 1000000 --words-per-segment 8
+
+Synthetic segments (with optional word timestamps, as whisper produces with
+``word_timestamps``) are exported to txt, timestamped text, SRT, VTT, TSV
+and JSON by ``segment_writers.export_result`` in a single pass. The previous
+approach is timed on the same segments: one pass per format writing one
+segment at a time with ``timedelta`` timestamps, plus an indented
+``json.dump`` of the whole result. Both write to a temporary directory,
+which is removed afterwards; output sizes and throughput are reported.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segment_writers import EXTENSIONS, export_result
+
+FORMATS = ["txt", "timestamped", "srt", "vtt", "tsv", "json"]
+
+def synthetic_result(count: int, words_per_segment: int, seed: int) -> dict:
+    """A whisper-like result of ``count`` back-to-back segments."""
+    rng = np.random.default_rng(seed)
+    bounds = np.concatenate(([0.0], np.cumsum(rng.uniform(1.0, 8.0, count))))
+    segments = []
+    for i, (start, end) in enumerate(zip(bounds[:-1].tolist(), bounds[1:].tolist())):
+        words = [f" word{(i + j) % 997}" for j in range(words_per_segment or 8)]
+        segment = {"id": i, "start": start, "end": end, "text": "".join(words)}
+        if words_per_segment:
+            step = (end - start) / words_per_segment
+            segment["words"] = [{"word": word, "start": start + j * step, "end": start + (j + 1) * step}
+                                for j, word in enumerate(words)]
+        segments.append(segment)
+    return {"text": "".join(segment["text"] for segment in segments), "segments": segments, "language": "en"}
+
+def _old_time(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:05.2f}"
+
+def _old_timestamp(seconds, format_type):
+    td = timedelta(seconds=seconds)
+    hours, remainder = divmod(td.seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    marker = "," if format_type == "srt" else "."
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{marker}{td.microseconds // 1000:03d}"
+
+def previous_export(result: dict, output_base: str, formats: list) -> None:
+    """The previous approach: a separate pass per format, one write per segment."""
+    for format_type in formats:
+        with open(f"{output_base}.{EXTENSIONS[format_type]}", "w", encoding="utf-8") as f:
+            if format_type == "txt":
+                f.write(result["text"])
+            elif format_type == "json":
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            elif format_type == "vtt":
+                f.write("WEBVTT\n\n")
+            if format_type == "tsv":
+                f.write("start\tend\ttext\n")
+            for i, segment in enumerate(result["segments"]):
+                if format_type == "timestamped":
+                    f.write(f"[{_old_time(segment['start'])} --> {_old_time(segment['end'])}] {segment['text']}\n")
+                elif format_type in ("srt", "vtt"):
+                    start = _old_timestamp(segment["start"], format_type)
+                    end = _old_timestamp(segment["end"], format_type)
+                    number = f"{i + 1}\n" if format_type == "srt" else ""
+                    f.write(f"{number}{start} --> {end}\n{segment['text'].strip()}\n\n")
+                elif format_type == "tsv":
+                    f.write(f"{round(segment['start'] * 1000)}\t{round(segment['end'] * 1000)}\t"
+                            f"{segment['text'].strip()}\n")
+
+def output_bytes(output_base: str, formats: list) -> int:
+    return sum(os.path.getsize(f"{output_base}.{EXTENSIONS[format_type]}") for format_type in formats)
+
+def run(size: int, words_per_segment: int, formats: list, max_chars, max_duration, seed: int) -> dict:
+    result = synthetic_result(size, words_per_segment, seed)
+    directory = tempfile.mkdtemp(prefix="export-benchmark-")
+    try:
+        base = os.path.join(directory, "transcript")
+
+        start = time.perf_counter()
+        export_result(result, base, formats, max_chars=max_chars, max_duration=max_duration)
+        export_seconds = time.perf_counter() - start
+        export_bytes = output_bytes(base, formats)
+
+        old_base = os.path.join(directory, "previous")
+        start = time.perf_counter()
+        previous_export(result, old_base, formats)
+        previous_seconds = time.perf_counter() - start
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "segments": size,
+        "words": size * words_per_segment,
+        "formats": formats,
+        "export_seconds": export_seconds,
+        "export_mb_per_second": export_bytes / 1e6 / export_seconds if export_seconds else None,
+        "output_mb": export_bytes / 1e6,
+        "previous_seconds": previous_seconds,
+        "speedup": previous_seconds / export_seconds if export_seconds else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-format transcript export against segment count")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Numbers of segments (default: 10000 100000 1000000)")
+    parser.add_argument("--words-per-segment", type=int, default=0,
+                        help="Timed words per segment, 0 for none (default: 0)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS,
+                        help="Formats to export (default: all)")
+    parser.add_argument("--max-chars", type=int, help="Split subtitle cues longer than this many characters")
+    parser.add_argument("--max-duration", type=float, help="Split subtitle cues longer than this many seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = [run(size, args.words_per_segment, args.formats, args.max_chars, args.max_duration, args.seed)
+            for size in args.sizes]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'Segments':>9} {'Words':>9} {'Output':>10} {'Export':>9} {'MB/s':>7} {'Previous':>9} {'Speedup':>8}")
+    print("-" * 68)
+    for row in rows:
+        print(f"{row['segments']:>9} {row['words']:>9} {row['output_mb']:>8.1f}MB {row['export_seconds']:>8.2f}s "
+              f"{row['export_mb_per_second']:>7.1f} {row['previous_seconds']:>8.2f}s {row['speedup']:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
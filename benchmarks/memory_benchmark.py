@@ -0,0 +1,91 @@
+"""Peak memory of full vs. streaming decode as a function of input length.
+
+Usage:
+    python benchmarks/memory_benchmark.py --minutes 1 10 30 60
+
+For every length a synthetic 16 kHz mono WAV file is written to a temporary
+directory, then decoded in a fresh subprocess with either
+``audio_utils.load_audio`` (full) or ``audio_utils.stream_audio`` (streaming).
+Each subprocess reports its own peak RSS, so the numbers are not polluted by
+the benchmark driver.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import wave
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Decoded in a child process; prints "<peak_rss_kb> <samples>"
+DECODE_SCRIPT = """
+import resource, sys
+sys.path.insert(0, {root!r})
+from audio_utils import load_audio, stream_audio
+
+mode, path = sys.argv[1], sys.argv[2]
+if mode == "full":
+    samples = len(load_audio(path))
+else:
+    samples = sum(len(window) for window in stream_audio(path))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, samples)
+"""
+
+def write_synthetic_wav(path: str, minutes: float, sample_rate: int = 16000) -> None:
+    """Write a noise-like WAV file one second at a time."""
+    rng = np.random.default_rng(0)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        for _ in range(int(minutes * 60)):
+            block = (rng.standard_normal(sample_rate) * 3000).astype(np.int16)
+            f.writeframes(block.tobytes())
+
+def measure(mode: str, path: str) -> float:
+    """Return the peak RSS in MB of a subprocess decoding ``path``."""
+    script = DECODE_SCRIPT.format(root=REPO_ROOT)
+    output = subprocess.run(
+        [sys.executable, "-c", script, mode, path],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return int(output[0]) / divisor
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark decode memory against input length")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 30, 60],
+                        help="Input lengths to benchmark, in minutes")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for minutes in args.minutes:
+            path = os.path.join(tmp_dir, f"synthetic_{minutes:g}min.wav")
+            write_synthetic_wav(path, minutes)
+            rows.append({
+                "minutes": minutes,
+                "file_mb": os.path.getsize(path) / (1024 * 1024),
+                "full_rss_mb": measure("full", path),
+                "stream_rss_mb": measure("stream", path)
+            })
+            os.remove(path)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'Minutes':>8} {'File MB':>10} {'Full RSS MB':>12} {'Stream RSS MB':>14}")
+    print("-" * 48)
+    for row in rows:
+        print(f"{row['minutes']:>8g} {row['file_mb']:>10.1f} {row['full_rss_mb']:>12.1f} {row['stream_rss_mb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""Real-time factor, files/hour, peak RSS and per-stage timings across models, modes and workers.
+
+Usage:
+    python benchmarks/rtf_benchmark.py --models stub tiny --modes transcribe batch parallel \\
+        --workers 1 2 4 --threads 1 4 --output rtf.json
+
+Inputs are deterministic synthetic speech-like WAV files (``synthetic_audio.py``)
+or the audio files in a directory given with
+``--samples`` (e.g. ``samples/``). Every configuration runs in a fresh
+subprocess so its peak RSS, including worker processes, is measured in
+isolation. Modes:
+
+- ``transcribe``: ``transcriber.transcribe_audio`` per file (``--workers``
+  above one splits each file into parallel chunks)
+- ``batch``: ``transcriber.process_batch`` over all files
+- ``parallel``: ``parallel_processor.parallel_batch_process`` over all files
+
+``--threads`` sets torch's thread count for a run; in parallel mode every
+worker gets that many threads. Transcribe runs with ``--workers`` above one
+split the cores between their chunk workers themselves, so they are
+reported as errors when combined with ``--threads``.
+
+The ``stub`` model (``stub_model.py``) needs neither whisper nor network
+access, so the harness runs offline on any CPU and measures the pipeline's
+own overhead; real model sizes measure end-to-end speed. Per-stage times come
+from the progress events of ``progress.py``. Results are printed as a table
+or as JSON; with ``--baseline`` the run exits with status 1 when any
+configuration's real-time factor regressed beyond ``--tolerance``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+MODES = ["transcribe", "batch", "parallel"]
+
+class StageTimer:
+    """Progress callback that charges the time since the previous event to the stage of each event."""
+
+    def __init__(self):
+        self.stages = {}
+        self.last = time.perf_counter()
+
+    def __call__(self, stage, done, total):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self.last)
+        self.last = now
+
+def peak_rss_mb(who) -> float:
+    import resource
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss / divisor
+
+def run_config(config: dict) -> dict:
+    """Run one configuration in this process and return its measurements."""
+    import resource
+
+    sys.path.insert(0, REPO_ROOT)
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from audio_probe import probe_durations
+    from model_registry import get_model, registry
+
+    if config["threads"]:
+        from parallel_processor import set_torch_threads
+        set_torch_threads(config["threads"])
+
+    if config["model"] == "stub":
+        from stub_model import StubModel
+        registry.register("stub", StubModel())
+
+    files = config["files"]
+    audio_seconds = sum(d or 0 for d in probe_durations(files).values())
+    output_dir = tempfile.mkdtemp(prefix="rtf-")
+
+    # Load (or register) the model up front so load time is reported separately
+    start = time.perf_counter()
+    model = get_model(config["model"])
+    load_seconds = time.perf_counter() - start
+
+    timer = StageTimer()
+    failed = 0
+    start = time.perf_counter()
+    timer.last = start
+
+    if config["mode"] == "transcribe":
+        from transcriber import transcribe_audio
+        for input_file in files:
+            try:
+                transcribe_audio(input_file, config["model"], model, language=config["language"],
+                                 workers=config["workers"], progress=timer)
+            except Exception as e:
+                print(f"Failed {input_file}: {e}", file=sys.stderr)
+                failed += 1
+    elif config["mode"] == "batch":
+        from transcriber import process_batch
+        results = process_batch(files, output_dir, config["model"], language=config["language"], progress=timer)
+        failed = len(results["failed"])
+    else:
+        from parallel_processor import parallel_batch_process
+        results = parallel_batch_process(files, output_dir, config["model"], max_workers=config["workers"],
+                                         language=config["language"], threads_per_worker=config["threads"] or None)
+        failed = len(results["failed"])
+
+    wall_seconds = time.perf_counter() - start
+    return {
+        **{key: config[key] for key in ("model", "mode", "workers", "threads")},
+        "files": len(files),
+        "failed": failed,
+        "audio_seconds": audio_seconds,
+        "load_seconds": load_seconds,
+        "wall_seconds": wall_seconds,
+        "real_time_factor": wall_seconds / audio_seconds if audio_seconds else None,
+        "files_per_hour": len(files) / wall_seconds * 3600 if wall_seconds else None,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF),
+        "children_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "stages": timer.stages
+    }
+
+def measure(config: dict) -> dict:
+    """Run one configuration in a fresh interpreter."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", json.dumps(config)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return {
+            **{key: config[key] for key in ("model", "mode", "workers", "threads")},
+            "error": error[-1] if error else f"exit status {completed.returncode}"
+        }
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def prepare_inputs(args, tmp_dir: str) -> list:
+    """Synthetic WAV files, or the supported audio files in ``--samples``."""
+    if args.samples:
+        sys.path.insert(0, REPO_ROOT)
+        from transcriber import get_audio_files_from_directory
+        return get_audio_files_from_directory(args.samples)
+
+    sys.path.insert(0, BENCHMARKS_DIR)
+    from synthetic_audio import synthetic_speech, write_wav
+    files = []
+    for i in range(args.files):
+        path = os.path.join(tmp_dir, f"synthetic_{i:03d}.wav")
+        write_wav(path, synthetic_speech(args.seconds, seed=i))
+        files.append(path)
+    return files
+
+def config_key(row: dict) -> tuple:
+    return (row["model"], row["mode"], row["workers"], row["threads"])
+
+def check_baseline(runs: list, baseline_path: str, tolerance: float) -> list:
+    """Return a message for every configuration slower than the baseline by more than ``tolerance``."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {config_key(row): row for row in json.load(f)["runs"] if row.get("real_time_factor")}
+
+    regressions = []
+    for row in runs:
+        previous = baseline.get(config_key(row))
+        if previous is None or not row.get("real_time_factor"):
+            continue
+        limit = previous["real_time_factor"] * (1 + tolerance)
+        if row["real_time_factor"] > limit:
+            regressions.append(
+                f"{row['model']}/{row['mode']} workers={row['workers']} threads={row['threads']}: "
+                f"RTF {row['real_time_factor']:.3f} > {limit:.3f} (baseline {previous['real_time_factor']:.3f})"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark real-time factor across models, modes and worker counts")
+    parser.add_argument("--models", nargs="+", default=["stub"],
+                        help="Model sizes to benchmark; 'stub' runs offline without whisper (default: stub)")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES, help="Entry points to benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Worker counts (default: 1)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[0],
+                        help="torch threads per run, per worker in parallel mode; 0 keeps torch's default "
+                             "(default: 0)")
+    parser.add_argument("--files", type=int, default=8, help="Number of synthetic files (default: 8)")
+    parser.add_argument("--seconds", type=float, default=60, help="Length of each synthetic file (default: 60)")
+    parser.add_argument("--samples", help="Benchmark the audio files in this directory instead of synthetic audio")
+    parser.add_argument("--language", default="en", help="Language passed to every run (default: en)")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare real-time factors against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed RTF slowdown against the baseline as a fraction (default: 0.2)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run a single configuration and print its measurements
+    if args.run:
+        print(json.dumps(run_config(json.loads(args.run))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = prepare_inputs(args, tmp_dir)
+        if not files:
+            print("No audio files to benchmark")
+            sys.exit(1)
+
+        runs = []
+        for model in args.models:
+            for mode in args.modes:
+                for workers in args.workers:
+                    for threads in args.threads:
+                        config = {"model": model, "mode": mode, "workers": workers, "threads": threads,
+                                  "files": files, "language": args.language}
+                        if mode == "transcribe" and workers > 1 and threads:
+                            # The chunk pool splits the cores itself, so the run would not use --threads
+                            runs.append({**{key: config[key] for key in ("model", "mode", "workers", "threads")},
+                                         "error": "--threads cannot be combined with --workers > 1 in transcribe mode"})
+                            continue
+                        print(f"Running {model}/{mode} workers={workers} threads={threads or 'default'}...",
+                              file=sys.stderr)
+                        runs.append(measure(config))
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "inputs": {
+            "source": args.samples or "synthetic",
+            "files": len(files),
+            "seconds_per_file": None if args.samples else args.seconds
+        },
+        "runs": runs
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{'Model':<8} {'Mode':<11} {'Workers':>7} {'Threads':>7} {'RTF':>7} {'Files/hour':>11} "
+              f"{'Peak RSS':>9} {'Failed':>6}  Stages")
+        print("-" * 103)
+        for row in runs:
+            if "error" in row:
+                print(f"{row['model']:<8} {row['mode']:<11} {row['workers']:>7} {row['threads']:>7}  "
+                      f"error: {row['error']}")
+                continue
+            stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in row["stages"].items())
+            rss = max(row["peak_rss_mb"], row["children_peak_rss_mb"])
+            print(f"{row['model']:<8} {row['mode']:<11} {row['workers']:>7} {row['threads']:>7} "
+                  f"{row['real_time_factor']:>7.3f} {row['files_per_hour']:>11.0f} {rss:>6.0f} MB {row['failed']:>6}  {stages}")
+
+    if args.baseline:
+        regressions = check_baseline(runs, args.baseline, args.tolerance)
+        for message in regressions:
+            print(f"Regression: {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
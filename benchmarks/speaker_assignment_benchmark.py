@@ -0,0 +1,138 @@
+"""Speaker assignment time against the number of speaker turns and segments.
+
+Usage:
+    python benchmarks/speaker_assignment_benchmark.py --sizes 1000 10000 100000 --words-per-segment 8
+
+Synthetic diarization output (alternating speakers with short overlaps, as
+in a long hearing) and transcript segments with optional word timestamps
+are generated for each size. ``speaker_assignment.assign_speakers`` and
+``format_speaker_transcript`` are timed on the full set. The previous
+approach (scan every turn for each segment's midpoint) is timed on a sample
+of segments and extrapolated, since it is quadratic. The overlap-based
+labels are checked against a brute-force computation on the same sample.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speaker_assignment import UNKNOWN_SPEAKER, assign_speakers, format_speaker_transcript
+
+def synthetic_turns(count: int, speakers: int, seed: int) -> list:
+    """Consecutive turns of changing speakers, each overlapping the next by up to 0.3 s."""
+    rng = np.random.default_rng(seed)
+    starts = np.cumsum(rng.uniform(0.5, 6.0, count))
+    ends = np.append(starts[1:], starts[-1] + 3.0) + rng.uniform(0, 0.3, count)
+    # The speaker changes at every turn, so turns of one speaker never overlap
+    labels = np.cumsum(rng.integers(1, speakers, count)) % speakers
+    return [{"start": float(s), "end": float(e), "speaker": f"SPEAKER_{label:02d}"}
+            for s, e, label in zip(starts, ends, labels)]
+
+def synthetic_segments(count: int, total_seconds: float, words_per_segment: int, seed: int) -> list:
+    """Back-to-back segments covering ``total_seconds``, optionally split into timed words."""
+    rng = np.random.default_rng(seed)
+    bounds = np.sort(rng.uniform(0, total_seconds, count + 1))
+    segments = []
+    for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        segment = {"id": i, "start": float(start), "end": float(end), "text": f" segment {i}"}
+        if words_per_segment:
+            edges = np.linspace(start, end, words_per_segment + 1)
+            segment["words"] = [{"word": f" w{j}", "start": float(a), "end": float(b)}
+                                for j, (a, b) in enumerate(zip(edges[:-1], edges[1:]))]
+        segments.append(segment)
+    return segments
+
+def midpoint_scan(segments: list, speaker_turns: list) -> list:
+    """The previous assignment: the first turn containing each segment's midpoint."""
+    labels = []
+    for segment in segments:
+        segment_mid = (segment["start"] + segment["end"]) / 2
+        for turn in speaker_turns:
+            if turn["start"] <= segment_mid <= turn["end"]:
+                labels.append(turn["speaker"])
+                break
+        else:
+            labels.append(UNKNOWN_SPEAKER)
+    return labels
+
+def brute_force(segment: dict, starts: np.ndarray, ends: np.ndarray, labels: np.ndarray, names: list) -> str:
+    """Longest-overlapping speaker, summing overlaps over every turn."""
+    overlap = np.clip(np.minimum(ends, segment["end"]) - np.maximum(starts, segment["start"]), 0, None)
+    totals = np.bincount(labels, weights=overlap, minlength=len(names))
+    return names[int(np.argmax(totals))] if totals.max() > 0 else UNKNOWN_SPEAKER
+
+def run(size: int, speakers: int, words_per_segment: int, sample: int, seed: int) -> dict:
+    turns = synthetic_turns(size, speakers, seed)
+    segments = synthetic_segments(size, turns[-1]["end"], words_per_segment, seed + 1)
+
+    start = time.perf_counter()
+    assign_speakers(segments, turns)
+    assign_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = format_speaker_transcript(segments)
+    format_seconds = time.perf_counter() - start
+
+    # Quadratic baseline on a sample of segments, spread over the whole recording
+    sampled = segments[::max(1, len(segments) // sample)][:sample]
+    start = time.perf_counter()
+    midpoint_scan(sampled, turns)
+    scan_seconds = (time.perf_counter() - start) * len(segments) / len(sampled)
+
+    # Turns of one speaker never overlap here, so summing overlaps per turn is exact
+    names = sorted({turn["speaker"] for turn in turns})
+    index = {name: i for i, name in enumerate(names)}
+    turn_starts = np.array([turn["start"] for turn in turns])
+    turn_ends = np.array([turn["end"] for turn in turns])
+    turn_labels = np.array([index[turn["speaker"]] for turn in turns])
+    mismatches = sum(segment["speaker"] != brute_force(segment, turn_starts, turn_ends, turn_labels, names)
+                     for segment in sampled)
+
+    return {
+        "turns": len(turns),
+        "segments": len(segments),
+        "words": len(segments) * words_per_segment,
+        "assign_seconds": assign_seconds,
+        "format_seconds": format_seconds,
+        "midpoint_scan_seconds": scan_seconds,
+        "speedup": scan_seconds / assign_seconds if assign_seconds else None,
+        "transcript_chars": len(text),
+        "checked": len(sampled),
+        "mismatches": mismatches
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark speaker assignment against turn and segment count")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Numbers of turns and of segments (default: 1000 10000 100000)")
+    parser.add_argument("--speakers", type=int, default=8, help="Distinct speakers (default: 8)")
+    parser.add_argument("--words-per-segment", type=int, default=0,
+                        help="Timed words per segment, 0 for segment-level assignment only (default: 0)")
+    parser.add_argument("--sample", type=int, default=200,
+                        help="Segments timed with the old scan and checked by brute force (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = [run(size, args.speakers, args.words_per_segment, args.sample, args.seed) for size in args.sizes]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'Turns':>8} {'Segments':>9} {'Words':>9} {'Assign':>9} {'Format':>9} {'Old scan':>10} "
+          f"{'Speedup':>9} {'Mismatches':>11}")
+    print("-" * 82)
+    for row in rows:
+        print(f"{row['turns']:>8} {row['segments']:>9} {row['words']:>9} {row['assign_seconds']:>8.3f}s "
+              f"{row['format_seconds']:>8.3f}s {row['midpoint_scan_seconds']:>9.1f}s {row['speedup']:>8.0f}x "
+              f"{row['mismatches']:>5}/{row['checked']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Import time and peak RSS of every entry point, with regression thresholds.
+
+Usage:
+    python benchmarks/startup_benchmark.py --max-seconds 1.0 --max-rss-mb 150
+
+Each entry point module is imported in a fresh subprocess, which reports how
+long the import took, its peak RSS and whether a heavy dependency (torch,
+whisper, tqdm) was loaded as a side effect. The lightweight CLI paths
+(``--help`` and ``--list-languages``) are also timed end to end. The script
+exits with status 1 when any entry point exceeds a threshold or imports a
+heavy dependency, so it can guard startup time in CI.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must only be imported once a model is actually needed
+HEAVY_MODULES = ["torch", "whisper", "tqdm"]
+
+# Entry points users start directly
+ENTRY_POINTS = ["transcriber", "app", "transcriber_gui", "subtitle_generator", "web_worker"]
+
+# CLI invocations that should never load a model
+CLI_COMMANDS = [
+    ["transcriber.py", "--help"],
+    ["transcriber.py", "--list-languages"]
+]
+
+# Imported in a child process; prints a JSON report
+IMPORT_SCRIPT = """
+import json, resource, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "heavy_modules": [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+def rss_mb(rss_kb: int) -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return rss_kb / divisor
+
+def measure_import(module: str) -> dict:
+    """Import ``module`` in a fresh interpreter and return its report."""
+    script = IMPORT_SCRIPT.format(root=REPO_ROOT, module=module, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        return {"name": f"import {module}", "error": error[-1] if error else "import failed"}
+
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {
+        "name": f"import {module}",
+        "seconds": report["seconds"],
+        "peak_rss_mb": rss_mb(report["peak_rss_kb"]),
+        "heavy_modules": report["heavy_modules"]
+    }
+
+def measure_command(command: list) -> dict:
+    """Run a CLI command end to end and return its wall time."""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable] + command, cwd=REPO_ROOT, capture_output=True, text=True)
+    row = {"name": " ".join(command), "seconds": time.perf_counter() - start}
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()
+        row["error"] = error[-1] if error else f"exit status {completed.returncode}"
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark entry point startup time and memory")
+    parser.add_argument("--max-seconds", type=float, default=1.0,
+                        help="Fail when an import or CLI command takes longer than this (default: 1.0)")
+    parser.add_argument("--max-rss-mb", type=float, default=150,
+                        help="Fail when importing an entry point peaks above this RSS (default: 150)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = [measure_import(module) for module in ENTRY_POINTS]
+    rows += [measure_command(command) for command in CLI_COMMANDS]
+
+    # Collect threshold violations
+    for row in rows:
+        problems = []
+        if "error" in row:
+            problems.append(row["error"])
+        if row.get("seconds", 0) > args.max_seconds:
+            problems.append(f"took {row['seconds']:.2f}s (limit {args.max_seconds:.2f}s)")
+        if row.get("peak_rss_mb", 0) > args.max_rss_mb:
+            problems.append(f"peak RSS {row['peak_rss_mb']:.0f} MB (limit {args.max_rss_mb:.0f} MB)")
+        if row.get("heavy_modules"):
+            problems.append(f"imports {', '.join(row['heavy_modules'])}")
+        row["problems"] = problems
+
+    failed = [row for row in rows if row["problems"]]
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"\n{'Entry point':<36} {'Seconds':>8} {'Peak RSS':>9}  Status")
+        print("-" * 70)
+        for row in rows:
+            rss = f"{row['peak_rss_mb']:.0f} MB" if "peak_rss_mb" in row else "-"
+            status = "; ".join(row["problems"]) or "ok"
+            print(f"{row['name']:<36} {row.get('seconds', 0):>8.3f} {rss:>9}  {status}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
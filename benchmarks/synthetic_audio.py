@@ -0,0 +1,26 @@
+"""Deterministic speech-like test audio shared by the benchmarks."""
+
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+def synthetic_speech(seconds: float, seed: int) -> np.ndarray:
+    """Generate deterministic speech-like audio: voiced bursts separated by pauses."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 110 + 40 * rng.random()
+    voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    # Syllable-rate envelope (about 4 Hz) gated by random pauses
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t), 0, None)
+    gate = np.repeat(rng.random(int(seconds) + 1) > 0.25, SAMPLE_RATE)[:len(t)]
+    noise = 0.01 * rng.standard_normal(len(t))
+    return (0.3 * voiced * envelope * gate + noise).astype(np.float32)
+
+def write_wav(path: str, audio: np.ndarray) -> None:
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
@@ -1,40 +1,186 @@
+import inspect
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
 import numpy as np
 import torch
 from pyannote.audio import Pipeline
-from pydub import AudioSegment
-import whisper
 
-def transcribe_with_diarization(audio_file, model_size="base", num_speakers=None):
+from audio_utils import SAMPLE_RATE, ensure_audio
+from model_registry import get_model
+from speaker_assignment import assign_speakers, format_speaker_transcript
+from transcript_artifact import ARTIFACT_SUFFIX, save_artifact
+from tracing import DIARIZATION, MODEL_LOAD, TRANSCRIBE, active_tracer, span, tracing
+
+# Speech per speaker used for a voice embedding when the pipeline cannot return its own
+EMBEDDING_MAX_SECONDS = 60
+
+# Loaded once per process and reused by every call (inference is serialized)
+_pipeline = None
+_embedding_inference = None
+_load_lock = threading.Lock()
+_inference_lock = threading.Lock()
+
+def split_threads(total: int = None) -> Tuple[int, int]:
+    """Split torch's CPU threads between transcription and diarization running side by side.
+
+    Whisper gets the odd thread out, as its decoder is usually the longer stage.
+    """
+    total = total or torch.get_num_threads()
+    diarization_threads = max(1, total // 2)
+    return max(1, total - diarization_threads), diarization_threads
+
+def load_diarization_pipeline():
+    """Load the pyannote speaker diarization pipeline."""
+    # Note: You need to get access to pyannote/speaker-diarization on HuggingFace
+    # and set HUGGINGFACE_TOKEN environment variable
+    return Pipeline.from_pretrained(
+        "pyannote/speaker-diarization@2.1",
+        use_auth_token=os.environ.get("HUGGINGFACE_TOKEN")
+    )
+
+def get_diarization_pipeline():
+    """Return the process-wide diarization pipeline, loading it on first use."""
+    global _pipeline
+    with _load_lock:
+        if _pipeline is None:
+            print("Loading diarization pipeline...")
+            with span(MODEL_LOAD, model="pyannote/speaker-diarization"):
+                _pipeline = load_diarization_pipeline()
+        return _pipeline
+
+def get_embedding_inference():
+    """Return the process-wide speaker embedding model, loading it on first use."""
+    global _embedding_inference
+    with _load_lock:
+        if _embedding_inference is None:
+            from pyannote.audio import Inference, Model
+            with span(MODEL_LOAD, model="pyannote/embedding"):
+                model = Model.from_pretrained("pyannote/embedding", use_auth_token=os.environ.get("HUGGINGFACE_TOKEN"))
+                _embedding_inference = Inference(model, window="whole")
+        return _embedding_inference
+
+def speaker_embeddings(audio: np.ndarray, diarization) -> Dict[str, np.ndarray]:
+    """One voice embedding per speaker label, from up to a minute of that speaker's longest turns."""
+    inference = get_embedding_inference()
+    embeddings = {}
+    for label in diarization.labels():
+        turns = sorted(diarization.label_timeline(label), key=lambda turn: -turn.duration)
+        pieces = []
+        remaining = EMBEDDING_MAX_SECONDS * SAMPLE_RATE
+        for turn in turns:
+            piece = audio[int(turn.start * SAMPLE_RATE):int(turn.end * SAMPLE_RATE)][:remaining]
+            pieces.append(piece)
+            remaining -= len(piece)
+            if remaining <= 0:
+                break
+        speech = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+        embeddings[label] = np.asarray(inference({
+            "waveform": torch.from_numpy(speech).unsqueeze(0),
+            "sample_rate": SAMPLE_RATE
+        }))
+    return embeddings
+
+def diarize(audio: np.ndarray, num_speakers=None, threads: int = None, tracer=None, return_embeddings=False):
+    """Run diarization on a decoded 16 kHz waveform with the shared pipeline.
+
+    With ``threads`` torch's thread count is set first. torch applies it to
+    the calling thread but also stores it process-wide for every thread that
+    initialises later, so only pass it at the start of a thread of its own
+    (as :func:`transcribe_with_diarization` does). With
+    ``return_embeddings`` a ``{label: embedding}`` dict of the speakers'
+    voices is returned as well.
+    """
+    if threads:
+        torch.set_num_threads(threads)
+    
+    with tracing(tracer):
+        diarization_pipeline = get_diarization_pipeline()
+        
+        print("Performing speaker diarization...")
+        # Run diarization on the in-memory waveform (shares memory with the numpy array)
+        waveform = {
+            "waveform": torch.from_numpy(audio).unsqueeze(0),
+            "sample_rate": SAMPLE_RATE
+        }
+        with span(DIARIZATION), _inference_lock:
+            if not return_embeddings:
+                return diarization_pipeline(waveform, num_speakers=num_speakers)
+            
+            # pyannote.audio 3 returns the centroid of every cluster it found
+            if "return_embeddings" in inspect.signature(diarization_pipeline.apply).parameters:
+                diarization, centroids = diarization_pipeline(waveform, num_speakers=num_speakers,
+                                                              return_embeddings=True)
+                return diarization, dict(zip(diarization.labels(), centroids))
+            
+            diarization = diarization_pipeline(waveform, num_speakers=num_speakers)
+            return diarization, speaker_embeddings(audio, diarization)
+
+def _transcribe(audio: np.ndarray, model_size: str, word_timestamps: bool, threads: int = None, tracer=None) -> dict:
+    """Transcribe a decoded waveform with the shared Whisper model (``threads`` as in :func:`diarize`)."""
+    if threads:
+        torch.set_num_threads(threads)
+    
+    with tracing(tracer):
+        print("Loading Whisper model...")
+        whisper_model = get_model(model_size)
+        
+        print("Transcribing audio...")
+        with span(TRANSCRIBE, audio_seconds=len(audio) / SAMPLE_RATE):
+            return whisper_model.transcribe(audio, word_timestamps=word_timestamps)
+
+def transcribe_with_diarization(audio_file, model_size="base", num_speakers=None, concurrent=True,
+                                word_timestamps=False, speaker_registry=None):
     """
     Transcribe audio with speaker diarization.
     
+    The audio is decoded once and both stages read the same waveform. By
+    default diarization (including loading its pipeline on first use) and
+    whisper run in two fresh threads, each setting its share of torch's CPU
+    threads once as it starts, so the wall time approaches the longer of the
+    two stages instead of their sum. torch releases the GIL inside its
+    kernels, so the threads do run in parallel. The calling thread's own
+    thread count is left alone.
+    
     Args:
-        audio_file: Path to audio file
+        audio_file: Path to audio file or a decoded 16 kHz waveform
         model_size: Whisper model size
         num_speakers: Number of speakers (if known)
+        concurrent: Run transcription and diarization side by side (False runs them one after the other)
+        word_timestamps: Align words so speakers are assigned per word, splitting segments at speaker changes
+        speaker_registry: A ``speaker_registry.SpeakerRegistry``; speakers are named after the known voices
+            they match, and new voices are enrolled, so names stay the same across files
         
     Returns:
         Transcription with speaker labels
     """
-    print("Loading diarization pipeline...")
-    # Note: You need to get access to pyannote/speaker-diarization on HuggingFace
-    # and set HUGGINGFACE_TOKEN environment variable
-    diarization_pipeline = Pipeline.from_pretrained(
-        "pyannote/speaker-diarization@2.1",
-        use_auth_token=os.environ.get("HUGGINGFACE_TOKEN")
-    )
-    
-    print("Loading Whisper model...")
-    whisper_model = whisper.load_model(model_size)
+    # Decode once and share the waveform between whisper and pyannote
+    audio = ensure_audio(audio_file)
     
-    print("Transcribing audio...")
-    result = whisper_model.transcribe(audio_file)
+    if concurrent:
+        asr_threads, diarization_threads = split_threads()
+        # Fresh threads per call, so each sets its thread count before running anything
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix="diarization") as executor:
+            diarization_future = executor.submit(diarize, audio, num_speakers, diarization_threads, active_tracer(),
+                                                 speaker_registry is not None)
+            transcription_future = executor.submit(_transcribe, audio, model_size, word_timestamps, asr_threads,
+                                                   active_tracer())
+            result = transcription_future.result()
+            diarization = diarization_future.result()
+    else:
+        result = _transcribe(audio, model_size, word_timestamps, tracer=active_tracer())
+        diarization = diarize(audio, num_speakers, tracer=active_tracer(),
+                              return_embeddings=speaker_registry is not None)
     segments = result["segments"]
     
-    print("Performing speaker diarization...")
-    # Run diarization
-    diarization = diarization_pipeline(audio_file, num_speakers=num_speakers)
+    # Replace the per-file labels with the registry's names for the same voices
+    speaker_names = {}
+    if speaker_registry is not None:
+        diarization, embeddings = diarization
+        source = audio_file if isinstance(audio_file, str) else None
+        speaker_names = speaker_registry.identify(embeddings, source=source)
     
     # Convert diarization to speaker turns with timestamps
     speaker_turns = []
@@ -42,39 +188,25 @@ def transcribe_with_diarization(audio_file, model_size="base", num_speakers=None
         speaker_turns.append({
             "start": turn.start,
             "end": turn.end,
-            "speaker": speaker
+            "speaker": speaker_names.get(speaker, speaker)
         })
     
-    # Assign speakers to transcription segments
-    for segment in segments:
-        segment_mid = (segment["start"] + segment["end"]) / 2
-        # Find the speaker active at the middle of this segment
-        for turn in speaker_turns:
-            if turn["start"] <= segment_mid <= turn["end"]:
-                segment["speaker"] = turn["speaker"]
-                break
-        else:
-            segment["speaker"] = "UNKNOWN"
-    
-    # Format the final transcription with speaker labels
-    transcript_with_speakers = ""
-    current_speaker = None
-    
-    for segment in segments:
-        if segment["speaker"] != current_speaker:
-            current_speaker = segment["speaker"]
-            transcript_with_speakers += f"\n[{current_speaker}]: "
-        
-        transcript_with_speakers += segment["text"] + " "
+    # Label segments (and words, if timestamped) with the speaker overlapping them the longest
+    assign_speakers(segments, speaker_turns)
     
     return {
-        "text": transcript_with_speakers.strip(),
+        "text": format_speaker_transcript(segments),
         "segments": segments,
-        "speaker_turns": speaker_turns
+        "speaker_turns": speaker_turns,
+        "speaker_names": speaker_names
     }
 
 def save_diarized_transcription(result, output_file):
-    """Save transcription with speaker labels."""
+    """Save transcription with speaker labels.
+
+    Next to the text, the segments and speaker turns are written as JSON
+    and as a compact ``.transcript`` artifact (see ``transcript_artifact``).
+    """
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(result["text"])
     
@@ -82,11 +214,15 @@ def save_diarized_transcription(result, output_file):
     import json
     json_output = output_file.replace(".txt", "_detailed.json")
     with open(json_output, 'w', encoding='utf-8') as f:
-        json.dump({
+        # One compact dumps() call uses the C encoder; json.dump would write piece by piece
+        f.write(json.dumps({
             "segments": result["segments"],
             "speaker_turns": result["speaker_turns"]
-        }, f, indent=2)
+        }, ensure_ascii=False, separators=(",", ":")))
+    
+    artifact_output = save_artifact(result, os.path.splitext(output_file)[0] + ARTIFACT_SUFFIX)
     
     print(f"Saved diarized transcription to {output_file}")
     print(f"Saved detailed segment data to {json_output}")
+    print(f"Saved transcript artifact to {artifact_output}")
 
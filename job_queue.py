@@ -0,0 +1,330 @@
+"""Bounded job queue served by a pool of inference worker processes.
+
+The web app submits jobs to a :class:`JobScheduler` instead of starting a
+thread per upload. A fixed number of worker processes pull jobs from a
+queue and keep their models loaded between jobs, so a burst of uploads
+queues up instead of loading one model per request. Workers report
+progress back through an event queue that a listener thread in the parent
+applies to the caller's job records.
+
+The parent hands each job to one idle worker through that worker's own
+task queue, so it always knows which job a worker holds: when a worker
+dies, even before it reported the job as started, that job is failed and
+its queue slot freed. Events carry the generation of the worker process
+that sent them, so late events of a dead worker are never credited to its
+replacement. A worker whose initializer keeps crashing is restarted with
+an exponential backoff.
+
+Live streams run in the same workers as sessions: a session takes an idle
+worker for its whole length, the parent forwards the stream's audio down
+that worker's task queue, and the events the worker reports are handed to
+the caller through a per-session queue instead of ``on_update``.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Set
+
+# Seconds the listener waits for an event before checking worker health
+LISTENER_POLL_SECONDS = 1.0
+
+# Delay before restarting a worker that died before becoming ready, doubled per consecutive failure
+RESPAWN_BACKOFF_SECONDS = 1.0
+RESPAWN_MAX_BACKOFF_SECONDS = 60.0
+
+def _worker_main(worker_id: int, generation: int, handler: Callable, session_handler: Optional[Callable],
+                 task_queue, event_queue, initializer: Optional[Callable]) -> None:
+    """Run jobs and live sessions from ``task_queue`` until a ``None`` sentinel arrives."""
+    if initializer is not None:
+        initializer()
+    event_queue.put(("ready", None, worker_id, generation, {}))
+    stopping = False
+
+    def session_audio(session_id: str):
+        """Audio chunks of a live session, up to its end-of-stream marker."""
+        nonlocal stopping
+        while True:
+            task = task_queue.get()
+            if task is None:
+                stopping = True
+                return
+            kind, task_id, data = task
+            if kind == "audio" and task_id == session_id:
+                if data is None:
+                    return
+                yield data
+
+    while not stopping:
+        task = task_queue.get()
+        if task is None:
+            break
+        kind, job_id, payload = task
+        # Audio left over from a session that ended early
+        if kind == "audio":
+            continue
+
+        def report(fields: dict, job_id=job_id) -> None:
+            event_queue.put(("update", job_id, worker_id, generation, fields))
+
+        if kind == "session":
+            try:
+                session_handler(job_id, payload, session_audio(job_id), report)
+            except Exception as e:
+                report({'type': 'error', 'error': str(e)})
+        else:
+            event_queue.put(("started", job_id, worker_id, generation, {'status': 'processing'}))
+            try:
+                handler(job_id, payload, report)
+            except Exception as e:
+                report({'status': 'failed', 'error': str(e)})
+        event_queue.put(("finished", job_id, worker_id, generation, {}))
+
+class JobScheduler:
+    """Bounded FIFO of jobs executed by a pool of worker processes."""
+
+    def __init__(self, handler: Callable, on_update: Callable[[str, dict], None],
+                 num_workers: int = 1, max_queue_size: int = 20, initializer: Optional[Callable] = None,
+                 session_handler: Optional[Callable] = None):
+        """
+        Args:
+            handler: Top-level function ``handler(job_id, payload, report)`` run in a worker
+            on_update: Called in the parent with ``(job_id, fields)`` for every job update
+            num_workers: Number of inference worker processes
+            max_queue_size: Jobs waiting beyond this are rejected by :meth:`submit`
+            initializer: Optional top-level function run once in each worker (e.g. preloading)
+            session_handler: Optional top-level function ``session_handler(session_id, payload, chunks, report)``
+                run in a worker for each live session opened with :meth:`open_session`
+        """
+        self.handler = handler
+        self.session_handler = session_handler
+        self.on_update = on_update
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.initializer = initializer
+
+        # Spawn keeps workers independent of the threads running in the web server
+        self._context = multiprocessing.get_context("spawn")
+        self._event_queue = self._context.Queue()
+        self._workers: Dict[int, multiprocessing.Process] = {}
+        # Each worker process has its own task queue and a generation that grows with every restart
+        self._task_queues: Dict[int, object] = {}
+        self._generations: Dict[int, int] = {}
+        # Workers whose current process finished its initializer, and those of them without a job
+        self._ready: Set[int] = set()
+        self._idle: Set[int] = set()
+        # Job handed to each busy worker, recorded when it is dispatched
+        self._running_jobs: Dict[int, str] = {}
+        # Jobs not dispatched yet, in order, with their payloads
+        self._pending = deque()
+        self._payloads: Dict[str, dict] = {}
+        # Consecutive deaths before becoming ready, and when a dead worker is restarted
+        self._failures: Dict[int, int] = {}
+        self._respawn_at: Dict[int, float] = {}
+        # Event queue of every live session, until its worker finishes it; sessions still sending audio
+        self._sessions: Dict[str, queue.Queue] = {}
+        self._streaming: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._started = False
+        self._stopping = False
+
+    def start(self) -> None:
+        """Start the worker processes and the event listener (idempotent)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for worker_id in range(self.num_workers):
+                self._spawn_worker(worker_id)
+
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+
+    def _spawn_worker(self, worker_id: int) -> None:
+        """Start (or restart) a worker process with a fresh task queue; called with the lock held."""
+        # A fresh queue, so a task sent to a dead process is never picked up by its replacement
+        self._task_queues[worker_id] = self._context.Queue()
+        self._generations[worker_id] = self._generations.get(worker_id, -1) + 1
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self._generations[worker_id], self.handler, self.session_handler,
+                  self._task_queues[worker_id], self._event_queue, self.initializer),
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = process
+
+    def _dispatch(self) -> None:
+        """Hand waiting jobs to idle workers; called with the lock held."""
+        while self._idle and self._pending and not self._stopping:
+            worker_id = min(self._idle)
+            self._idle.discard(worker_id)
+            job_id = self._pending.popleft()
+            self._running_jobs[worker_id] = job_id
+            self._task_queues[worker_id].put(("job", job_id, self._payloads.pop(job_id)))
+
+    def submit(self, job_id: str, payload: dict) -> bool:
+        """Queue a job; returns False when the queue is full."""
+        with self._lock:
+            if len(self._pending) >= self.max_queue_size:
+                return False
+            self._pending.append(job_id)
+            self._payloads[job_id] = payload
+            self._dispatch()
+        return True
+
+    def open_session(self, session_id: str, payload: dict) -> Optional[queue.Queue]:
+        """Start a live session on an idle worker.
+
+        Returns the queue its events arrive on, ending with ``None`` once the
+        worker is done with it, or None when every worker is busy.
+        """
+        with self._lock:
+            if not self._idle or self._stopping:
+                return None
+            worker_id = min(self._idle)
+            self._idle.discard(worker_id)
+            self._running_jobs[worker_id] = session_id
+            self._sessions[session_id] = events = queue.Queue()
+            self._streaming[session_id] = worker_id
+            self._task_queues[worker_id].put(("session", session_id, payload))
+        return events
+
+    def send_audio(self, session_id: str, data: Optional[bytes]) -> bool:
+        """Forward a chunk of a live session's stream (``None`` ends it); False once the session is over."""
+        with self._lock:
+            worker_id = self._streaming.get(session_id)
+            if worker_id is None:
+                return False
+            if data is None:
+                del self._streaming[session_id]
+            self._task_queues[worker_id].put(("audio", session_id, data))
+        return True
+
+    def close_session(self, session_id: str) -> None:
+        """End a live session's stream if it is still open (e.g. when the client disconnects)."""
+        self.send_audio(session_id, None)
+
+    def live_sessions(self) -> int:
+        """Number of workers currently running a live session."""
+        with self._lock:
+            return len(self._sessions)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position of a job that is still waiting, or None."""
+        with self._lock:
+            try:
+                return self._pending.index(job_id) + 1
+            except ValueError:
+                return None
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        with self._lock:
+            return len(self._pending)
+
+    def active_workers(self) -> int:
+        """Number of workers currently running a job or a live session."""
+        with self._lock:
+            return len(self._running_jobs)
+
+    def worker_pids(self) -> Dict[int, int]:
+        """Process id of every worker, keyed by worker id."""
+        with self._lock:
+            return {worker_id: process.pid for worker_id, process in self._workers.items()}
+
+    def is_full(self) -> bool:
+        with self._lock:
+            return len(self._pending) >= self.max_queue_size
+
+    def _listen(self) -> None:
+        """Apply worker events to job records and replace crashed workers."""
+        last_check = time.monotonic()
+        while True:
+            if time.monotonic() - last_check >= LISTENER_POLL_SECONDS:
+                self._check_workers()
+                last_check = time.monotonic()
+
+            try:
+                kind, job_id, worker_id, generation, fields = self._event_queue.get(timeout=LISTENER_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                # Late events of a process that has died (and whose job was failed) are dropped
+                if generation != self._generations.get(worker_id) or worker_id in self._respawn_at:
+                    continue
+                if kind == "ready":
+                    self._ready.add(worker_id)
+                    self._idle.add(worker_id)
+                    self._failures[worker_id] = 0
+                elif kind == "finished":
+                    self._running_jobs.pop(worker_id, None)
+                    self._idle.add(worker_id)
+                    self._end_session(job_id)
+                elif job_id in self._sessions:
+                    self._sessions[job_id].put(fields)
+                    continue
+                self._dispatch()
+
+            if fields:
+                self.on_update(job_id, fields)
+
+    def _end_session(self, session_id: str, error: Optional[str] = None) -> None:
+        """Close a live session's event queue; called with the lock held."""
+        self._streaming.pop(session_id, None)
+        events = self._sessions.pop(session_id, None)
+        if events is not None:
+            if error:
+                events.put({'type': 'error', 'error': error})
+            events.put(None)
+
+    def _check_workers(self) -> None:
+        """Fail the job of any worker that died and restart it, backing off if it dies during start-up."""
+        now = time.monotonic()
+        lost_jobs = []
+        with self._lock:
+            if self._stopping:
+                return
+            for worker_id, process in self._workers.items():
+                if worker_id in self._respawn_at or process.is_alive():
+                    continue
+                job_id = self._running_jobs.pop(worker_id, None)
+                if job_id in self._sessions:
+                    self._end_session(job_id, 'Worker process exited unexpectedly')
+                else:
+                    lost_jobs.append(job_id)
+                self._idle.discard(worker_id)
+                delay = 0.0
+                if worker_id not in self._ready:
+                    # Died in its initializer: retry later, waiting longer every time
+                    self._failures[worker_id] = self._failures.get(worker_id, 0) + 1
+                    delay = min(RESPAWN_BACKOFF_SECONDS * 2 ** (self._failures[worker_id] - 1),
+                                RESPAWN_MAX_BACKOFF_SECONDS)
+                    print(f"Inference worker {worker_id} exited during start-up "
+                          f"(exit code {process.exitcode}); restarting in {delay:.0f}s")
+                self._ready.discard(worker_id)
+                self._respawn_at[worker_id] = now + delay
+
+            for worker_id, respawn_at in list(self._respawn_at.items()):
+                if respawn_at <= now:
+                    del self._respawn_at[worker_id]
+                    self._spawn_worker(worker_id)
+
+        for job_id in lost_jobs:
+            if job_id is not None:
+                self.on_update(job_id, {'status': 'failed', 'error': 'Worker process exited unexpectedly'})
+
+    def shutdown(self) -> None:
+        """Ask every worker to exit after its current job."""
+        with self._lock:
+            self._stopping = True
+        for task_queue in self._task_queues.values():
+            task_queue.put(None)
+        for process in self._workers.values():
+            process.join()
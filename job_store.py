@@ -0,0 +1,341 @@
+"""Persistent job records for the web app, with scheduled cleanup.
+
+Job records live in a SQLite database instead of a dict in the Flask
+process, so they survive restarts and every web process on the host sees
+the same jobs. The database runs in WAL mode, which lets readers proceed
+while a worker's progress update is being written, and each update is a
+short read-modify-write transaction. Lookups go through the primary key,
+and an index on (status, creation time) serves the per-status counts and
+lets the sweeper find the oldest finished jobs without scanning or sorting
+the table.
+
+Threads serving progress streams and long polls block in :meth:`JobStore.wait`
+until a job changes. Updates made through the same store wake them at once;
+updates written by other processes are picked up by a short re-read.
+
+A :class:`JobSweeper` thread periodically deletes expired jobs together
+with their uploads, transcripts and traces, a bounded batch at a time, so
+cleanup never holds the database or the disk for long.
+"""
+
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+# Default database location
+DEFAULT_DB_PATH = "jobs.sqlite"
+
+# Finished jobs and their files are deleted after this many hours
+JOB_TTL_HOURS = float(os.environ.get("TRANSCRIBER_JOB_TTL_HOURS", 24))
+
+# Seconds between re-reads of a job while waiting for updates from other processes
+CHANGE_POLL_SECONDS = 2.0
+
+# Seconds between sweeps, and jobs or files removed per batch
+SWEEP_INTERVAL_SECONDS = 600
+SWEEP_BATCH_SIZE = 500
+
+# Statuses of jobs that will not change any more
+FINISHED_STATUSES = ('completed', 'failed')
+
+# Temporary files left by a crashed export (".<job id>.<hex>.<ext>", see temp_export_base) or a
+# crashed transcript_artifact.save_artifact (".artifact-*"); any other dot-file is left alone
+TEMP_FILE_PATTERN = re.compile(r"\.(?:[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}\.[0-9a-f]{32}\.|artifact-)")
+
+# Job fields that name files owned by the job
+FILE_FIELDS = ('file_path', 'result_file', 'trace_file', 'artifact_file')
+
+# When this process started; its own jobs from before then belong to an earlier process with the same pid
+PROCESS_STARTED = time.time()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner_pid INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created_at ON jobs (status, created_at);
+"""
+
+class JobChanges:
+    """Wakes threads waiting for a job record to be updated in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, List[threading.Event]] = {}
+
+    def subscribe(self, job_id: str) -> threading.Event:
+        """Event set by the next :meth:`notify` for ``job_id``."""
+        event = threading.Event()
+        with self._lock:
+            self._waiters.setdefault(job_id, []).append(event)
+        return event
+
+    def unsubscribe(self, job_id: str, event: threading.Event) -> None:
+        with self._lock:
+            waiters = self._waiters.get(job_id)
+            if waiters and event in waiters:
+                waiters.remove(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    def notify(self, job_id: str) -> None:
+        with self._lock:
+            waiters = self._waiters.pop(job_id, [])
+        for event in waiters:
+            event.set()
+
+class JobStore:
+    """Job records keyed by job id, shared by every process using ``path``."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # Wait for other processes' write transactions instead of failing
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self.changes = JobChanges()
+
+    def create(self, job: dict) -> None:
+        """Insert a new job record; ``job`` must have ``id``, ``status`` and ``created_at``."""
+        job = {**job, 'updated_at': time.time()}
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, owner_pid, data) VALUES (?, ?, ?, ?, ?, ?)",
+                (job['id'], job['status'], job['created_at'], job['updated_at'], os.getpid(), json.dumps(job))
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """The job record, or None for an unknown (or expired) job."""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, fields: dict) -> Optional[dict]:
+        """Merge ``fields`` into a job record and return the updated record."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row is None:
+                    self._db.execute("ROLLBACK")
+                    return None
+                job = json.loads(row[0])
+                job.update(fields)
+                # Strictly increasing, so waiters can tell an update happened after the version they saw
+                job['updated_at'] = max(time.time(), job.get('updated_at', 0) + 1e-6)
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, updated_at = ?, data = ? WHERE id = ?",
+                    (job['status'], job['updated_at'], json.dumps(job), job_id)
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        self.changes.notify(job_id)
+        return job
+
+    def wait(self, job_id: str, since: float, timeout: float) -> Optional[dict]:
+        """Return the job once it was updated after ``since`` (its ``updated_at``) or has finished.
+
+        Returns the current record when ``timeout`` seconds pass without an
+        update, and None for an unknown job.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            # Subscribe before reading, so an update in between is not missed
+            event = self.changes.subscribe(job_id)
+            try:
+                job = self.get(job_id)
+                if job is None or job['updated_at'] > since or job['status'] in FINISHED_STATUSES:
+                    return job
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return job
+                event.wait(min(remaining, CHANGE_POLL_SECONDS))
+            finally:
+                self.changes.unsubscribe(job_id, event)
+
+    def delete(self, job_ids: Iterable[str]) -> None:
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._lock:
+            self._db.execute(f"DELETE FROM jobs WHERE id IN ({','.join('?' * len(job_ids))})", job_ids)
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def expired(self, before: float, limit: int = SWEEP_BATCH_SIZE) -> List[dict]:
+        """Finished jobs created before ``before``, oldest first per status, at most ``limit`` of them."""
+        rows = []
+        with self._lock:
+            # One index range scan per status
+            for status in FINISHED_STATUSES:
+                rows += self._db.execute(
+                    "SELECT data FROM jobs WHERE status = ? AND created_at < ? ORDER BY created_at LIMIT ?",
+                    (status, before, limit - len(rows))
+                ).fetchall()
+                if len(rows) >= limit:
+                    break
+        return [json.loads(row[0]) for row in rows]
+
+    def unfinished(self) -> List[tuple]:
+        """``(owning process id, job)`` for every queued or running job."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT owner_pid, data FROM jobs WHERE status NOT IN ({','.join('?' * len(FINISHED_STATUSES))})",
+                FINISHED_STATUSES
+            ).fetchall()
+        return [(owner_pid, json.loads(data)) for owner_pid, data in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to another user
+        return True
+    return True
+
+def remove_path(path: str) -> None:
+    """Delete a file, or a directory such as a transcript artifact."""
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.remove(path)
+
+def remove_job_files(job: dict) -> None:
+    """Delete the upload, transcript, artifact and trace of a job, ignoring missing files."""
+    for field in FILE_FIELDS:
+        path = job.get(field)
+        if path:
+            try:
+                remove_path(path)
+            except OSError:
+                pass
+
+def temp_export_base(directory: str, job_id: str) -> str:
+    """Unique base path for exporting a job's result before it is renamed into place."""
+    return os.path.join(directory, f".{job_id}.{uuid.uuid4().hex}")
+
+class JobSweeper:
+    """Background thread that expires old jobs and the files they left behind."""
+
+    def __init__(self, store: JobStore, directories: Iterable[str] = (), ttl_hours: float = JOB_TTL_HOURS,
+                 interval: float = SWEEP_INTERVAL_SECONDS, batch_size: int = SWEEP_BATCH_SIZE):
+        """
+        Args:
+            store: Job records to expire
+            directories: Upload and result folders; files older than the TTL are removed from them
+            ttl_hours: Age after which finished jobs and their files are deleted
+            interval: Seconds between sweeps
+            batch_size: Jobs or files removed per batch
+        """
+        self.store = store
+        self.directories = list(directories)
+        self.ttl_seconds = ttl_hours * 3600
+        self.interval = interval
+        self.batch_size = batch_size
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start sweeping in the background (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Job sweep failed: {e}")
+            if self._stop.wait(self.interval):
+                break
+
+    def sweep(self) -> int:
+        """Run one sweep and return the number of jobs deleted."""
+        self.fail_interrupted()
+        cutoff = time.time() - self.ttl_seconds
+
+        deleted = 0
+        while not self._stop.is_set():
+            batch = self.store.expired(cutoff, self.batch_size)
+            for job in batch:
+                remove_job_files(job)
+            self.store.delete(job['id'] for job in batch)
+            deleted += len(batch)
+            if len(batch) < self.batch_size:
+                break
+
+        self.remove_orphaned_files(cutoff)
+        return deleted
+
+    def fail_interrupted(self) -> None:
+        """Fail queued or running jobs whose web process no longer exists (e.g. after a restart)."""
+        for owner_pid, job in self.store.unfinished():
+            stale = owner_pid == os.getpid() and job['created_at'] < PROCESS_STARTED
+            if stale or not _process_alive(owner_pid):
+                self.store.update(job['id'], {'status': 'failed', 'error': 'Server restarted before the job finished'})
+
+    def remove_orphaned_files(self, cutoff: float) -> None:
+        """Delete files older than ``cutoff`` left without a job record, a batch per directory.
+
+        Covers uploads and results from before the job store existed or from
+        jobs whose record was lost, and temporary files of crashed exports.
+        Files of jobs still running are kept.
+        """
+        in_use = {os.path.abspath(job[field]) for _, job in self.store.unfinished()
+                  for field in FILE_FIELDS if job.get(field)}
+        for directory in self.directories:
+            removed = 0
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    if removed >= self.batch_size or self._stop.is_set():
+                        break
+                    if entry.name.startswith('.') and not TEMP_FILE_PATTERN.match(entry.name):
+                        continue
+                    if os.path.abspath(entry.path) in in_use:
+                        continue
+                    try:
+                        if ((entry.is_file() or entry.is_dir(follow_symlinks=False)) and
+                                entry.stat().st_mtime < cutoff):
+                            remove_path(entry.path)
+                            removed += 1
+                    except OSError:
+                        pass
@@ -0,0 +1,198 @@
+"""Live transcription of an audio stream with a sliding window.
+
+Audio arrives as raw 16 kHz mono 16-bit PCM (or as an encoded stream that
+one ffmpeg process decodes as it arrives, see ``audio_utils.decode_stream``)
+and is appended to a buffer once; nothing is re-decoded. Every
+``step_seconds`` of new audio the model transcribes the buffered audio that
+has not been finalised yet, so consecutive windows overlap on the still
+uncertain tail.
+
+Each pass produces events:
+
+- ``final``: a segment that will not change any more. A segment becomes
+  final once two consecutive passes agree on it and it is not the last one
+  in the window (which may be cut off mid-word). Its audio is dropped from
+  the buffer and its text becomes the prompt of later windows, so the
+  decoder keeps its context across windows.
+- ``partial``: the current guess for the rest of the buffer, replaced by the
+  next partial (empty when everything so far is final).
+
+When the buffer approaches whisper's 30-second context all but its last
+segment are finalised, so latency and per-pass cost stay bounded however
+long the stream runs.
+"""
+
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from audio_utils import SAMPLE_RATE, WINDOW_SECONDS, decode_stream, pcm16_to_float
+from transcriber import PROMPT_CONTEXT_CHARS, carry_window_context
+from tracing import TRANSCRIBE, span
+
+# Seconds of new audio between transcription passes
+STEP_SECONDS = 2.0
+
+# Longest buffer transcribed in one pass (whisper's context size)
+MAX_WINDOW_SECONDS = WINDOW_SECONDS
+
+# Audio kept when a buffer holding no speech is trimmed
+SILENCE_KEEP_SECONDS = 1.0
+
+# Input format of raw 16 kHz mono little-endian 16-bit PCM
+PCM_FORMAT = "pcm"
+
+# Decoding options favouring latency over accuracy: no temperature fallback
+LIVE_OPTIONS = {"temperature": 0.0}
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+class SharedModel:
+    """Borrow a registry model for one pass at a time, so live sessions and jobs sharing it interleave."""
+
+    def __init__(self, model_size: str, registry=None):
+        if registry is None:
+            from model_registry import registry
+        self.model_size = model_size
+        self.registry = registry
+
+    def transcribe(self, audio, **options):
+        with self.registry.use(self.model_size) as model:
+            return model.transcribe(audio, **options)
+
+class LiveTranscriber:
+    """Turns a stream of audio into partial and final segments."""
+
+    def __init__(self, model, language: Optional[str] = None, step_seconds: float = STEP_SECONDS,
+                 max_window_seconds: float = MAX_WINDOW_SECONDS, transcribe_options: Optional[dict] = None):
+        """
+        Args:
+            model: Anything with a whisper-like ``transcribe`` method
+            language: Language code, or None / 'auto' to detect it from the first pass
+            step_seconds: Seconds of new audio between passes; lower means lower latency and more compute
+            max_window_seconds: Longest buffer transcribed in one pass
+            transcribe_options: Extra options for ``model.transcribe``
+        """
+        self.model = model
+        self.step_samples = int(step_seconds * SAMPLE_RATE)
+        self.max_window_samples = int(max_window_seconds * SAMPLE_RATE)
+        self.options = {**LIVE_OPTIONS, **(transcribe_options or {})}
+        if language and language != "auto":
+            self.options["language"] = language
+
+        # Audio not finalised yet, starting at buffer_start seconds into the stream
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._buffer_start = 0.0
+        # Audio received since the last pass, joined once per pass
+        self._pending: List[np.ndarray] = []
+        self._pending_samples = 0
+        # Dangling odd byte of a PCM chunk
+        self._remainder = b""
+        # Segments of the previous pass that are not final yet
+        self._hypothesis: List[dict] = []
+        self._context = ""
+        self.segment_count = 0
+        self.language = self.options.get("language")
+
+    def feed(self, pcm: bytes) -> List[dict]:
+        """Add 16-bit PCM bytes and return the events of any pass they triggered."""
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % 2
+        self._remainder = pcm[usable:]
+        return self.feed_audio(pcm16_to_float(pcm[:usable]))
+
+    def feed_audio(self, audio: np.ndarray) -> List[dict]:
+        """Add float32 samples and return the events of any pass they triggered."""
+        if len(audio):
+            self._pending.append(audio)
+            self._pending_samples += len(audio)
+        # A slow pass leaves several steps pending; they are caught up in one pass
+        if self._pending_samples < self.step_samples:
+            return []
+        return self._transcribe_pass(final=False)
+
+    def finish(self) -> List[dict]:
+        """Finalise everything still buffered at the end of the stream."""
+        if not self._pending_samples and not len(self._buffer):
+            return []
+        return self._transcribe_pass(final=True)
+
+    def _transcribe_pass(self, final: bool) -> List[dict]:
+        self._buffer = np.concatenate([self._buffer] + self._pending)
+        self._pending = []
+        self._pending_samples = 0
+        window_end = self._buffer_start + len(self._buffer) / SAMPLE_RATE
+
+        with span(TRANSCRIBE, offset=self._buffer_start, audio_seconds=len(self._buffer) / SAMPLE_RATE):
+            result = self.model.transcribe(self._buffer, **self.options)
+        self.language = self.language or result.get("language")
+
+        segments = [
+            {"start": self._buffer_start + s["start"], "end": min(self._buffer_start + s["end"], window_end),
+             "text": s["text"]}
+            for s in result["segments"] if s["text"].strip()
+        ]
+
+        if final:
+            committed = len(segments)
+        else:
+            # Final once the previous pass produced the same text, never the last (possibly cut) segment
+            committed = 0
+            while (committed < len(segments) - 1 and committed < len(self._hypothesis) and
+                   _normalize(segments[committed]["text"]) == _normalize(self._hypothesis[committed]["text"])):
+                committed += 1
+            # Make room before the buffer outgrows the model's context
+            if len(self._buffer) + self.step_samples > self.max_window_samples:
+                committed = max(committed, len(segments) - 1) or len(segments)
+
+        events = [self._commit(segment) for segment in segments[:committed]]
+        self._hypothesis = segments[committed:]
+
+        if committed:
+            cut = int((segments[committed - 1]["end"] - self._buffer_start) * SAMPLE_RATE)
+            self._drop(cut)
+        elif not segments and len(self._buffer) + self.step_samples > self.max_window_samples:
+            # No speech in a full window: keep only its end, where a word may be starting
+            self._drop(len(self._buffer) - int(SILENCE_KEEP_SECONDS * SAMPLE_RATE))
+
+        if final:
+            self._buffer = np.zeros(0, dtype=np.float32)
+            self._buffer_start = window_end
+        else:
+            events.append({
+                "type": "partial",
+                "start": self._hypothesis[0]["start"] if self._hypothesis else window_end,
+                "end": window_end,
+                "text": "".join(segment["text"] for segment in self._hypothesis)
+            })
+        return events
+
+    def _commit(self, segment: dict) -> dict:
+        """Emit a final segment and condition later windows on its text."""
+        event = {"type": "final", "id": self.segment_count, **segment}
+        self.segment_count += 1
+        self._context = (self._context + segment["text"])[-PROMPT_CONTEXT_CHARS:]
+        carry_window_context(self.options, {"text": self._context, "language": self.language})
+        return event
+
+    def _drop(self, samples: int) -> None:
+        """Drop finalised audio from the front of the buffer."""
+        samples = max(0, min(samples, len(self._buffer)))
+        self._buffer = self._buffer[samples:]
+        self._buffer_start += samples / SAMPLE_RATE
+
+def transcribe_live(model, chunks: Iterable[bytes], input_format: str = PCM_FORMAT,
+                    language: Optional[str] = None, step_seconds: float = STEP_SECONDS) -> Iterator[dict]:
+    """Transcribe an audio stream as it arrives, yielding partial and final segment events.
+
+    ``chunks`` are raw 16 kHz mono s16le PCM, or with another
+    ``input_format`` (an ffmpeg demuxer name such as ``ogg`` or ``webm``
+    for Opus) an encoded stream decoded on the fly.
+    """
+    live = LiveTranscriber(model, language=language, step_seconds=step_seconds)
+    pcm_blocks = chunks if input_format == PCM_FORMAT else decode_stream(chunks, input_format)
+
+    for block in pcm_blocks:
+        yield from live.feed(block)
+    yield from live.finish()
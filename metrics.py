@@ -0,0 +1,226 @@
+"""Prometheus-style metrics for the web service.
+
+Counters, gauges and histograms are kept in memory in the Flask process and
+rendered in the Prometheus text exposition format by ``/metrics``. Job
+metrics are fed from the status updates the inference workers already send
+through the scheduler's event queue (see :func:`observe_job_update`), so
+recording them costs a dictionary lookup and an addition per event and
+nothing is added to the workers' hot path. Values that are cheap to read
+on demand (queue depth, active workers, resident memory) are collected when
+the endpoint is scraped.
+"""
+
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket upper bounds in seconds for job latencies
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# Bucket upper bounds for real-time factors (processing time / audio duration)
+RTF_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    """Base class: a named metric family with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+
+    def samples(self) -> Iterable[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    """Monotonically increasing value, one per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelled: bool = False):
+        super().__init__(name, documentation)
+        # Counters without labels report 0 before their first increment
+        self._values: Dict[Tuple, float] = {} if labelled else {(): 0}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, labels, value) for labels, value in items]
+
+class Gauge(Metric):
+    """Value read by a callback when the metrics are scraped.
+
+    The callback returns a number, or a mapping of label tuples to numbers
+    for gauges with labels.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable):
+        super().__init__(name, documentation)
+        self.collect = collect
+
+    def samples(self):
+        value = self.collect()
+        if value is None:
+            return []
+        if isinstance(value, dict):
+            return [(self.name, labels, v) for labels, v in value.items()]
+        return [(self.name, (), value)]
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            samples.append((f"{self.name}_bucket", (("le", _format_value(bound)),), cumulative))
+        samples.append((f"{self.name}_sum", (), total))
+        samples.append((f"{self.name}_count", (), count))
+        return samples
+
+class MetricsRegistry:
+    """Ordered collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelled: bool = False) -> Counter:
+        return self.register(Counter(name, documentation, labelled))
+
+    def gauge(self, name: str, documentation: str, collect: Callable) -> Gauge:
+        return self.register(Gauge(name, documentation, collect))
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A failing collector must not take the whole endpoint down
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+def process_rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Resident memory of a process in bytes, read from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# Metrics of the web service
+registry = MetricsRegistry()
+
+jobs_submitted = registry.counter("transcriber_jobs_submitted_total", "Jobs accepted into the queue.")
+jobs_rejected = registry.counter("transcriber_jobs_rejected_total", "Uploads rejected because the queue was full.")
+jobs_finished = registry.counter("transcriber_jobs_finished_total", "Jobs finished, by final status.",
+                                 labelled=True)
+queue_wait = registry.histogram("transcriber_queue_wait_seconds", "Time jobs waited for an inference worker.")
+model_load = registry.histogram("transcriber_model_load_seconds", "Time spent loading a model inside a job.")
+transcription = registry.histogram("transcriber_transcription_seconds", "Time spent running the model per job.")
+job_duration = registry.histogram("transcriber_job_seconds", "Time from a job starting on a worker to its completion.")
+real_time_factor = registry.histogram("transcriber_real_time_factor",
+                                      "Transcription time divided by audio duration per job.", RTF_BUCKETS)
+audio_seconds = registry.counter("transcriber_audio_seconds_total", "Seconds of audio in completed jobs.")
+cache_lookups = registry.counter("transcriber_cache_lookups_total", "Result cache lookups made by jobs.")
+cache_hits = registry.counter("transcriber_cache_hits_total", "Result cache lookups that returned a stored result.")
+
+registry.gauge("transcriber_cache_hit_ratio", "Share of result cache lookups that were hits.",
+               lambda: cache_hits.value() / cache_lookups.value() if cache_lookups.value() else 0.0)
+
+def observe_job_update(job: dict, fields: dict, now: Optional[float] = None) -> None:
+    """Record the metrics implied by one status update of a job record.
+
+    Call this before ``fields`` is applied, so transitions can be detected
+    against the job's previous status.
+    """
+    now = now or time.time()
+    status = fields.get('status')
+
+    if status == 'processing' and job.get('status') == 'queued':
+        queue_wait.observe(now - job['created_at'])
+
+    if 'cache_hit' in fields:
+        cache_lookups.inc()
+        if fields['cache_hit']:
+            cache_hits.inc()
+
+    if status in ('completed', 'failed') and job.get('status') not in ('completed', 'failed'):
+        jobs_finished.inc(status=status)
+        if job.get('started_at'):
+            job_duration.observe(now - job['started_at'])
+
+        # Stage timings come from the trace the worker attaches to its final update
+        stages = fields.get('trace') or {}
+        if 'model_load' in stages:
+            model_load.observe(stages['model_load']['seconds'])
+        if 'transcribe' in stages:
+            transcription.observe(stages['transcribe']['seconds'])
+            if status == 'completed' and job.get('duration'):
+                real_time_factor.observe(stages['transcribe']['seconds'] / job['duration'])
+
+        if status == 'completed' and job.get('duration'):
+            audio_seconds.inc(job['duration'])
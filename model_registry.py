@@ -0,0 +1,186 @@
+"""Process-wide registry of loaded Whisper models.
+
+Every entry point (CLI, batch, web app, GUI, diarization and subtitles) gets
+its models from here instead of calling ``whisper.load_model`` itself, so a
+model is loaded once per process and reused. Models are keyed by
+(size, device, precision), can be preloaded and warmed up at startup, and
+the least recently used models are evicted when a memory budget is set.
+
+torch and whisper are imported on first use, so importing the registry
+(and every entry point that does) stays cheap.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+from audio_utils import SAMPLE_RATE
+from tracing import MODEL_LOAD, span
+
+# Comma-separated model sizes to preload, e.g. "base,small"
+PRELOAD_MODELS = [size for size in os.environ.get("WHISPER_PRELOAD_MODELS", "").split(",") if size]
+
+# Memory budget for loaded models in MB (unset means unbounded)
+MEMORY_BUDGET_MB = os.environ.get("WHISPER_MODEL_MEMORY_MB")
+
+def default_device() -> str:
+    """Use the GPU when one is available."""
+    try:
+        import torch
+    except ImportError:
+        # Only custom models (e.g. the benchmarks' stub) can run without torch
+        return "cpu"
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+def model_memory_bytes(model) -> int:
+    """Approximate memory held by a model's parameters and buffers."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+class LoadedModel:
+    """A loaded model together with the lock that serializes its inference."""
+
+    def __init__(self, model, size_bytes: int):
+        self.model = model
+        self.size_bytes = size_bytes
+        self.lock = threading.Lock()
+
+class ModelRegistry:
+    """Load, share and evict Whisper models keyed by (size, device, precision)."""
+
+    def __init__(self, memory_budget_mb: Optional[float] = None):
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else None
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def key(self, model_size: str, device: Optional[str] = None, precision: Optional[str] = None) -> Tuple[str, str, str]:
+        """The ``(size, device, precision)`` a model is loaded under, with defaults filled in."""
+        device = device or default_device()
+        # Half precision only pays off on the GPU
+        if precision is None:
+            precision = "fp16" if device != "cpu" else "fp32"
+        return (model_size, device, precision)
+
+    def _entry(self, model_size: str, device: Optional[str] = None, precision: Optional[str] = None) -> LoadedModel:
+        key = self.key(model_size, device, precision)
+
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock; concurrent requests for the same key wait here
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            size, device, precision = key
+            print(f"Loading Whisper {size} model on {device} ({precision})...")
+            with span(MODEL_LOAD, model=size, device=device):
+                import whisper
+
+                model = whisper.load_model(size, device=device)
+                if precision == "fp16" and device != "cpu":
+                    model = model.half()
+            entry = LoadedModel(model, model_memory_bytes(model))
+
+            with self._lock:
+                self._models[key] = entry
+                self._evict_over_budget(keep=key)
+            return entry
+
+    def register(self, model_size: str, model, device: Optional[str] = None, precision: Optional[str] = None) -> None:
+        """Add an already constructed model under a registry key.
+
+        Lets tools supply a custom or stub model (anything with a whisper-like
+        ``transcribe`` method) that every entry point then picks up.
+        """
+        key = self.key(model_size, device, precision)
+        size_bytes = model_memory_bytes(model) if hasattr(model, "parameters") else 0
+        with self._lock:
+            self._models[key] = LoadedModel(model, size_bytes)
+            self._models.move_to_end(key)
+
+    def get(self, model_size: str, device: Optional[str] = None, precision: Optional[str] = None):
+        """Return a shared model, loading it on first use.
+
+        The model comes without its lock, so this is not safe for concurrent
+        use: two threads transcribing with it at once break each other's
+        decoder hooks, and eviction cannot tell that it is busy. Only call it
+        where one thread of the process runs inference (the CLI, batch and
+        pool workers, the GUI); anything concurrent must use :meth:`use`.
+        """
+        return self._entry(model_size, device, precision).model
+
+    @contextmanager
+    def use(self, model_size: str, device: Optional[str] = None, precision: Optional[str] = None):
+        """Borrow a shared model for exclusive inference.
+
+        Whisper installs decoder hooks during ``transcribe``, so one model
+        instance must not run two transcriptions at the same time.
+        """
+        entry = self._entry(model_size, device, precision)
+        with entry.lock:
+            yield entry.model
+
+    def _evict_over_budget(self, keep) -> None:
+        """Drop least recently used idle models while over the memory budget."""
+        if self.memory_budget_bytes is None:
+            return
+
+        total = sum(entry.size_bytes for entry in self._models.values())
+        for key in list(self._models):
+            if total <= self.memory_budget_bytes:
+                break
+            entry = self._models[key]
+            # Never evict the model just requested or one that is running
+            if key == keep or entry.lock.locked():
+                continue
+            print(f"Evicting Whisper {key[0]} model on {key[1]} ({key[2]}) to stay within memory budget")
+            del self._models[key]
+            total -= entry.size_bytes
+
+        try:
+            import torch
+        except ImportError:
+            # Custom models registered without torch hold no GPU memory
+            return
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def warmup(self, model_size: str, device: Optional[str] = None, precision: Optional[str] = None) -> None:
+        """Run one short inference so the first real request is not slowed by lazy initialization."""
+        key = self.key(model_size, device, precision)
+        silence = np.zeros(SAMPLE_RATE, dtype=np.float32)
+        with self.use(*key) as model:
+            model.transcribe(silence, language="en", fp16=key[2] == "fp16")
+
+    def preload(self, model_sizes: Iterable[str], device: Optional[str] = None,
+                precision: Optional[str] = None, warmup: bool = True) -> None:
+        """Load (and optionally warm up) the given model sizes ahead of time."""
+        for model_size in model_sizes:
+            self.get(model_size, device, precision)
+            if warmup:
+                self.warmup(model_size, device, precision)
+
+    def loaded(self):
+        """Return the keys of the currently loaded models, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+# Registry shared by every module in the process
+registry = ModelRegistry(float(MEMORY_BUDGET_MB) if MEMORY_BUDGET_MB else None)
+
+def get_model(model_size: str, device: Optional[str] = None, precision: Optional[str] = None):
+    """Return a model from the process-wide registry (without its lock, see :meth:`ModelRegistry.get`)."""
+    return registry.get(model_size, device, precision)
@@ -1,11 +1,46 @@
 import os
 import time
 import concurrent.futures
-from typing import List, Dict, Any
-import whisper
+import multiprocessing
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
-def process_file(input_file: str, output_dir: str, model_size: str, model, language=None, with_timestamps=False) -> Dict[str, Any]:
-    """Process a single file and return results."""
+from audio_probe import probe_durations
+from audio_utils import SAMPLE_RATE, WINDOW_SECONDS, find_split_points, load_audio
+from transcriber import shift_segments, transcribe_streaming
+from transcription_cache import TranscriptionCache, decode_options
+from model_registry import default_device, get_model
+from vad import detect_speech, speech_stats, speech_within, transcribe_spans, transcribe_speech_only
+from progress import TRANSCRIBING, report
+from segment_writers import open_writer
+from tracing import TRANSCRIBE, VAD, WRITE, span
+
+# Torch threads given to each worker when the core split is automatic
+MIN_THREADS_PER_WORKER = 2
+
+# Target length of the chunks a long file is split into
+CHUNK_SECONDS = 300
+
+# How far from a nominal chunk boundary to look for silence
+SPLIT_SEARCH_SECONDS = 10
+
+# Audio shared by neighbouring chunks on each side of a cut
+CHUNK_OVERLAP_SECONDS = 1.0
+
+# Model and cache used by the current worker process. The batch engine fills
+# this in the parent before forking, so forked workers share the model weights
+# copy-on-write instead of loading their own copy.
+_worker_state = {}
+
+def process_file(input_file: str, output_dir: str, model_size: str, model, language=None, with_timestamps=False,
+                 streaming=False, cache=None, vad=False, device=None) -> Dict[str, Any]:
+    """Process a single file and return results.
+
+    With ``streaming`` the file is decoded and transcribed in 30-second
+    windows, so each worker holds only one window of audio in memory.
+    With ``vad`` non-speech is skipped before inference.
+    When a ``cache`` is given, previously transcribed audio is not re-run;
+    ``device`` is the one ``model`` was loaded on, which is part of the key.
+    """
     try:
         # Create output filename
         base_name = os.path.basename(input_file)
@@ -26,34 +61,57 @@ def process_file(input_file: str, output_dir: str, model_size: str, model, langu
         elif language == "auto":
             print("Performing automatic language detection...")
         
-        # Transcribe audio
         start_time = time.time()
-        result = model.transcribe(input_file, **transcribe_options)
-        elapsed_time = time.time() - start_time
         
-        # Save transcription
-        with open(output_file, 'w', encoding='utf-8') as f:
-            if with_timestamps and "segments" in result:
-                # Write with timestamps
-                for segment in result["segments"]:
-                    start_time = format_time(segment["start"])
-                    end_time = format_time(segment["end"])
-                    f.write(f"[{start_time} --> {end_time}] {segment['text']}\n")
+        # Look for a stored result for this exact audio and options
+        cache_key = None
+        result = None
+        if cache is not None:
+            cache_key = cache.make_key(input_file, model_size,
+                                       decode_options(language, with_timestamps, streaming, vad=vad), device=device)
+            result = cache.get(cache_key)
+        cached = result is not None
+        
+        # Write the transcript as it is produced; streaming appends each window's segments
+        with open_writer("timestamped" if with_timestamps else "txt", output_file) as writer:
+            if result is None:
+                if streaming:
+                    result = transcribe_streaming(model, input_file, transcribe_options, vad=vad, writer=writer)
+                else:
+                    # Decode once, then transcribe the in-memory waveform
+                    if vad:
+                        result = transcribe_speech_only(model, load_audio(input_file), transcribe_options)
+                    else:
+                        audio = load_audio(input_file)
+                        with span(TRANSCRIBE, audio_seconds=len(audio) / SAMPLE_RATE):
+                            result = model.transcribe(audio, **transcribe_options)
+                    with span(WRITE):
+                        writer.write_result(result)
+                if cache_key is not None:
+                    cache.put(cache_key, result)
             else:
-                # Write plain text
-                f.write(result["text"])
+                with span(WRITE):
+                    writer.write_result(result)
+        elapsed_time = time.time() - start_time
         
         # Print detected language if auto-detection was used
         if language == "auto" and "language" in result:
             print(f"Detected language: {result['language']}")
         
+        # Report how much non-speech was skipped
+        skipped_seconds = result["vad"]["skipped_seconds"] if "vad" in result else 0.0
+        if "vad" in result:
+            print(f"Skipped {skipped_seconds:.1f}s of non-speech in {base_name}")
+        
         return {
             "file": input_file,
             "output": output_file,
             "success": True,
             "time": elapsed_time,
             "error": None,
-            "language": result.get("language", None)
+            "language": result.get("language", None),
+            "cached": cached,
+            "skipped_seconds": skipped_seconds
         }
         
     except Exception as e:
@@ -64,14 +122,71 @@ def process_file(input_file: str, output_dir: str, model_size: str, model, langu
             "success": False,
             "time": 0,
             "error": str(e),
-            "language": None
+            "language": None,
+            "cached": False,
+            "skipped_seconds": 0.0
         }
 
-def format_time(seconds):
-    """Format seconds as HH:MM:SS."""
-    hours, remainder = divmod(seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:05.2f}"
+def torch_threads() -> int:
+    """Size of torch's intra-op thread pool (the core count for custom models without torch)."""
+    try:
+        import torch
+    except ImportError:
+        return os.cpu_count() or 1
+    return torch.get_num_threads()
+
+def set_torch_threads(threads: int) -> None:
+    """Resize torch's intra-op thread pool; nothing to do for custom models without torch."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+def plan_workers(num_files: int, max_workers: Optional[int] = None,
+                 cpu_count: Optional[int] = None, threads_per_worker: Optional[int] = None) -> Tuple[int, int]:
+    """Split the available cores between worker processes and torch threads.
+
+    Returns ``(workers, threads_per_worker)``. Without ``max_workers`` each
+    worker gets ``MIN_THREADS_PER_WORKER`` cores, which keeps the encoder's
+    matrix multiplications efficient while still running files side by side.
+    An explicit ``threads_per_worker`` is used as given instead of the cores'
+    even share.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    if max_workers is None:
+        max_workers = max(1, cpu_count // MIN_THREADS_PER_WORKER)
+    workers = max(1, min(max_workers, num_files, cpu_count))
+    return workers, threads_per_worker or max(1, cpu_count // workers)
+
+def _init_worker(model_size: str, threads_per_worker: int, cache_config: Optional[Tuple[str, float]]) -> None:
+    """Prepare a worker process: size torch's thread pool and find the model."""
+    set_torch_threads(threads_per_worker)
+    
+    # Forked workers inherit the parent's model; spawned ones load their own
+    if "model" not in _worker_state:
+        _worker_state["model"] = get_model(model_size, device="cpu")
+    
+    _worker_state["cache"] = TranscriptionCache(*cache_config) if cache_config else None
+
+def _process_in_worker(input_file: str, output_dir: str, model_size: str, language, with_timestamps, streaming, vad):
+    """Run process_file with the worker's shared model and cache."""
+    return process_file(
+        input_file, output_dir, model_size, _worker_state["model"],
+        language, with_timestamps, streaming, _worker_state["cache"], vad, device="cpu"
+    )
+
+def _record_result(results: Dict[str, List], result: Dict[str, Any]) -> None:
+    """Add one file's result to the batch summary and report it."""
+    file = result["file"]
+    if result["success"]:
+        results["success"].append(result)
+        lang_info = f" ({result['language']})" if result['language'] else ""
+        cache_info = " [cached]" if result['cached'] else ""
+        print(f"✅ Completed: {os.path.basename(file)}{lang_info} in {result['time']:.2f}s{cache_info}")
+    else:
+        results["failed"].append(result)
+        print(f"❌ Failed: {os.path.basename(file)} - {result['error']}")
 
 def parallel_batch_process(
     input_files: List[str], 
@@ -79,60 +194,313 @@ def parallel_batch_process(
     model_size: str, 
     max_workers: int = None,
     language: str = None,
-    with_timestamps: bool = False
+    with_timestamps: bool = False,
+    streaming: bool = False,
+    cache=None,
+    vad: bool = False,
+    threads_per_worker: Optional[int] = None
 ) -> Dict[str, List]:
-    """Process a batch of audio files in parallel."""
-    if max_workers is None:
-        # Default to number of CPU cores or 4, whichever is smaller
-        import multiprocessing
-        max_workers = min(4, multiprocessing.cpu_count())
-    
+    """Process a batch of audio files in parallel worker processes.
+
+    The model is loaded once in the parent and the workers are forked from
+    it, so they share its weights copy-on-write. Cores are split between
+    the number of workers and torch's per-worker thread count, unless
+    ``threads_per_worker`` fixes the latter. On a GPU
+    files are processed in this process instead. On the CPU even a single
+    worker is a child process, so this process never runs inference and a
+    later batch can still fork safely.
+    """
     results = {"success": [], "failed": []}
     
+    device = default_device()
+    workers, planned_threads = plan_workers(len(input_files), max_workers, threads_per_worker=threads_per_worker)
+    if device != "cpu":
+        # CUDA state cannot be shared with forked children
+        workers, planned_threads = 1, threads_per_worker or torch_threads()
+    threads_per_worker = planned_threads
+    
     # Load the model once (shared between workers)
     print(f"Loading Whisper {model_size} model...")
-    model = whisper.load_model(model_size)
+    model = get_model(model_size, device=device)
+    
+    # Schedule the longest files first so no worker is left with a long tail
+    durations = probe_durations(input_files)
+    input_files = sorted(input_files, key=lambda f: durations[f] or 0, reverse=True)
     
     # Process files in parallel
-    print(f"\nProcessing {len(input_files)} audio files with {max_workers} workers...")
-    
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_file = {
-            executor.submit(
-                process_file, 
-                file, 
-                output_dir, 
-                model_size, 
-                model,
-                language,
-                with_timestamps
-            ): file 
-            for file in input_files
-        }
+    print(f"\nProcessing {len(input_files)} audio files with {workers} workers "
+          f"x {threads_per_worker} threads...")
+    
+    if device != "cpu":
+        set_torch_threads(threads_per_worker)
+        for file in input_files:
+            _record_result(results, process_file(
+                file, output_dir, model_size, model, language, with_timestamps, streaming, cache, vad, device
+            ))
+    else:
+        cache_config = (cache.cache_dir, cache.max_bytes / (1024 * 1024)) if cache is not None else None
         
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(future_to_file):
-            file = future_to_file[future]
-            try:
-                result = future.result()
-                if result["success"]:
-                    results["success"].append(result)
-                    lang_info = f" ({result['language']})" if result['language'] else ""
-                    print(f"✅ Completed: {os.path.basename(file)}{lang_info} in {result['time']:.2f}s")
-                else:
-                    results["failed"].append(result)
-                    print(f"❌ Failed: {os.path.basename(file)} - {result['error']}")
-            except Exception as e:
-                results["failed"].append({
-                    "file": file,
-                    "output": None,
-                    "success": False,
-                    "time": 0,
-                    "error": str(e),
-                    "language": None
-                })
-                print(f"❌ Error: {os.path.basename(file)} - {e}")
+        # Fork where available so workers inherit the loaded weights
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+            _worker_state["model"] = model
+        else:
+            context = multiprocessing.get_context("spawn")
+        
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(model_size, threads_per_worker, cache_config)
+            ) as executor:
+                # Submit all tasks
+                future_to_file = {
+                    executor.submit(
+                        _process_in_worker,
+                        file,
+                        output_dir,
+                        model_size,
+                        language,
+                        with_timestamps,
+                        streaming,
+                        vad
+                    ): file
+                    for file in input_files
+                }
+                
+                # Process results as they complete
+                for future in concurrent.futures.as_completed(future_to_file):
+                    file = future_to_file[future]
+                    try:
+                        _record_result(results, future.result())
+                    except Exception as e:
+                        results["failed"].append({
+                            "file": file,
+                            "output": None,
+                            "success": False,
+                            "time": 0,
+                            "error": str(e),
+                            "language": None,
+                            "cached": False,
+                            "skipped_seconds": 0.0
+                        })
+                        print(f"❌ Error: {os.path.basename(file)} - {e}")
+        finally:
+            _worker_state.clear()
+    
+    results["cache_hits"] = sum(1 for r in results["success"] if r["cached"])
+    results["skipped_seconds"] = sum(r["skipped_seconds"] for r in results["success"])
+    if vad:
+        print(f"\nNon-speech skipped: {results['skipped_seconds']:.1f}s")
+    if cache is not None:
+        print(f"\nCache hits: {results['cache_hits']}/{len(input_files)}")
     
     return results
 
+def _transcribe_chunk(model, chunk_audio, transcribe_options: dict, speech=None) -> dict:
+    """Transcribe one chunk, only its ``speech`` spans when given."""
+    if speech is not None:
+        return transcribe_spans(model, chunk_audio, speech, transcribe_options)
+    return model.transcribe(chunk_audio, **transcribe_options)
+
+def _transcribe_chunk_in_worker(start: int, end: int, transcribe_options: dict, chunk_audio=None,
+                                speech=None) -> dict:
+    """Transcribe samples [start, end) of the shared waveform."""
+    if chunk_audio is None:
+        chunk_audio = _worker_state["audio"][start:end]
+    return _transcribe_chunk(_worker_state["model"], chunk_audio, transcribe_options, speech)
+
+def _detect_language_in_worker(window=None) -> str:
+    """Detect the language of the shared waveform (or of ``window``) in a pool worker."""
+    if window is None:
+        window = _worker_state["audio"][:WINDOW_SECONDS * SAMPLE_RATE]
+    return detect_language(_worker_state["model"], window)
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def stitch_chunk_results(chunk_results: List[Tuple[dict, float, float, float]]) -> dict:
+    """Merge per-chunk results into one result dict on the recording's timeline.
+
+    Each item is ``(result, offset, keep_start, keep_end)``: the chunk's
+    result, the time in seconds at which the chunk starts, and the span of
+    the recording that the chunk owns. Segments are shifted by ``offset``
+    and kept only if their midpoint lies in the owned span, which removes
+    text decoded twice in the overlap between chunks. A segment that repeats
+    the previous one across a boundary is dropped as well.
+    """
+    segments = []
+    language = None
+    
+    for result, offset, keep_start, keep_end in chunk_results:
+        language = language or result.get("language")
+        shift_segments(result["segments"], offset)
+        
+        for segment in result["segments"]:
+            midpoint = (segment["start"] + segment["end"]) / 2
+            if midpoint < keep_start or midpoint >= keep_end:
+                continue
+            
+            if (segments and segment["start"] < segments[-1]["end"]
+                    and _normalize_text(segment["text"]) == _normalize_text(segments[-1]["text"])):
+                continue
+            
+            segment["id"] = len(segments)
+            segments.append(segment)
+    
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language
+    }
+
+def detect_language(model, audio) -> str:
+    """Detect the spoken language from the first 30 seconds of a waveform."""
+    import whisper
+    
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+def transcribe_long_file(
+    input_file: str,
+    model_size: str = "base",
+    max_workers: int = None,
+    language: str = None,
+    with_timestamps: bool = False,
+    chunk_seconds: float = CHUNK_SECONDS,
+    audio=None,
+    progress: Optional[Callable] = None,
+    checkpoint=None,
+    vad: bool = False
+) -> dict:
+    """Transcribe one long file by splitting it at silences and running the chunks in parallel.
+
+    The file is cut near every ``chunk_seconds`` at the quietest point, each
+    chunk is padded with ``CHUNK_OVERLAP_SECONDS`` of its neighbours, and the
+    chunks are transcribed across forked worker processes that share the
+    model and the decoded waveform copy-on-write. The chunk results are
+    stitched into a single result dict with absolute timestamps. A
+    ``progress`` callback receives the seconds of audio transcribed as each
+    chunk finishes. With a ``checkpoint`` (see ``batch_manifest``) each
+    finished chunk is stored, and chunks stored by an interrupted run with
+    the same cut points are reused instead of transcribed again. With
+    ``vad`` speech is detected once over the whole file and each chunk
+    transcribes only its share of it.
+
+    On the CPU the chunks always run in child processes, even when there is
+    only one, so this process never runs inference and a later call can
+    still fork safely (torch's OpenMP thread pool does not survive a fork).
+    """
+    if audio is None:
+        audio = load_audio(input_file)
+    duration = len(audio) / SAMPLE_RATE
+    
+    cpu_count = os.cpu_count() or 1
+    workers_hint = max_workers or max(1, cpu_count // MIN_THREADS_PER_WORKER)
+    
+    # Make sure there are at least as many chunks as workers
+    chunk_seconds = max(30.0, min(chunk_seconds, duration / workers_hint))
+    points = find_split_points(audio, chunk_seconds, min(SPLIT_SEARCH_SECONDS, chunk_seconds / 4))
+    workers, threads_per_worker = plan_workers(len(points) - 1, max_workers)
+    
+    device = default_device()
+    if device != "cpu":
+        workers, threads_per_worker = 1, torch_threads()
+    model = get_model(model_size, device=device)
+    
+    # Fix the language up front so every chunk decodes in the same language
+    transcribe_options = {"word_timestamps": with_timestamps}
+    detect = not language or language == "auto"
+    if not detect:
+        transcribe_options["language"] = language
+    
+    # Energy-based and torch-free, so it is safe in the process that forks the pool
+    speech_spans = None
+    if vad:
+        with span(VAD):
+            speech_spans = detect_speech(audio)
+    
+    overlap = int(CHUNK_OVERLAP_SECONDS * SAMPLE_RATE)
+    chunks = []
+    for cut_start, cut_end in zip(points[:-1], points[1:]):
+        start = max(0, cut_start - overlap)
+        end = min(len(audio), cut_end + overlap)
+        chunks.append((start, end, cut_start / SAMPLE_RATE, cut_end / SAMPLE_RATE))
+    chunk_speech = [None if speech_spans is None else speech_within(speech_spans, start, end)
+                    for start, end, _, _ in chunks]
+    
+    chunk_results = [None] * len(chunks)
+    transcribed_seconds = 0.0
+    
+    def chunk_done(i: int, result: dict, stored: bool = False) -> None:
+        nonlocal transcribed_seconds
+        chunk_results[i] = result
+        if checkpoint is not None and not stored:
+            checkpoint.save(i, chunks[i][0], chunks[i][1], result)
+        transcribed_seconds += chunks[i][3] - chunks[i][2]
+        report(progress, TRANSCRIBING, transcribed_seconds, duration)
+    
+    # Reuse chunks finished by an earlier run that cut the file the same way
+    if checkpoint is not None:
+        for i, (start, end, result) in checkpoint.completed().items():
+            if i < len(chunks) and (start, end) == chunks[i][:2]:
+                chunk_done(i, result, stored=True)
+    pending = [i for i, result in enumerate(chunk_results) if result is None]
+    if len(pending) < len(chunks):
+        print(f"Resuming {os.path.basename(input_file)}: {len(chunks) - len(pending)} of {len(chunks)} chunks already done")
+    
+    print(f"Transcribing {os.path.basename(input_file)} in {len(pending)} chunks "
+          f"with {workers} workers x {threads_per_worker} threads...")
+    
+    if device != "cpu":
+        # CUDA state cannot be shared with forked children, so the GPU path never forks
+        if detect and pending:
+            transcribe_options["language"] = detect_language(model, audio)
+        for i in pending:
+            start, end = chunks[i][:2]
+            with span(TRANSCRIBE, chunk=i, audio_seconds=(end - start) / SAMPLE_RATE):
+                chunk_done(i, _transcribe_chunk(model, audio[start:end], transcribe_options, chunk_speech[i]))
+    elif pending:
+        fork = "fork" in multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if fork else "spawn")
+        if fork:
+            _worker_state["model"] = model
+            _worker_state["audio"] = audio
+        
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(model_size, threads_per_worker, None)
+            ) as executor:
+                # Detect in a worker: inference in the parent before forking can deadlock the children
+                if detect:
+                    transcribe_options["language"] = executor.submit(
+                        _detect_language_in_worker, None if fork else audio[:WINDOW_SECONDS * SAMPLE_RATE]
+                    ).result()
+                futures = {
+                    executor.submit(
+                        _transcribe_chunk_in_worker, chunks[i][0], chunks[i][1], transcribe_options,
+                        None if fork else audio[chunks[i][0]:chunks[i][1]], chunk_speech[i]
+                    ): i
+                    for i in pending
+                }
+                # Chunks run in other processes, so only the wall time of the whole pool is traced here
+                with span(TRANSCRIBE, chunks=len(pending), workers=workers):
+                    for future in concurrent.futures.as_completed(futures):
+                        chunk_done(futures[future], future.result())
+        finally:
+            _worker_state.clear()
+    
+    # Stitch with each chunk owning the span between its silence cuts
+    last = len(chunks) - 1
+    result = stitch_chunk_results([
+        (result, start / SAMPLE_RATE, cut_start if i > 0 else 0.0, cut_end if i < last else float("inf"))
+        for i, (result, (start, _, cut_start, cut_end)) in enumerate(zip(chunk_results, chunks))
+    ])
+    if speech_spans is not None:
+        result["vad"] = speech_stats(len(audio), speech_spans)
+    return result
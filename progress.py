@@ -0,0 +1,138 @@
+"""Progress events driven by real work.
+
+A progress callback is any callable ``callback(stage, done, total)``. Stages
+are reported in their natural units: seconds of audio decoded, models
+loaded, seconds of audio transcribed and files finished. ``total`` is None
+when it is not known in advance. The CLI turns events into tqdm bars, the
+web worker into percentages on the job record and the GUI into progress bar
+updates, so no time is spent animating progress that is not happening.
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# Stages reported by the transcription pipeline
+DECODING = "decoding"
+LOADING_MODEL = "loading_model"
+TRANSCRIBING = "transcribing"
+FILES = "files"
+
+# Labels and units used when a stage is shown as a progress bar
+STAGE_LABELS = {
+    DECODING: ("Decoding audio", "s"),
+    LOADING_MODEL: ("Loading model", "model"),
+    TRANSCRIBING: ("Transcribing", "s"),
+    FILES: ("Files", "file")
+}
+
+# Whisper's mel spectrogram advances 100 frames per second of audio
+FRAMES_PER_SECOND = 100
+
+# Callback that receives whisper's frame progress in the current thread
+_local = threading.local()
+
+def report(callback: Optional[Callable], stage: str, done: float, total: Optional[float] = None) -> None:
+    """Send a progress event if a callback was given."""
+    if callback is not None:
+        callback(stage, done, total)
+
+def progress_percent(done: float, total: Optional[float]) -> int:
+    """Whole percentage of ``done`` out of ``total`` (0 when the total is unknown)."""
+    if not total:
+        return 0
+    return max(0, min(100, int(done * 100 / total)))
+
+class PercentProgress:
+    """Progress callback that forwards ``(stage, percent)`` only when the percentage changes.
+
+    Keeps chatty stages (one event per decoded block or window) from
+    flooding a job record or a GUI event loop.
+    """
+
+    def __init__(self, on_percent: Callable[[str, int], None]):
+        self.on_percent = on_percent
+        self._last: Dict[str, int] = {}
+
+    def __call__(self, stage: str, done: float, total: Optional[float]) -> None:
+        percent = progress_percent(done, total)
+        if self._last.get(stage) != percent:
+            self._last[stage] = percent
+            self.on_percent(stage, percent)
+
+class TqdmProgress:
+    """Progress callback that draws one tqdm bar per stage."""
+
+    def __init__(self):
+        self._bars = {}
+
+    def __call__(self, stage: str, done: float, total: Optional[float]) -> None:
+        from tqdm import tqdm
+
+        bar = self._bars.get(stage)
+        if bar is None:
+            label, unit = STAGE_LABELS.get(stage, (stage, "it"))
+            bar = self._bars[stage] = tqdm(total=round(total, 1) if total else None, desc=label, unit=unit)
+        if total and total != bar.total:
+            bar.total = round(total, 1)
+        bar.n = round(done, 1)
+        bar.refresh()
+
+        if total and done >= total:
+            bar.close()
+            del self._bars[stage]
+
+    def close(self) -> None:
+        """Close any bars that did not reach their total."""
+        for bar in self._bars.values():
+            bar.close()
+        self._bars.clear()
+
+def _install_frame_hook() -> None:
+    """Route the frame counter inside ``whisper.transcribe`` to the thread's callback.
+
+    ``model.transcribe`` advances a tqdm bar by the mel frames it has
+    consumed after every decoded window. The bar is replaced with a silent
+    counter that reports those frames as seconds transcribed.
+    """
+    import importlib
+    import types
+
+    try:
+        import tqdm
+        transcribe_module = importlib.import_module("whisper.transcribe")
+    except ImportError:
+        # Custom models without whisper installed report no frame progress
+        return
+    if getattr(transcribe_module.tqdm, "is_frame_hook", False):
+        return
+
+    class FrameCounter(tqdm.tqdm):
+        def __init__(self, *args, **kwargs):
+            kwargs["disable"] = True
+            super().__init__(*args, **kwargs)
+            self.frames_total = kwargs.get("total") or 0
+            self.frames_done = 0
+
+        def update(self, n=1):
+            self.frames_done += n
+            callback = getattr(_local, "callback", None)
+            if callback is not None:
+                callback(TRANSCRIBING, self.frames_done / FRAMES_PER_SECOND, self.frames_total / FRAMES_PER_SECOND)
+
+    transcribe_module.tqdm = types.SimpleNamespace(tqdm=FrameCounter, is_frame_hook=True)
+
+@contextmanager
+def track_transcription(callback: Optional[Callable]):
+    """Report ``model.transcribe`` progress in this thread as TRANSCRIBING events."""
+    if callback is None:
+        yield
+        return
+
+    _install_frame_hook()
+    previous = getattr(_local, "callback", None)
+    _local.callback = callback
+    try:
+        yield
+    finally:
+        _local.callback = previous
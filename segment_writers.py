@@ -0,0 +1,400 @@
+"""Transcript writers that append segments as they are transcribed.
+
+Each writer opens its output file up front and writes every segment the
+moment it arrives, flushing after each one. Streaming transcription can
+therefore show the first lines within seconds, and a crash or interruption
+keeps everything written so far instead of losing the whole file. Every
+format stays readable when cut off except ``json``, whose closing brackets
+are written last; ``jsonl`` (one segment object per line) is the JSON
+output to use when a run may be interrupted.
+
+Complete results (from the cache, a batch or :func:`export_result`) are
+written in one pass over the segments: every format's text is rendered per
+batch of segments and handed to a large file buffer in a single
+``write()``. The timestamps of a batch are rounded to integer milliseconds
+(or centiseconds) in one numpy operation and formatted from precomputed
+digit tables rather than through ``timedelta``.
+SRT and VTT cues can be split to a maximum length and duration at word
+boundaries.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+# Segments rendered per write() call when a whole result is written
+WRITE_BATCH_SEGMENTS = 2000
+
+# Output file buffer size
+WRITE_BUFFER_BYTES = 1024 * 1024
+
+# Zero-padded digits for minutes/seconds and milliseconds
+_TWO_DIGITS = [f"{i:02d}" for i in range(100)]
+_THREE_DIGITS = [f"{i:03d}" for i in range(1000)]
+
+def time_units(segments: List[dict], key: str, scale: int = 1000) -> np.ndarray:
+    """``segment[key]`` of every segment rounded to whole 1/``scale`` seconds (never negative)."""
+    seconds = np.fromiter((segment[key] for segment in segments), dtype=np.float64, count=len(segments))
+    return np.maximum(np.rint(seconds * scale), 0).astype(np.int64)
+
+def format_clocks(units: np.ndarray, scale: int = 1000, decimal_marker: str = ",") -> List[str]:
+    """Format times in whole 1/``scale`` seconds (100 or 1000) as ``HH:MM:SS,fraction``."""
+    seconds, fractions = np.divmod(units, scale)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+    two, digits = _TWO_DIGITS, _THREE_DIGITS if scale == 1000 else _TWO_DIGITS
+    return [f"{two[h] if h < 100 else h}:{two[m]}:{two[s]}{decimal_marker}{digits[f]}"
+            for h, m, s, f in zip(hours.tolist(), minutes.tolist(), seconds.tolist(), fractions.tolist())]
+
+def split_cue(segment: dict, max_chars: Optional[int] = None, max_duration: Optional[float] = None) -> List[dict]:
+    """Split a segment into cues of at most ``max_chars`` characters and ``max_duration`` seconds.
+
+    Cues break between words and take their times from the word timestamps.
+    Segments without words are split between words of their text with
+    times interpolated by character position. A single word longer than
+    the limits becomes a cue of its own.
+    """
+    text = segment["text"].strip()
+    if ((max_chars is None or len(text) <= max_chars) and
+            (max_duration is None or segment["end"] - segment["start"] <= max_duration)):
+        return [segment]
+
+    words = segment.get("words")
+    if not words:
+        # Spread the segment's time over its words in proportion to their length
+        tokens = [f" {token}" for token in text.split()]
+        total = sum(len(token) for token in tokens) or 1
+        scale = (segment["end"] - segment["start"]) / total
+        words = []
+        position = 0
+        for token in tokens:
+            start = segment["start"] + position * scale
+            position += len(token)
+            words.append({"word": token, "start": start, "end": segment["start"] + position * scale})
+
+    cues = []
+    current: List[dict] = []
+    length = 0
+    for word in words:
+        word_length = len(word["word"].strip()) if not current else len(word["word"])
+        if current and ((max_chars is not None and length + word_length > max_chars) or
+                        (max_duration is not None and word["end"] - current[0]["start"] > max_duration)):
+            cues.append(current)
+            current, word_length = [], len(word["word"].strip())
+            length = 0
+        current.append(word)
+        length += word_length
+    if current:
+        cues.append(current)
+
+    return [
+        {**{key: segment[key] for key in ("id", "speaker") if key in segment},
+         "start": cue[0]["start"], "end": cue[-1]["end"], "text": "".join(word["word"] for word in cue)}
+        for cue in cues
+    ]
+
+def _batches(segments: Iterable[dict], size: int = WRITE_BATCH_SEGMENTS) -> Iterator[List[dict]]:
+    batch = []
+    for segment in segments:
+        batch.append(segment)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class SegmentWriter:
+    """Base writer: opens ``output_file`` and appends one formatted segment at a time."""
+
+    def __init__(self, output_file: str):
+        # Create directory if it doesn't exist
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        self.output_file = output_file
+        self.count = 0
+        self.file = open(output_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES)
+        self.file.write(self.header())
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+    def format_segment(self, segment: dict) -> str:
+        raise NotImplementedError
+
+    def render(self, segments: List[dict]) -> str:
+        """Formatted text of consecutive segments (advancing the segment count)."""
+        parts = []
+        for segment in segments:
+            parts.append(self.format_segment(segment))
+            self.count += 1
+        return "".join(parts)
+
+    def write(self, segment: dict, flush: bool = True) -> None:
+        """Append one segment, flushing it to disk unless told otherwise."""
+        self.file.write(self.render([segment]))
+        if flush:
+            self.file.flush()
+
+    def write_batch(self, segments: List[dict]) -> None:
+        """Append several segments with one buffered write."""
+        self.file.write(self.render(segments))
+
+    def write_segments(self, segments: Iterable[dict]) -> None:
+        """Append every segment from an iterable (or generator) as it is produced."""
+        for segment in segments:
+            self.write(segment)
+
+    def write_result(self, result: dict) -> None:
+        """Write a complete result at once, e.g. one returned from the cache."""
+        for batch in _batches(result["segments"]):
+            self.write_batch(batch)
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.write(self.footer())
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class TextWriter(SegmentWriter):
+    """Plain transcript text."""
+
+    def format_segment(self, segment: dict) -> str:
+        return segment["text"]
+
+    def write_result(self, result) -> None:
+        # Whole results keep whisper's own text, which may differ in spacing
+        self.file.write(result["text"] if isinstance(result, dict) else result)
+        self.file.flush()
+
+class TimestampedTextWriter(SegmentWriter):
+    """One ``[HH:MM:SS --> HH:MM:SS] text`` line per segment."""
+
+    def render(self, segments: List[dict]) -> str:
+        starts = format_clocks(time_units(segments, "start", 100), 100, ".")
+        ends = format_clocks(time_units(segments, "end", 100), 100, ".")
+        self.count += len(segments)
+        return "".join([f"[{start} --> {end}] {segment['text']}\n"
+                        for start, end, segment in zip(starts, ends, segments)])
+
+class SubtitleWriter(SegmentWriter):
+    """Subtitle cues, optionally split to a maximum length and duration."""
+
+    decimal_marker = ","
+
+    def __init__(self, output_file: str, max_chars: Optional[int] = None, max_duration: Optional[float] = None):
+        self.max_chars = max_chars
+        self.max_duration = max_duration
+        super().__init__(output_file)
+
+    @property
+    def splits_cues(self) -> bool:
+        return self.max_chars is not None or self.max_duration is not None
+
+    def cues(self, segments: List[dict]) -> List[dict]:
+        if not self.splits_cues:
+            return segments
+        return [cue for segment in segments for cue in split_cue(segment, self.max_chars, self.max_duration)]
+
+    def render(self, segments: List[dict], split: bool = True) -> str:
+        cues = self.cues(segments) if split else segments
+        starts = format_clocks(time_units(cues, "start"), 1000, self.decimal_marker)
+        ends = format_clocks(time_units(cues, "end"), 1000, self.decimal_marker)
+        parts = [self.format_cue(self.count + i + 1, f"{start} --> {end}", cue["text"].strip())
+                 for i, (start, end, cue) in enumerate(zip(starts, ends, cues))]
+        self.count += len(cues)
+        return "".join(parts)
+
+    def write_batch(self, segments: List[dict], split: bool = True) -> None:
+        self.file.write(self.render(segments, split))
+
+    def format_cue(self, number: int, times: str, text: str) -> str:
+        """One cue, given its number, ``start --> end`` line and text."""
+        raise NotImplementedError
+
+class SrtWriter(SubtitleWriter):
+    """SubRip subtitles."""
+
+    def format_cue(self, number: int, times: str, text: str) -> str:
+        return f"{number}\n{times}\n{text}\n\n"
+
+class VttWriter(SubtitleWriter):
+    """WebVTT subtitles."""
+
+    decimal_marker = "."
+
+    def header(self) -> str:
+        return "WEBVTT\n\n"
+
+    def format_cue(self, number: int, times: str, text: str) -> str:
+        return f"{times}\n{text}\n\n"
+
+# Tabs and line breaks inside a TSV text field become spaces
+_TSV_SPACES = str.maketrans("\t\r\n", "   ")
+
+class TsvWriter(SegmentWriter):
+    """Tab-separated start and end in integer milliseconds, and text."""
+
+    def header(self) -> str:
+        return "start\tend\ttext\n"
+
+    def render(self, segments: List[dict]) -> str:
+        starts = time_units(segments, "start").tolist()
+        ends = time_units(segments, "end").tolist()
+        self.count += len(segments)
+        return "".join([f"{start}\t{end}\t{segment['text'].strip().translate(_TSV_SPACES)}\n"
+                        for start, end, segment in zip(starts, ends, segments)])
+
+class JsonWriter(SegmentWriter):
+    """``{"segments": [...]}`` with one compact segment object per line.
+
+    The document is only valid once :meth:`close` has written its closing
+    brackets, so a killed run leaves invalid JSON; see :class:`JsonLinesWriter`.
+    """
+
+    # Segment fields written; whisper's token ids and decoding statistics are left out
+    FIELDS = ("id", "start", "end", "text", "speaker", "words")
+
+    def header(self) -> str:
+        return '{"segments": [\n'
+
+    def footer(self) -> str:
+        return '\n]}\n'
+
+    # One encoder for every segment instead of building one per json.dumps call
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def render(self, segments: List[dict]) -> str:
+        fields = self.FIELDS
+        objects = ",\n".join([self.encoder.encode({key: segment[key] for key in fields if key in segment})
+                               for segment in segments])
+        separator = ",\n" if self.count and segments else ""
+        self.count += len(segments)
+        return separator + objects
+
+class JsonLinesWriter(JsonWriter):
+    """JSON Lines: one compact segment object per line, every finished line valid on its own."""
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+    def render(self, segments: List[dict]) -> str:
+        fields = self.FIELDS
+        self.count += len(segments)
+        return "".join([self.encoder.encode({key: segment[key] for key in fields if key in segment}) + "\n"
+                        for segment in segments])
+
+WRITERS = {
+    "txt": TextWriter,
+    "timestamped": TimestampedTextWriter,
+    "srt": SrtWriter,
+    "vtt": VttWriter,
+    "tsv": TsvWriter,
+    "json": JsonWriter,
+    "jsonl": JsonLinesWriter
+}
+
+# File extension written for each format in a batch or multi-format run
+EXTENSIONS = {
+    "txt": "txt",
+    "timestamped": "timestamped.txt",
+    "srt": "srt",
+    "vtt": "vtt",
+    "tsv": "tsv",
+    "json": "json",
+    "jsonl": "jsonl"
+}
+
+class MultiWriter:
+    """Fan each segment out to several writers, e.g. SRT and VTT at once."""
+
+    def __init__(self, writers: List[SegmentWriter]):
+        self.writers = writers
+
+    def write(self, segment: dict, flush: bool = True) -> None:
+        for writer in self.writers:
+            writer.write(segment, flush)
+
+    def write_segments(self, segments: Iterable[dict]) -> None:
+        for segment in segments:
+            self.write(segment)
+
+    def write_result(self, result: dict) -> None:
+        """Write a complete result to every format in a single pass over its segments."""
+        batch_writers = []
+        for writer in self.writers:
+            if isinstance(writer, TextWriter):
+                # Plain text is whisper's own text, written at once
+                writer.write_result(result)
+            else:
+                batch_writers.append(writer)
+
+        for batch in _batches(result["segments"]):
+            # Subtitle writers with the same limits share one split of the batch
+            cues = {}
+            for writer in batch_writers:
+                if isinstance(writer, SubtitleWriter) and writer.splits_cues:
+                    limits = (writer.max_chars, writer.max_duration)
+                    if limits not in cues:
+                        cues[limits] = writer.cues(batch)
+                    writer.write_batch(cues[limits], split=False)
+                else:
+                    writer.write_batch(batch)
+
+        for writer in batch_writers:
+            writer.file.flush()
+
+    def close(self) -> None:
+        for writer in self.writers:
+            writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def open_writer(format_type: str, output_file: str, max_chars: Optional[int] = None,
+                max_duration: Optional[float] = None) -> SegmentWriter:
+    """Open a writer for one of the formats in ``WRITERS``.
+
+    ``max_chars`` and ``max_duration`` limit the cues of SRT and VTT output.
+    """
+    if format_type not in WRITERS:
+        raise ValueError(f"Unsupported output format: {format_type} (choose from {', '.join(WRITERS)})")
+    writer_class = WRITERS[format_type]
+    if issubclass(writer_class, SubtitleWriter):
+        return writer_class(output_file, max_chars=max_chars, max_duration=max_duration)
+    return writer_class(output_file)
+
+def open_writers(output_base: str, formats: Iterable[str], max_chars: Optional[int] = None,
+                 max_duration: Optional[float] = None) -> MultiWriter:
+    """Open ``{output_base}.{extension}`` for each format."""
+    writers = []
+    try:
+        for format_type in formats:
+            writers.append(open_writer(format_type, f"{output_base}.{EXTENSIONS[format_type]}",
+                                       max_chars=max_chars, max_duration=max_duration))
+    except Exception:
+        MultiWriter(writers).close()
+        raise
+    return MultiWriter(writers)
+
+def export_result(result: dict, output_base: str, formats: Iterable[str], max_chars: Optional[int] = None,
+                  max_duration: Optional[float] = None) -> Dict[str, str]:
+    """Write a complete result in every format in one pass and return the path per format."""
+    formats = list(formats)
+    with open_writers(output_base, formats, max_chars=max_chars, max_duration=max_duration) as writers:
+        writers.write_result(result)
+    return {format_type: f"{output_base}.{EXTENSIONS[format_type]}" for format_type in formats}
@@ -0,0 +1,131 @@
+"""Assign diarization speakers to transcript segments and words by time overlap.
+
+Each segment (or word, when whisper produced word timestamps) gets the
+speaker whose turns overlap it the longest. Instead of testing every turn
+against every segment, each speaker's turns are merged into sorted disjoint
+intervals with a running total of their durations, so the time a speaker
+covers up to any instant is one binary search away. The overlap of
+``[start, end]`` with a speaker is then ``covered(end) - covered(start)``,
+computed for all segments at once with ``np.searchsorted``.
+
+That costs O(m log m) to prepare m turns and O(n log m) per speaker for n
+segments, i.e. O((n + m) log m) for the handful of speakers a recording
+has, with O(n + m) memory. Overlapping speech is handled naturally: each
+speaker's share is measured separately.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Label of segments no speaker turn overlaps
+UNKNOWN_SPEAKER = "UNKNOWN"
+
+# Overlaps closer than this (seconds) count as a tie, absorbing rounding in the cumulative sums
+TIE_SECONDS = 1e-6
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sort intervals and merge the overlapping or touching ones."""
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    # Running maximum of the ends: an interval starting after it begins a new run
+    reach = np.maximum.accumulate(ends)
+    new_run = np.empty(len(starts), dtype=bool)
+    new_run[:1] = True
+    new_run[1:] = starts[1:] > reach[:-1]
+    run_ends = np.append(np.flatnonzero(new_run)[1:] - 1, len(starts) - 1)
+    return starts[new_run], reach[run_ends]
+
+class SpeakerTimeline:
+    """Disjoint turns per speaker with cumulative durations, for overlap queries."""
+
+    def __init__(self, turn_starts: Sequence[float], turn_ends: Sequence[float], turn_speakers: Sequence[str]):
+        turn_starts = np.asarray(turn_starts, dtype=np.float64)
+        turn_ends = np.asarray(turn_ends, dtype=np.float64)
+        self.speakers, speaker_index = np.unique(np.asarray(turn_speakers, dtype=str), return_inverse=True)
+        self._intervals: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for index in range(len(self.speakers)):
+            mask = speaker_index == index
+            starts, ends = merge_intervals(turn_starts[mask], turn_ends[mask])
+            # covered[i]: total duration of this speaker's intervals before interval i
+            covered = np.concatenate(([0.0], np.cumsum(ends - starts)))
+            self._intervals.append((starts, ends, covered))
+
+    @classmethod
+    def from_turns(cls, speaker_turns: List[dict]) -> "SpeakerTimeline":
+        """Build from ``{"start", "end", "speaker"}`` dicts."""
+        return cls([turn["start"] for turn in speaker_turns], [turn["end"] for turn in speaker_turns],
+                   [turn["speaker"] for turn in speaker_turns])
+
+    def _covered(self, speaker: int, times: np.ndarray) -> np.ndarray:
+        """Seconds of ``speaker``'s turns before each of ``times``."""
+        starts, ends, covered = self._intervals[speaker]
+        # Intervals starting before each time; the last of them may still be running
+        i = np.searchsorted(starts, times, side="right")
+        last = np.maximum(i - 1, 0)
+        running = np.where(i > 0, np.minimum(times, ends[last]) - starts[last], 0.0)
+        return covered[last] + running
+
+    def overlaps(self, speaker: int, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Seconds of ``speaker``'s turns inside each ``[start, end]``."""
+        return self._covered(speaker, ends) - self._covered(speaker, starts)
+
+    def assign(self, starts: Sequence[float], ends: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Index into :attr:`speakers` of the longest-overlapping speaker per interval (-1 for none).
+
+        Also returns the overlap in seconds. Ties go to the speaker that
+        sorts first.
+        """
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.maximum(np.asarray(ends, dtype=np.float64), starts)
+        best = np.full(len(starts), -1, dtype=np.int64)
+        best_overlap = np.zeros(len(starts))
+        for speaker in range(len(self.speakers)):
+            overlap = self.overlaps(speaker, starts, ends)
+            better = overlap > best_overlap + TIE_SECONDS
+            best[better] = speaker
+            best_overlap[better] = overlap[better]
+        return best, best_overlap
+
+    def labels(self, starts: Sequence[float], ends: Sequence[float]) -> List[str]:
+        """Speaker label of each interval, :data:`UNKNOWN_SPEAKER` where no turn overlaps it."""
+        best, _ = self.assign(starts, ends)
+        names = np.append(self.speakers, UNKNOWN_SPEAKER).astype(object)
+        return names[best].tolist()
+
+def assign_speakers(segments: List[dict], speaker_turns: List[dict]) -> None:
+    """Set ``speaker`` on every segment, and on every word that has timestamps, in place."""
+    timeline = SpeakerTimeline.from_turns(speaker_turns)
+
+    for segment, speaker in zip(segments, timeline.labels([s["start"] for s in segments],
+                                                          [s["end"] for s in segments])):
+        segment["speaker"] = speaker
+
+    words = [word for segment in segments for word in segment.get("words") or []]
+    if words:
+        for word, speaker in zip(words, timeline.labels([w["start"] for w in words], [w["end"] for w in words])):
+            word["speaker"] = speaker
+
+def format_speaker_transcript(segments: List[dict]) -> str:
+    """Transcript with a ``[SPEAKER]:`` line at every change of speaker.
+
+    Speakers change mid-segment where words carry their own labels. Parts
+    are collected in a list and joined once.
+    """
+    lines: List[str] = []
+    parts: List[str] = []
+    current_speaker = None
+
+    for segment in segments:
+        pieces = [(word.get("speaker", segment["speaker"]), word["word"]) for word in segment.get("words") or []]
+        for speaker, text in pieces or [(segment["speaker"], segment["text"])]:
+            if speaker != current_speaker:
+                if parts:
+                    lines.append(f"[{current_speaker}]: {''.join(parts).strip()}")
+                parts = []
+                current_speaker = speaker
+            parts.append(text)
+
+    if parts:
+        lines.append(f"[{current_speaker}]: {''.join(parts).strip()}")
+    return "\n".join(lines)
@@ -0,0 +1,222 @@
+"""Persistent registry of known speakers, matched by voice embedding.
+
+Diarization labels speakers per file (``SPEAKER_00``, ``SPEAKER_01``...).
+The registry keeps one L2-normalised embedding per enrolled voice in a flat
+float32 file that is memory-mapped rather than loaded, with the speaker
+name of each row in a JSON-lines file next to it. Matching a file's
+speaker clusters against every known voice is a single matrix multiply
+(cosine similarity, since all rows are normalised), so it stays fast with
+thousands of enrolled speakers. A cluster is given the name of the best
+matching voice above a similarity threshold; each known speaker is used at
+most once per file. Clusters that match nobody are enrolled under a new
+stable name, so recurring participants keep the same name across an
+archive without re-clustering earlier files. Names can be changed later
+with :meth:`SpeakerRegistry.rename`.
+
+Rows are only ever appended, so enrolling a voice writes one embedding
+instead of rewriting the matrix. Writers take an exclusive file lock, so
+several processes can share a registry directory.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Default registry location, next to the transcription cache
+DEFAULT_REGISTRY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "speech-to-text-transcriber", "speakers")
+
+# Cosine similarity above which a cluster is taken to be a known speaker
+MATCH_THRESHOLD = float(os.environ.get("TRANSCRIBER_SPEAKER_THRESHOLD", 0.7))
+
+EMBEDDINGS_FILE = "embeddings.f32"
+SPEAKERS_FILE = "speakers.jsonl"
+LOCK_FILE = ".lock"
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length (rows of zeros stay zero)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+class SpeakerRegistry:
+    """Enrolled voices in ``directory``: a memory-mapped embedding matrix plus row names."""
+
+    def __init__(self, directory: str = DEFAULT_REGISTRY_DIR, threshold: float = MATCH_THRESHOLD):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.threshold = threshold
+        self.embeddings_path = os.path.join(directory, EMBEDDINGS_FILE)
+        self.speakers_path = os.path.join(directory, SPEAKERS_FILE)
+        self._lock = threading.Lock()
+        self._records: List[dict] = []
+        self._loaded_size = 0
+        self._matrix: Optional[np.ndarray] = None
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock shared with other processes using this directory."""
+        with self._lock, open(os.path.join(self.directory, LOCK_FILE), "a") as lock_file:
+            try:
+                import fcntl
+            except ImportError:
+                # No advisory locks (Windows): only threads of this process are serialized
+                yield
+                return
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Read the rows other processes (or this one) appended since the last call."""
+        try:
+            size = os.path.getsize(self.speakers_path)
+        except OSError:
+            size = 0
+        if size == self._loaded_size:
+            return
+        if size < self._loaded_size:
+            # Replaced from outside: start over
+            self._records, self._loaded_size = [], 0
+
+        with open(self.speakers_path, "rb") as f:
+            f.seek(self._loaded_size)
+            data = f.read(size - self._loaded_size)
+        # A line still being written is picked up next time
+        data = data[:data.rfind(b"\n") + 1]
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Remains of a write cut short by a crash
+                continue
+            if "rename" in record:
+                # Renames apply to the voices enrolled before them
+                for row in self._records:
+                    if row["speaker"] == record["rename"]:
+                        row["speaker"] = record["speaker"]
+            else:
+                self._records.append(record)
+        self._loaded_size += len(data)
+        self._matrix = None
+
+    @property
+    def _rows(self) -> List[dict]:
+        """Enrolled voices whose embedding row is complete (a crash can fall between the two writes)."""
+        if not self._records:
+            return []
+        available = os.path.getsize(self.embeddings_path) // (4 * self._records[0]["dim"])
+        return self._records[:available]
+
+    def _index(self) -> Optional[np.ndarray]:
+        """The memory-mapped embedding matrix, re-mapped after rows were added."""
+        self._refresh()
+        if self._matrix is None:
+            rows = self._rows
+            if not rows:
+                return None
+            self._matrix = np.memmap(self.embeddings_path, dtype=np.float32, mode="r",
+                                     shape=(len(rows), rows[0]["dim"]))
+            # Speaker of each row, as an index into the sorted unique names
+            self._names, self._name_index = np.unique([row["speaker"] for row in rows], return_inverse=True)
+        return self._matrix
+
+    def speakers(self) -> List[str]:
+        """Names of the enrolled speakers, in order of enrolment."""
+        self._refresh()
+        return list(dict.fromkeys(row["speaker"] for row in self._rows))
+
+    def __len__(self) -> int:
+        """Number of enrolled voices (a speaker may have several)."""
+        self._refresh()
+        return len(self._rows)
+
+    def match(self, embeddings: Dict[str, np.ndarray]) -> Dict[str, Optional[str]]:
+        """Known speaker name for each cluster label, or None where nobody is similar enough.
+
+        Each known speaker is given to at most one cluster of the file, the
+        most similar one.
+        """
+        labels = [label for label, vector in embeddings.items() if np.all(np.isfinite(vector))]
+        names: Dict[str, Optional[str]] = {label: None for label in embeddings}
+        if not labels:
+            return names
+
+        queries = normalize_rows(np.stack([embeddings[label] for label in labels]))
+        matrix = self._index()
+        if matrix is None:
+            return names
+        if queries.shape[1] != matrix.shape[1]:
+            raise ValueError(f"Embedding size {queries.shape[1]} does not match the registry's {matrix.shape[1]}")
+
+        # Similarity of every cluster to every known speaker (best of their voices)
+        scores = matrix @ queries.T
+        by_speaker = np.full((len(self._names), len(labels)), -np.inf, dtype=np.float32)
+        np.maximum.at(by_speaker, self._name_index, scores)
+
+        # Greedy one-to-one assignment, most similar pair first
+        for _ in range(len(labels)):
+            speaker, cluster = np.unravel_index(np.argmax(by_speaker), by_speaker.shape)
+            if by_speaker[speaker, cluster] < self.threshold:
+                break
+            names[labels[cluster]] = str(self._names[speaker])
+            by_speaker[speaker, :] = -np.inf
+            by_speaker[:, cluster] = -np.inf
+        return names
+
+    def enroll(self, name: Optional[str], embedding: np.ndarray, source: Optional[str] = None) -> str:
+        """Append a voice embedding for ``name`` (a new ``SPEAKER_nnnn`` when None) and return the name."""
+        vector = normalize_rows(embedding)[0]
+        with self._file_lock():
+            self._refresh()
+            rows = self._rows
+            # Chosen under the lock, so two processes cannot hand out the same name
+            name = name or self.new_name()
+            if rows and len(vector) != rows[0]["dim"]:
+                raise ValueError(f"Embedding size {len(vector)} does not match the registry's {rows[0]['dim']}")
+            # Drop a partial row left by a crash before appending
+            with open(self.embeddings_path, "ab") as f:
+                f.truncate(len(rows) * 4 * len(vector))
+                f.write(vector.astype(np.float32).tobytes())
+            with open(self.speakers_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"speaker": name, "dim": len(vector), "source": source,
+                                    "enrolled_at": time.time()}) + "\n")
+        return name
+
+    def new_name(self) -> str:
+        """Next unused ``SPEAKER_nnnn`` name."""
+        taken = set(self.speakers())
+        number = len(taken)
+        while f"SPEAKER_{number:04d}" in taken:
+            number += 1
+        return f"SPEAKER_{number:04d}"
+
+    def identify(self, embeddings: Dict[str, np.ndarray], source: Optional[str] = None,
+                 enroll_unknown: bool = True) -> Dict[str, str]:
+        """Registry name for each cluster label of one file.
+
+        Unmatched clusters are enrolled under a new name (or keep their
+        per-file label with ``enroll_unknown=False``). Clusters without a
+        usable embedding keep their label.
+        """
+        names = self.match(embeddings)
+        for label, name in names.items():
+            if name is None:
+                if enroll_unknown and np.all(np.isfinite(embeddings[label])):
+                    name = self.enroll(None, embeddings[label], source=source)
+                else:
+                    name = label
+            names[label] = name
+        return names
+
+    def rename(self, old_name: str, new_name: str) -> None:
+        """Give an enrolled speaker a real name; every voice enrolled for it follows."""
+        with self._file_lock():
+            with open(self.speakers_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"rename": old_name, "speaker": new_name, "renamed_at": time.time()}) + "\n")
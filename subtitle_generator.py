@@ -1,52 +1,33 @@
 import os
-from datetime import timedelta
 
-def format_timestamp(seconds, format_type="srt"):
-    """Convert seconds to SRT or VTT timestamp format."""
-    td = timedelta(seconds=seconds)
-    hours, remainder = divmod(td.seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    milliseconds = td.microseconds // 1000
-    
-    if format_type == "srt":
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
-    else:  # vtt
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{milliseconds:03d}"
+from segment_writers import EXTENSIONS, export_result, open_writer, open_writers
+from tracing import TRANSCRIBE, WRITE, span
 
 def generate_subtitles(segments, output_file, format_type="srt"):
-    """Generate subtitle file from segments."""
+    """Generate subtitle file from segments.
+
+    ``segments`` may be a generator; each segment is written as it arrives.
+    """
     if format_type not in ["srt", "vtt"]:
         raise ValueError("Format type must be 'srt' or 'vtt'")
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        # Write header for VTT
-        if format_type == "vtt":
-            f.write("WEBVTT\n\n")
-        
-        for i, segment in enumerate(segments):
-            # Index (only for SRT)
-            if format_type == "srt":
-                f.write(f"{i+1}\n")
-            
-            # Timestamps
-            start = format_timestamp(segment['start'], format_type)
-            end = format_timestamp(segment['end'], format_type)
-            
-            if format_type == "srt":
-                f.write(f"{start} --> {end}\n")
-            else:  # vtt
-                f.write(f"{start} --> {end}\n")
-            
-            # Text
-            f.write(f"{segment['text'].strip()}\n\n")
+    with open_writer(format_type, output_file) as writer:
+        writer.write_segments(segments)
+
+def transcribe_with_timestamps(input_file, model_size="base", model=None, language=None, vad=False):
+    """Transcribe audio with timestamps for each segment.
 
-def transcribe_with_timestamps(input_file, model_size="base", model=None, language=None):
-    """Transcribe audio with timestamps for each segment."""
-    import whisper
+    ``input_file`` may be a path or an already decoded 16 kHz waveform.
+    With ``vad`` only speech is transcribed; timestamps still refer to the
+    original audio so the subtitles stay aligned.
+    """
+    from audio_utils import audio_duration, ensure_audio
+    from model_registry import get_model
+    from vad import transcribe_speech_only
     
     # Load model if not provided
     if model is None:
-        model = whisper.load_model(model_size)
+        model = get_model(model_size)
     
     # Prepare transcription options
     transcribe_options = {
@@ -58,14 +39,52 @@ def transcribe_with_timestamps(input_file, model_size="base", model=None, langua
         transcribe_options["language"] = language
     
     # Transcribe with word-level timestamps
-    result = model.transcribe(input_file, **transcribe_options)
+    audio = ensure_audio(input_file)
+    if vad:
+        result = transcribe_speech_only(model, audio, transcribe_options)
+    else:
+        with span(TRANSCRIBE, audio_seconds=audio_duration(audio)):
+            result = model.transcribe(audio, **transcribe_options)
     
     return result
 
-def save_subtitles(result, output_base, formats=["srt", "vtt"]):
-    """Save transcription as subtitle files."""
+def save_subtitles(result, output_base, formats=["srt", "vtt"], max_chars=None, max_duration=None):
+    """Save transcription as subtitle (or other transcript) files in one pass over the segments.
+
+    ``max_chars`` and ``max_duration`` split SRT and VTT cues at word
+    boundaries using the word timestamps.
+    """
+    with span(WRITE):
+        paths = export_result(result, output_base, formats, max_chars=max_chars, max_duration=max_duration)
+    for format_type, output_file in paths.items():
+        print(f"Saved {format_type.upper()} to {output_file}")
+
+def stream_subtitles(input_file, output_base, formats=["srt", "vtt"], model_size="base", model=None,
+                     language=None, vad=False, max_chars=None, max_duration=None):
+    """Transcribe a file window by window, appending cues to every subtitle file as they are decoded.
+
+    The first cues are on disk after the first 30-second window, and an
+    interrupted run leaves valid subtitles for everything transcribed so far.
+    Returns the number of cues written.
+    """
+    from model_registry import get_model
+    from transcriber import iter_segments
+    
+    # Load model if not provided
+    if model is None:
+        model = get_model(model_size)
+    
+    transcribe_options = {
+        "word_timestamps": True
+    }
+    if language and language != "auto":
+        transcribe_options["language"] = language
+    
+    with open_writers(output_base, formats, max_chars=max_chars, max_duration=max_duration) as writers:
+        writers.write_segments(iter_segments(model, input_file, transcribe_options, vad=vad))
+        count = writers.writers[0].count if writers.writers else 0
+    
     for format_type in formats:
-        output_file = f"{output_base}.{format_type}"
-        generate_subtitles(result["segments"], output_file, format_type)
-        print(f"Saved {format_type.upper()} subtitles to {output_file}")
+        print(f"Saved {format_type.upper()} to {output_base}.{EXTENSIONS[format_type]}")
+    return count
 
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segment_writers import EXTENSIONS, export_result, format_clocks, open_writer, split_cue
+
+SEGMENTS = [
+    {"id": 0, "start": 0.0, "end": 2.5, "text": " Hello there."},
+    {"id": 1, "start": 2.5, "end": 3661.0015, "text": " Tab\tand\nnewline."},
+    {"id": 2, "start": 3661.5, "end": 3663.0, "text": " A longer line that will be split.",
+     "words": [{"word": " A", "start": 3661.5, "end": 3661.7}, {"word": " longer", "start": 3661.7, "end": 3662.0},
+               {"word": " line", "start": 3662.0, "end": 3662.3}, {"word": " that", "start": 3662.3, "end": 3662.5},
+               {"word": " will", "start": 3662.5, "end": 3662.7}, {"word": " be", "start": 3662.7, "end": 3662.8},
+               {"word": " split.", "start": 3662.8, "end": 3663.0}]}
+]
+
+SRT = ("1\n00:00:00,000 --> 00:00:02,500\nHello there.\n\n"
+       "2\n00:00:02,500 --> 01:01:01,002\nTab\tand\nnewline.\n\n"
+       "3\n01:01:01,500 --> 01:01:03,000\nA longer line that will be split.\n\n")
+
+VTT = ("WEBVTT\n\n"
+       "00:00:00.000 --> 00:00:02.500\nHello there.\n\n"
+       "00:00:02.500 --> 01:01:01.002\nTab\tand\nnewline.\n\n"
+       "01:01:01.500 --> 01:01:03.000\nA longer line that will be split.\n\n")
+
+TSV = ("start\tend\ttext\n"
+       "0\t2500\tHello there.\n"
+       "2500\t3661002\tTab and newline.\n"
+       "3661500\t3663000\tA longer line that will be split.\n")
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def test_export_result_formats(tmp_path):
+    result = {"text": "".join(segment["text"] for segment in SEGMENTS), "segments": SEGMENTS}
+    paths = export_result(result, str(tmp_path / "transcript"), ["srt", "vtt", "tsv"])
+    assert read(paths["srt"]) == SRT
+    assert read(paths["vtt"]) == VTT
+    assert read(paths["tsv"]) == TSV
+
+def test_incremental_writers_match_export(tmp_path):
+    for format_type, expected in (("srt", SRT), ("vtt", VTT), ("tsv", TSV)):
+        path = str(tmp_path / f"incremental.{EXTENSIONS[format_type]}")
+        with open_writer(format_type, path) as writer:
+            for segment in SEGMENTS:
+                writer.write(segment)
+        assert read(path) == expected
+
+def test_format_clocks():
+    units = np.array([0, 1, 59999, 3600000, 360000000])
+    assert format_clocks(units) == ["00:00:00,000", "00:00:00,001", "00:00:59,999", "01:00:00,000", "100:00:00,000"]
+    assert format_clocks(np.array([6150]), scale=100, decimal_marker=".") == ["00:01:01.50"]
+
+def test_split_cue_on_word_timestamps():
+    cues = split_cue(SEGMENTS[2], max_chars=16)
+    assert [(cue["start"], cue["end"], cue["text"]) for cue in cues] == [
+        (3661.5, 3662.3, " A longer line"), (3662.3, 3662.8, " that will be"), (3662.8, 3663.0, " split.")
+    ]
+
+def test_split_cue_without_words_interpolates_times():
+    cues = split_cue({"start": 0.0, "end": 4.0, "text": " aaaa bbbb cccc dddd"}, max_duration=2.0)
+    assert [(cue["start"], cue["end"], cue["text"]) for cue in cues] == [
+        (0.0, 2.0, " aaaa bbbb"), (2.0, 4.0, " cccc dddd")
+    ]
+
+def test_srt_cues_split_with_limits(tmp_path):
+    result = {"text": SEGMENTS[2]["text"], "segments": [SEGMENTS[2]]}
+    paths = export_result(result, str(tmp_path / "split"), ["srt"], max_chars=16)
+    assert read(paths["srt"]) == ("1\n01:01:01,500 --> 01:01:02,300\nA longer line\n\n"
+                                  "2\n01:01:02,300 --> 01:01:02,800\nthat will be\n\n"
+                                  "3\n01:01:02,800 --> 01:01:03,000\nsplit.\n\n")
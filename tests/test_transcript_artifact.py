@@ -0,0 +1,41 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transcript_artifact import load_artifact, save_artifact
+
+def whisper_result():
+    segments = [
+        {"id": 0, "start": 0.0, "end": 2.5, "text": " Hello there.", "avg_logprob": -0.25,
+         "no_speech_prob": 0.02, "compression_ratio": 1.4, "temperature": 0.0},
+        {"id": 1, "start": 2.5, "end": 4.0, "text": " Général Kenobi.", "avg_logprob": -0.5,
+         "no_speech_prob": 0.1, "compression_ratio": 1.2, "temperature": 0.2,
+         "words": [{"word": " Général", "start": 2.5, "end": 3.1, "probability": 0.87},
+                   {"word": " Kenobi.", "start": 3.1, "end": 4.0}]},
+        {"id": 2, "start": 4.0, "end": 5.0, "text": " No words here."},
+        {"id": 3, "start": 5.0, "end": 5.0, "text": "", "words": []}
+    ]
+    return {"text": "".join(segment["text"] for segment in segments), "segments": segments, "language": "en"}
+
+def test_round_trip_with_words_on_some_segments(tmp_path):
+    result = whisper_result()
+    path = save_artifact(result, str(tmp_path / "result.transcript"))
+    assert load_artifact(path).to_result() == result
+
+def test_round_trip_diarized(tmp_path):
+    result = whisper_result()
+    for segment, speaker in zip(result["segments"], ["SPEAKER_00", "SPEAKER_01", "SPEAKER_00", "SPEAKER_01"]):
+        segment["speaker"] = speaker
+    result["segments"][1]["words"][0]["speaker"] = "SPEAKER_01"
+    result["text"] = "SPEAKER_00: Hello there.\nSPEAKER_01: Général Kenobi.\n"
+    result["speaker_turns"] = [{"start": 0.0, "end": 2.5, "speaker": "SPEAKER_00"},
+                               {"start": 2.5, "end": 4.0, "speaker": "SPEAKER_01"}]
+    result["speaker_names"] = {"SPEAKER_00": "Alice"}
+    path = save_artifact(result, str(tmp_path / "diarized.transcript"))
+    assert load_artifact(path).to_result() == result
+
+def test_round_trip_without_segments(tmp_path):
+    result = {"text": "", "segments": [], "language": None}
+    path = save_artifact(result, str(tmp_path / "empty.transcript"))
+    assert load_artifact(path).to_result() == result
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_utils import SAMPLE_RATE
+from vad import SpeechMap, detect_speech
+
+def tone(seconds: float, amplitude: float = 0.3, frequency: float = 220.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+def test_audio_without_silence_is_all_speech():
+    audio = tone(30.0)
+    assert detect_speech(audio) == [(0, len(audio))]
+
+def test_steady_noise_bed_under_speech_is_kept():
+    rng = np.random.default_rng(0)
+    audio = (0.05 * rng.standard_normal(30 * SAMPLE_RATE)).astype(np.float32)
+    audio[SAMPLE_RATE:SAMPLE_RATE + SAMPLE_RATE // 5] += tone(0.2)
+    assert detect_speech(audio) == [(0, len(audio))]
+
+def test_silence_between_speech_is_skipped():
+    silence = np.zeros(5 * SAMPLE_RATE, dtype=np.float32)
+    audio = np.concatenate([silence, tone(2.0), silence, tone(2.0), silence])
+    spans = detect_speech(audio)
+    assert len(spans) == 2
+    assert sum(end - start for start, end in spans) < 6 * SAMPLE_RATE
+
+def test_silent_audio_has_no_speech():
+    assert detect_speech(np.zeros(10 * SAMPLE_RATE, dtype=np.float32)) == []
+
+def test_end_on_span_boundary_stays_in_earlier_span():
+    speech_map = SpeechMap([(0, SAMPLE_RATE), (3 * SAMPLE_RATE, 4 * SAMPLE_RATE)])
+    assert speech_map.to_original(1.0) == 3.0
+    assert speech_map.to_original(1.0, end=True) == 1.0
+
+    segments = [{"start": 0.5, "end": 1.0, "words": [{"start": 0.5, "end": 1.0}]},
+                {"start": 1.0, "end": 1.5}]
+    speech_map.map_segments(segments)
+    assert (segments[0]["start"], segments[0]["end"]) == (0.5, 1.0)
+    assert segments[0]["words"][0]["end"] == 1.0
+    assert (segments[1]["start"], segments[1]["end"]) == (3.0, 3.5)
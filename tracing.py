@@ -0,0 +1,299 @@
+"""Per-stage timing and memory spans for a transcription run.
+
+A :class:`Tracer` records a span for every stage of the pipeline (header
+probing, audio decoding, model loading, log-mel computation, encoder and
+decoder passes, word alignment, diarization and writing) with its duration
+and the peak resident memory of the process while it ran. The result shows
+whether a slow job is waiting on I/O, on the model or on memory.
+
+Spans are opened with the module-level :func:`span`, which does nothing
+unless a tracer is active in the current thread (see :func:`tracing`), so
+the pipeline can be instrumented without passing a tracer around. Whisper's
+internal mel, encoder, decoder and alignment steps are timed by wrapping
+the functions ``model.transcribe`` calls, the same way ``progress.py``
+reads whisper's frame counter.
+
+The CLI writes a tracer's JSON with ``--trace``, the web workers put its
+per-stage summary on the job record, and ``profile`` additionally runs
+cProfile over the traced thread and writes pstats output. Span start times
+are also recorded as wall-clock timestamps, so they can be lined up with an
+external sampling profiler such as ``py-spy record``.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Stages recorded by the pipeline
+PROBE = "probe"
+DECODE_AUDIO = "decode_audio"
+MODEL_LOAD = "model_load"
+VAD = "vad"
+TRANSCRIBE = "transcribe"
+MEL = "mel"
+ENCODE = "encode"
+DECODE = "decode"
+ALIGNMENT = "alignment"
+DIARIZATION = "diarization"
+WRITE = "write"
+FILE = "file"
+
+# Seconds between resident memory samples taken while spans are open
+RSS_SAMPLE_SECONDS = 0.05
+
+MB = 1024 * 1024
+
+# Tracer receiving the spans opened in the current thread
+_local = threading.local()
+
+def current_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (None where it cannot be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / MB
+    except (OSError, ValueError, AttributeError):
+        # No /proc (e.g. macOS): fall back to the process high-water mark
+        return max_rss_mb()
+
+def max_rss_mb() -> Optional[float]:
+    """Highest resident memory this process has reached, in MB."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    divisor = MB if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+
+class Tracer:
+    """Collects the spans of one run (a CLI invocation, a batch or a web job)."""
+
+    def __init__(self, name: str = "run", profile: Optional[str] = None,
+                 sample_seconds: float = RSS_SAMPLE_SECONDS):
+        """
+        Args:
+            name: Label stored in the trace, e.g. the job id
+            profile: Write cProfile stats of the traced thread to this path on close
+            sample_seconds: Interval of the resident memory sampler
+        """
+        self.name = name
+        self.profile_path = profile
+        self.sample_seconds = sample_seconds
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: List[dict] = []
+        self._open: List[dict] = []
+        self._stacks = threading.local()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._profiler = None
+        self._closed = False
+
+        if profile:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def _stack(self) -> List[int]:
+        stack = getattr(self._stacks, "spans", None)
+        if stack is None:
+            stack = self._stacks.spans = []
+        return stack
+
+    def _start_sampler(self) -> None:
+        """Sample resident memory in the background so each span gets its own peak."""
+        if self._sampler is None and not self._closed:
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_seconds):
+            rss = current_rss_mb()
+            if rss is None:
+                return
+            with self._lock:
+                for record in self._open:
+                    record["peak_rss_mb"] = max(record["peak_rss_mb"], rss)
+
+    def _begin(self, stage: str, start: float, attrs: dict) -> dict:
+        rss = current_rss_mb()
+        stack = self._stack()
+        record = {
+            "stage": stage,
+            "start": round(start - self.origin, 6),
+            "wall_start": self.started_at + (start - self.origin),
+            "seconds": None,
+            "rss_mb": rss,
+            "peak_rss_mb": rss or 0.0,
+            "parent": stack[-1] if stack else None,
+            **attrs
+        }
+        with self._lock:
+            record["id"] = len(self.spans)
+            self.spans.append(record)
+            self._open.append(record)
+        return record
+
+    def _end(self, record: dict) -> None:
+        rss = current_rss_mb()
+        with self._lock:
+            self._open.remove(record)
+            record["seconds"] = round(time.perf_counter() - self.origin - record["start"], 6)
+            record["rss_mb"] = rss
+            record["peak_rss_mb"] = max(record["peak_rss_mb"], rss or 0.0)
+
+    @contextmanager
+    def span(self, stage: str, **attrs):
+        """Record the time and peak memory of the enclosed block as one span."""
+        self._start_sampler()
+        record = self._begin(stage, time.perf_counter(), attrs)
+        stack = self._stack()
+        stack.append(record["id"])
+        try:
+            yield record
+        finally:
+            stack.pop()
+            self._end(record)
+
+    def record(self, stage: str, start: float, **attrs) -> None:
+        """Add a span that began at ``start`` (a ``time.perf_counter()`` value) and ends now.
+
+        For work that is interleaved with other stages, such as a generator
+        decoding audio between the windows it yields.
+        """
+        self._end(self._begin(stage, start, attrs))
+
+    def summary(self) -> Dict[str, dict]:
+        """Count, total seconds and peak resident memory per stage.
+
+        Seconds of nested stages are also included in their parents (e.g.
+        ``encode`` and ``decode`` inside ``transcribe``).
+        """
+        stages = {}
+        with self._lock:
+            finished = [record for record in self.spans if record["seconds"] is not None]
+        for record in finished:
+            stage = stages.setdefault(record["stage"], {"count": 0, "seconds": 0.0, "peak_rss_mb": 0.0})
+            stage["count"] += 1
+            stage["seconds"] += record["seconds"]
+            stage["peak_rss_mb"] = max(stage["peak_rss_mb"], record["peak_rss_mb"])
+        for stage in stages.values():
+            stage["seconds"] = round(stage["seconds"], 3)
+            stage["peak_rss_mb"] = round(stage["peak_rss_mb"], 1)
+        return stages
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = [dict(record) for record in self.spans]
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self.origin, 6),
+            "peak_rss_mb": max_rss_mb(),
+            "stages": self.summary(),
+            "spans": spans
+        }
+
+    def save(self, path: str) -> None:
+        """Write the trace as JSON."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def close(self) -> None:
+        """Stop the memory sampler and write the profile, if one was requested."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._profiler is not None:
+            self._profiler.disable()
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+            self._profiler.dump_stats(self.profile_path)
+
+    def print_summary(self) -> None:
+        """Print the per-stage summary as a table."""
+        print(f"{'Stage':<14} {'Count':>6} {'Seconds':>9} {'Peak RSS':>10}")
+        for stage, stats in sorted(self.summary().items(), key=lambda item: -item[1]["seconds"]):
+            print(f"{stage:<14} {stats['count']:>6} {stats['seconds']:>9.2f} {stats['peak_rss_mb']:>7.0f} MB")
+
+def active_tracer() -> Optional[Tracer]:
+    """The tracer receiving spans in this thread, if any."""
+    return getattr(_local, "tracer", None)
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Record the enclosed block on the active tracer (no-op without one)."""
+    tracer = active_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(stage, **attrs) as record:
+        yield record
+
+def record_span(stage: str, start: float, **attrs) -> None:
+    """Record work that began at ``start`` and ends now on the active tracer."""
+    tracer = active_tracer()
+    if tracer is not None:
+        tracer.record(stage, start, **attrs)
+
+def _traced(stage: str, function: Callable) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with span(stage):
+            return function(*args, **kwargs)
+    wrapper.traced_stage = stage
+    return wrapper
+
+def _install_whisper_hooks() -> None:
+    """Time the mel, encoder, decoder and alignment steps inside ``model.transcribe``.
+
+    The functions are wrapped once per process; the wrappers only record
+    anything in threads with an active tracer. On a GPU, kernels run
+    asynchronously, so part of the encoder's time is reported under
+    ``decode`` where the decoder first waits for its output.
+    """
+    import importlib
+
+    try:
+        transcribe_module = importlib.import_module("whisper.transcribe")
+        decoding = importlib.import_module("whisper.decoding")
+    except ImportError:
+        # Custom models without whisper installed report only the outer spans
+        return
+    if getattr(transcribe_module, "is_traced", False):
+        return
+
+    for module, name, stage in [
+        (transcribe_module, "log_mel_spectrogram", MEL),
+        (transcribe_module, "add_word_timestamps", ALIGNMENT),
+        (decoding.DecodingTask, "_get_audio_features", ENCODE),
+        (decoding.DecodingTask, "_main_loop", DECODE)
+    ]:
+        if hasattr(module, name):
+            setattr(module, name, _traced(stage, getattr(module, name)))
+    transcribe_module.is_traced = True
+
+@contextmanager
+def tracing(tracer: Optional[Tracer]):
+    """Send the spans opened in this thread to ``tracer`` while the block runs."""
+    if tracer is None:
+        yield None
+        return
+
+    _install_whisper_hooks()
+    previous = active_tracer()
+    _local.tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _local.tracer = previous
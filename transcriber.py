@@ -2,93 +2,226 @@ import argparse
 import os
 import sys
 import time
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Iterable, Iterator, Optional, Tuple
 from pathlib import Path
 
-import torch
-import whisper
-from pydub import AudioSegment
-from tqdm import tqdm
-
 # Import language utilities
 from language_utils import print_supported_languages, is_language_supported, get_language_name
+from transcription_cache import TranscriptionCache, decode_options
+from model_registry import get_model
+from vad import transcribe_speech_only
+from audio_probe import probe_duration, probe_durations
+from batch_manifest import BatchManifest, manifest_options
+from segment_writers import EXTENSIONS, WRITERS, open_writer
+from transcript_artifact import ARTIFACT_SUFFIX, load_artifact, save_artifact
+from progress import FILES, LOADING_MODEL, TRANSCRIBING, TqdmProgress, report, track_transcription
+from tracing import FILE, TRANSCRIBE, WRITE, Tracer, span, tracing
+from audio_utils import (
+    SAMPLE_RATE, SUPPORTED_EXTENSIONS, audio_duration, check_audio_file, load_audio, stream_audio
+)
 
-def get_audio_duration(file_path: str) -> float:
-    """Get the duration of an audio file in seconds."""
-    audio = AudioSegment.from_file(file_path)
-    return len(audio) / 1000  # Convert milliseconds to seconds
+# Characters of previous text carried over as the prompt for the next window
+PROMPT_CONTEXT_CHARS = 500
 
-def convert_to_wav(input_file: str) -> str:
-    """Convert audio file to WAV format if needed."""
-    file_ext = os.path.splitext(input_file)[1].lower()
-    
-    if file_ext == '.wav':
-        return input_file
-    
-    # Create a temporary WAV file
-    temp_wav = os.path.splitext(input_file)[0] + "_temp.wav"
-    
-    # Load audio file using pydub
-    if file_ext == '.mp3':
-        print(f"Converting MP3 to WAV format...")
-        audio = AudioSegment.from_mp3(input_file)
-    elif file_ext == '.ogg':
-        print(f"Converting OGG to WAV format...")
-        audio = AudioSegment.from_ogg(input_file)
-    else:
-        raise ValueError(f"Unsupported file format: {file_ext}")
+def get_audio_duration(audio) -> float:
+    """Get the duration of an audio file or decoded waveform in seconds.
+
+    Files are probed from their headers rather than decoded.
+    """
+    if isinstance(audio, str):
+        return probe_duration(audio)
+    return audio_duration(audio)
+
+def shift_segments(segments: List[dict], offset: float) -> None:
+    """Move segment and word timestamps forward by ``offset`` seconds in place."""
+    for segment in segments:
+        segment["start"] += offset
+        segment["end"] += offset
+        for word in segment.get("words") or []:
+            word["start"] += offset
+            word["end"] += offset
+
+def carry_window_context(options: dict, window_result: dict) -> None:
+    """Update the options for the next window from the result of the previous one."""
+    # Keep the detected language so later windows skip detection
+    if not options.get("language") and window_result.get("language"):
+        options["language"] = window_result["language"]
     
-    # Get audio duration in seconds
-    duration_seconds = len(audio) / 1000
-    chunks = 100
-    chunk_duration = duration_seconds / chunks
+    # Condition the next window on the text decoded so far
+    if window_result["text"].strip():
+        options["initial_prompt"] = window_result["text"][-PROMPT_CONTEXT_CHARS:]
+
+def transcribe_windows(model, windows: Iterable, transcribe_options: dict, vad: bool = False,
+                       offset: float = 0.0) -> Iterator[dict]:
+    """Transcribe consecutive audio windows, yielding one result per window.
+
+    Segment and word timestamps are shifted onto the timeline of the whole
+    recording (the first window starts at ``offset`` seconds), and the tail
+    of each window's text is passed to the next window as its prompt so the
+    decoder keeps context across boundaries. With ``vad`` only the speech in
+    each window is sent to the model.
+    """
+    options = dict(transcribe_options)
     
-    # Create a progress bar for conversion
-    with tqdm(total=chunks, desc="Converting", unit="%") as pbar:
-        # Start export
-        audio.export(temp_wav, format="wav")
+    for window in windows:
+        with span(TRANSCRIBE, offset=offset, audio_seconds=len(window) / SAMPLE_RATE):
+            if vad:
+                result = transcribe_speech_only(model, window, options)
+            else:
+                result = model.transcribe(window, **options)
         
-        # Simulate progress updates
-        for _ in range(chunks):
-            time.sleep(chunk_duration / 10)  # Speed up simulation for better UX
-            pbar.update(1)
+        # Move timestamps from window time to recording time
+        shift_segments(result["segments"], offset)
+        result["offset"] = offset
+        result["duration"] = len(window) / SAMPLE_RATE
+        
+        yield result
+        
+        carry_window_context(options, result)
+        offset += len(window) / SAMPLE_RATE
+
+def iter_segments(model, input_file: str, transcribe_options: dict, vad: bool = False,
+                  progress: Optional[Callable] = None) -> Iterator[dict]:
+    """Yield segments on the recording's timeline as each 30-second window is transcribed.
+
+    The file is decoded while it is transcribed and segments are not kept
+    after they are yielded, so a consumer such as a ``segment_writers``
+    writer sees the first output after one window and memory stays flat.
+    """
+    total_seconds = probe_duration(input_file, decode_fallback=False) if progress else None
+    segment_id = 0
     
-    print(f"Conversion complete: {temp_wav}")
-    return temp_wav
+    for window_result in transcribe_windows(model, stream_audio(input_file), transcribe_options, vad=vad):
+        for segment in window_result["segments"]:
+            segment["id"] = segment_id
+            segment_id += 1
+            yield segment
+        transcribed = window_result["offset"] + window_result["duration"]
+        report(progress, TRANSCRIBING, transcribed, max(total_seconds or 0, transcribed))
+
+def transcribe_streaming(model, input_file: str, transcribe_options: dict, vad: bool = False,
+                         progress: Optional[Callable] = None, writer=None, checkpoint=None) -> dict:
+    """Transcribe a file window by window while it is being decoded.
 
-def transcribe_audio(input_file: str, model_size: str = "base", model=None, language: str = None) -> dict:
-    """Transcribe audio file to text using Whisper model."""
-    # Check if file exists
-    if not os.path.exists(input_file):
-        raise FileNotFoundError(f"Audio file not found: {input_file}")
+    Only one 30-second window of audio is held in memory at a time, so
+    memory use does not grow with the length of the recording. A
+    ``progress`` callback receives the seconds transcribed after each window,
+    and a ``writer`` from ``segment_writers`` gets each segment as soon as
+    its window is done. With a ``checkpoint`` (see ``batch_manifest``) every
+    finished window is stored, and windows stored by an interrupted run are
+    replayed so decoding resumes where that run stopped.
+    """
+    total_seconds = probe_duration(input_file, decode_fallback=False) if progress else None
+    text_parts = []
+    segments = []
+    language = transcribe_options.get("language")
+    vad_stats = {"total_seconds": 0.0, "speech_seconds": 0.0, "skipped_seconds": 0.0}
+    
+    def add_window(window_result):
+        nonlocal language
+        text_parts.append(window_result["text"])
+        with span(WRITE):
+            for segment in window_result["segments"]:
+                segment["id"] = len(segments)
+                segments.append(segment)
+                if writer is not None:
+                    writer.write(segment)
+        language = language or window_result.get("language")
+        for key, value in window_result.get("vad", {}).items():
+            vad_stats[key] += value
+        transcribed = window_result["offset"] + window_result["duration"]
+        report(progress, TRANSCRIBING, transcribed, max(total_seconds or 0, transcribed))
     
-    # Check file extension
-    file_ext = os.path.splitext(input_file)[1].lower()
-    if file_ext not in ['.mp3', '.wav', '.ogg']:
-        raise ValueError(f"Unsupported file format: {file_ext}")
+    # Replay the leading windows finished by an earlier run
+    options = dict(transcribe_options)
+    offset = 0.0
+    stored = checkpoint.completed() if checkpoint is not None else {}
+    index = 0
+    while index in stored:
+        window_result = stored[index][2]
+        add_window(window_result)
+        carry_window_context(options, window_result)
+        offset = window_result["offset"] + window_result["duration"]
+        index += 1
+    if index:
+        print(f"Resuming {os.path.basename(input_file)} at {offset:.0f}s ({index} windows already done)")
     
-    # Convert to WAV if needed
-    wav_file = convert_to_wav(input_file)
+    windows = stream_audio(input_file, start_seconds=offset)
+    for index, window_result in enumerate(transcribe_windows(model, windows, options, vad=vad, offset=offset),
+                                          start=index):
+        if checkpoint is not None:
+            checkpoint.save(index, window_result["offset"], window_result["offset"] + window_result["duration"],
+                            window_result)
+        add_window(window_result)
+    
+    result = {
+        "text": "".join(text_parts),
+        "segments": segments,
+        "language": language
+    }
+    if vad:
+        result["vad"] = vad_stats
+    return result
+
+def transcription_options(language: str = None, streaming: bool = False, workers: Optional[int] = None,
+                          vad: bool = False) -> dict:
+    """Decoding options of a ``transcribe_audio`` call, as used for its cache key and checkpoints."""
+    chunked = bool(workers and workers > 1 and not streaming)
+    return decode_options(language, streaming=streaming, chunked=chunked, vad=vad)
+
+def transcribe_audio(input_file: str, model_size: str = "base", model=None, language: str = None, audio=None,
+                     streaming: bool = False, cache: Optional[TranscriptionCache] = None,
+                     workers: Optional[int] = None, vad: bool = False,
+                     progress: Optional[Callable] = None, writer=None, manifest=None) -> dict:
+    """Transcribe audio file to text using Whisper model.
+
+    The file is decoded once into memory; pass ``audio`` to reuse a waveform
+    that has already been decoded by the caller. With ``streaming`` the file
+    is instead decoded and transcribed in 30-second windows, which keeps
+    memory flat for multi-hour recordings. With ``workers`` greater than one
+    the file is split at silences and the chunks are transcribed in parallel
+    processes. With ``vad`` non-speech is skipped before inference and the
+    result reports how much audio was skipped. When a ``cache`` is given, a
+    previous result for the same audio and options is returned directly.
+    
+    A ``progress`` callback (see ``progress.py``) receives decoding, model
+    loading and transcription events as the work happens. A ``writer`` from
+    ``segment_writers`` receives the output; when streaming, each segment
+    is written as soon as its window has been transcribed. With a
+    ``manifest`` (see ``batch_manifest``) streamed windows and parallel
+    chunks are checkpointed, so a restarted run continues mid-file.
+    """
+    chunked = bool(workers and workers > 1 and not streaming)
+    options = transcription_options(language, streaming=streaming, workers=workers, vad=vad)
+    # Check file and extension
+    check_audio_file(input_file)
+    
+    # Return the stored result if this exact audio was transcribed before
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(input_file, model_size, options)
+        cached_result = cache.get(cache_key)
+        if cached_result is not None:
+            print(f"Using cached transcription for {os.path.basename(input_file)}")
+            if writer is not None:
+                with span(WRITE):
+                    writer.write_result(cached_result)
+            return cached_result
+    
+    # Store finished windows or chunks so an interrupted run can resume mid-file
+    checkpoint = None
+    if manifest is not None and (streaming or chunked):
+        checkpoint = manifest.checkpoint(input_file, manifest_options(model_size, options))
+    
+    # Decode the audio once; every later stage works on this array
+    if audio is None and not streaming:
+        audio = load_audio(input_file, progress=progress)
     
     # Load the Whisper model if not provided
     if model is None:
-        print(f"Loading Whisper {model_size} model...")
-        with tqdm(total=100, desc="Loading model", unit="%") as pbar:
-            # Model loading doesn't provide progress updates, so we simulate it
-            for i in range(90):
-                time.sleep(0.01)  # Simulate loading time
-                pbar.update(1)
-                
-            model = whisper.load_model(model_size)
-            
-            # Complete the progress bar
-            pbar.update(10)
-    
-    # Get audio duration for estimating transcription time
-    duration = get_audio_duration(wav_file)
-    chunks = 100
-    # Rough estimate: transcription takes ~30% of audio duration or at least 5 seconds
-    chunk_duration = max(duration * 0.3 / chunks, 5 / chunks)  
+        report(progress, LOADING_MODEL, 0, 1)
+        model = get_model(model_size)
+        report(progress, LOADING_MODEL, 1, 1)
     
     # Prepare transcription options
     transcribe_options = {}
@@ -102,36 +235,44 @@ def transcribe_audio(input_file: str, model_size: str = "base", model=None, lang
     else:
         print("Transcribing with default language settings...")
     
-    # Transcribe the audio with progress bar
+    # Run transcription
     print(f"Transcribing {os.path.basename(input_file)}...")
-    with tqdm(total=chunks, desc="Transcribing", unit="%") as pbar:
-        # Start transcription
-        transcription_start = time.time()
-        
-        # Run transcription
-        result = model.transcribe(wav_file, **transcribe_options)
-        
-        # Update progress bar based on chunks
-        elapsed = time.time() - transcription_start
-        # If transcription was faster than expected, update all at once
-        if elapsed < chunk_duration * chunks:
-            pbar.update(chunks)
-        else:
-            # Otherwise simulate remaining progress
-            current_progress = pbar.n
-            for _ in range(current_progress, chunks):
-                time.sleep(0.01)
-                pbar.update(1)
-    
-    # Clean up temporary file if created
-    if wav_file != input_file:
-        os.remove(wav_file)
+    if audio is None:
+        result = transcribe_streaming(model, input_file, transcribe_options, vad=vad, progress=progress,
+                                      writer=writer, checkpoint=checkpoint)
+    elif chunked:
+        from parallel_processor import transcribe_long_file
+        result = transcribe_long_file(input_file, model_size, max_workers=workers, language=language, audio=audio,
+                                      progress=progress, checkpoint=checkpoint, vad=vad)
+    else:
+        with track_transcription(progress):
+            if vad:
+                result = transcribe_speech_only(model, audio, transcribe_options)
+            else:
+                with span(TRANSCRIBE, audio_seconds=audio_duration(audio)):
+                    result = model.transcribe(audio, **transcribe_options)
+        duration = audio_duration(audio)
+        report(progress, TRANSCRIBING, duration, duration)
+    
+    # Streaming already wrote each segment as it arrived
+    if writer is not None and audio is not None:
+        with span(WRITE):
+            writer.write_result(result)
     
     # Print detected language if auto-detection was used
     if language == "auto" and "language" in result:
         detected_code = result["language"]
         detected_name = get_language_name(detected_code)
         print(f"Detected language: {detected_name} ({detected_code})")
+    
+    # Report how much non-speech was skipped
+    if "vad" in result:
+        print(f"Skipped {result['vad']['skipped_seconds']:.1f}s of non-speech "
+              f"out of {result['vad']['total_seconds']:.1f}s")
+    
+    # Store the result for future submissions of the same audio
+    if cache_key is not None:
+        cache.put(cache_key, result)
         
     return result
 
@@ -143,82 +284,246 @@ def save_transcription(result, output_file: str) -> None:
     # Extract text from result (which could be a string or a dict)
     text = result["text"] if isinstance(result, dict) else result
     
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with span(WRITE), open(output_file, 'w', encoding='utf-8') as f:
         f.write(text)
     print(f"Transcription saved to {output_file}")
 
 def get_audio_files_from_directory(directory: str) -> List[str]:
     """Get all audio files from a directory."""
-    audio_extensions = ['.mp3', '.wav', '.ogg']
     audio_files = []
     
     for root, _, files in os.walk(directory):
         for file in files:
-            if any(file.lower().endswith(ext) for ext in audio_extensions):
+            if any(file.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS):
                 audio_files.append(os.path.join(root, file))
     
     return audio_files
 
-def process_batch(input_files: List[str], output_dir: str, model_size: str, language: str = None) -> Dict[str, str]:
-    """Process a batch of audio files."""
-    results = {"success": [], "failed": []}
+def transcribe_files_batched(input_files: List[str], model, model_size: str, language: str = None,
+                             batch_size: int = 16, cache: Optional[TranscriptionCache] = None) -> Dict[str, object]:
+    """Transcribe several files together with batched encoder and decoder passes.
+
+    Returns a mapping of each file to its result dict, or to the exception
+    raised while processing it.
+    """
+    from batched_inference import transcribe_batch
+    
+    results = {}
+    audios = {}
+    cache_keys = {}
+    
+    for input_file in input_files:
+        try:
+            check_audio_file(input_file)
+            if cache is not None:
+                cache_keys[input_file] = cache.make_key(input_file, model_size, decode_options(language, batched=True))
+                cached_result = cache.get(cache_keys[input_file])
+                if cached_result is not None:
+                    results[input_file] = cached_result
+                    continue
+            audios[input_file] = load_audio(input_file)
+        except Exception as e:
+            results[input_file] = e
+    
+    if audios:
+        try:
+            with span(TRANSCRIBE, files=len(audios), audio_seconds=sum(len(a) for a in audios.values()) / SAMPLE_RATE):
+                batch_results = transcribe_batch(model, audios, language, batch_size)
+        except Exception as e:
+            batch_results = {input_file: e for input_file in audios}
+        
+        for input_file, result in batch_results.items():
+            results[input_file] = result
+            if cache is not None and not isinstance(result, Exception):
+                cache.put(cache_keys[input_file], result)
+    
+    return results
+
+def process_batch(input_files: List[str], output_dir: str, model_size: str, language: str = None,
+                  streaming: bool = False, cache: Optional[TranscriptionCache] = None,
+                  vad: bool = False, batch_size: int = 1, progress: Optional[Callable] = None,
+                  output_format: str = "txt", manifest: Optional[BatchManifest] = None,
+                  max_chars: Optional[int] = None, max_duration: Optional[float] = None,
+                  save_artifacts: bool = False) -> Dict[str, str]:
+    """Process a batch of audio files.
+
+    Each transcript is written in ``output_format`` (see ``segment_writers``)
+    as it is produced; with ``streaming`` segments appear in the output file
+    window by window. ``max_chars`` and ``max_duration`` limit the
+    length of SRT/VTT cues. With ``save_artifacts`` each full result is also
+    stored as a ``.transcript`` artifact next to its transcript, from which
+    other formats can be exported later without transcribing again.
+
+    With ``batch_size`` greater than one, files are transcribed in groups
+    whose 30-second windows share batched model passes. A ``progress``
+    callback receives each file's events plus a FILES event per finished file.
+
+    With a ``manifest`` every file's status is recorded as it finishes, and
+    files it lists as completed with the same options are skipped, so an
+    interrupted run can simply be started again.
+    """
+    results = {"success": [], "failed": [], "resumed": 0}
+    
+    # Skip files finished by an earlier run of the same batch
+    file_options = manifest_options(model_size, decode_options(language, streaming=streaming, vad=vad,
+                                                               batched=batch_size > 1),
+                                    output_format=output_format,
+                                    # Only when set, so manifests of earlier runs still match
+                                    **{key: value for key, value in (("max_chars", max_chars),
+                                                                     ("max_duration", max_duration)) if value})
+    if manifest is not None:
+        pending = [f for f in input_files if not manifest.is_done(f, file_options)]
+        results["resumed"] = len(input_files) - len(pending)
+        if results["resumed"]:
+            print(f"Resuming batch: {results['resumed']} of {len(input_files)} files already completed")
+        input_files = pending
     
     # Load the model once for all files
     print(f"Loading Whisper {model_size} model for batch processing...")
-    with tqdm(total=100, desc="Loading model", unit="%") as pbar:
-        for i in range(90):
-            time.sleep(0.01)
-            pbar.update(1)
-            
-        model = whisper.load_model(model_size)
-        pbar.update(10)
+    report(progress, LOADING_MODEL, 0, 1)
+    model = get_model(model_size)
+    report(progress, LOADING_MODEL, 1, 1)
+    
+    cache_hits_before = cache.hits if cache is not None else 0
+    
+    # Size the batch from file headers without decoding anything
+    durations = probe_durations(input_files)
+    results["audio_seconds"] = sum(d for d in durations.values() if d)
     
     # Process each file
-    print(f"\nProcessing {len(input_files)} audio files...")
+    print(f"\nProcessing {len(input_files)} audio files ({results['audio_seconds'] / 60:.1f} minutes of audio)...")
     
-    for i, input_file in enumerate(input_files):
-        try:
-            # Create output filename
-            base_name = os.path.basename(input_file)
-            name_without_ext = os.path.splitext(base_name)[0]
-            output_file = os.path.join(output_dir, f"{name_without_ext}.txt")
-            
-            print(f"\n[{i+1}/{len(input_files)}] Processing: {base_name}")
-            
-            # Transcribe audio
-            result = transcribe_audio(input_file, model_size, model, language=language)
-            
-            # Save transcription
-            save_transcription(result, output_file)
-            
-            # Add language info to success message if available
-            lang_info = ""
-            if language == "auto" and isinstance(result, dict) and "language" in result:
-                detected_code = result["language"]
-                detected_name = get_language_name(detected_code)
-                lang_info = f" (Detected: {detected_name})"
-            
-            results["success"].append((input_file, output_file, lang_info))
+    # Files transcribed together in one batched pass (all of them one by one otherwise)
+    group_size = batch_size if batch_size > 1 else max(1, len(input_files))
+    
+    for group_start in range(0, len(input_files), group_size):
+        group = input_files[group_start:group_start + group_size]
+        
+        group_results = {}
+        if batch_size > 1:
+            print(f"\nTranscribing files {group_start + 1}-{group_start + len(group)} in batches of {batch_size} windows...")
+            group_results = transcribe_files_batched(group, model, model_size, language, batch_size, cache)
+        
+        for i, input_file in enumerate(group, start=group_start):
+            try:
+                # Create output filename
+                base_name = os.path.basename(input_file)
+                name_without_ext = os.path.splitext(base_name)[0]
+                output_file = os.path.join(output_dir, f"{name_without_ext}.{EXTENSIONS[output_format]}")
+                
+                print(f"\n[{i+1}/{len(input_files)}] Processing: {base_name}")
+                if manifest is not None:
+                    manifest.mark(input_file, file_options, "running", output_file)
+                
+                # Transcribe audio, writing the transcript as it is produced
+                with span(FILE, file=base_name):
+                    if batch_size > 1:
+                        result = group_results[input_file]
+                        if isinstance(result, Exception):
+                            raise result
+                        with span(WRITE), open_writer(output_format, output_file, max_chars, max_duration) as writer:
+                            writer.write_result(result)
+                    else:
+                        with open_writer(output_format, output_file, max_chars, max_duration) as writer:
+                            result = transcribe_audio(input_file, model_size, model, language=language,
+                                                      streaming=streaming, cache=cache, vad=vad, progress=progress,
+                                                      writer=writer, manifest=manifest)
+                print(f"Transcription saved to {output_file}")
+                if save_artifacts:
+                    with span(WRITE):
+                        save_artifact(result, os.path.join(output_dir, name_without_ext + ARTIFACT_SUFFIX))
+                if manifest is not None:
+                    manifest.mark(input_file, file_options, "completed", output_file)
+                
+                if "vad" in result:
+                    results["skipped_seconds"] = results.get("skipped_seconds", 0) + result["vad"]["skipped_seconds"]
+                
+                # Add language info to success message if available
+                lang_info = ""
+                if language == "auto" and isinstance(result, dict) and "language" in result:
+                    detected_code = result["language"]
+                    detected_name = get_language_name(detected_code)
+                    lang_info = f" (Detected: {detected_name})"
+                
+                results["success"].append((input_file, output_file, lang_info))
+                
+            except Exception as e:
+                print(f"❌ Error processing {input_file}: {e}")
+                results["failed"].append((input_file, str(e)))
+                if manifest is not None and os.path.exists(input_file):
+                    manifest.mark(input_file, file_options, "failed", error=str(e))
             
-        except Exception as e:
-            print(f"❌ Error processing {input_file}: {e}")
-            results["failed"].append((input_file, str(e)))
+            report(progress, FILES, i + 1, len(input_files))
+    
+    results["cache_hits"] = cache.hits - cache_hits_before if cache is not None else 0
     
     return results
 
+def transcribe_stdin(model_size: str, language: str = None, output_file: Optional[str] = None,
+                     output_format: str = "txt", input_format: str = "pcm", step_seconds: Optional[float] = None,
+                     block_size: int = 3200, max_chars: Optional[int] = None,
+                     max_duration: Optional[float] = None) -> None:
+    """Transcribe live audio read from standard input until it ends (or Ctrl+C).
+
+    Input is raw 16 kHz mono s16le PCM unless ``input_format`` names an
+    ffmpeg demuxer (e.g. ``ogg`` for Opus). Partial text is redrawn on one
+    stderr line as it changes; final segments are printed to stdout and,
+    with ``output_file``, appended to it in ``output_format``.
+    """
+    from live_transcriber import STEP_SECONDS, transcribe_live
+    
+    model = get_model(model_size)
+    writer = open_writer(output_format, output_file, max_chars, max_duration) if output_file else None
+    # read1 hands over whatever has arrived instead of waiting for a full block
+    chunks = iter(lambda: sys.stdin.buffer.read1(block_size), b"")
+    print("Listening on standard input (Ctrl+C to stop)...", file=sys.stderr)
+    
+    try:
+        for event in transcribe_live(model, chunks, input_format=input_format, language=language,
+                                     step_seconds=step_seconds or STEP_SECONDS):
+            if event["type"] == "partial":
+                print(f"\r\033[K{event['text'].strip()[-100:]}", end="", file=sys.stderr, flush=True)
+                continue
+            print("\r\033[K", end="", file=sys.stderr)
+            print(f"[{event['start']:.2f} --> {event['end']:.2f}] {event['text'].strip()}", flush=True)
+            if writer is not None:
+                writer.write(event)
+    except KeyboardInterrupt:
+        print("\nStopped", file=sys.stderr)
+    finally:
+        if writer is not None:
+            writer.close()
+            print(f"Transcription saved to {output_file}", file=sys.stderr)
+
 def main():
     parser = argparse.ArgumentParser(description="Transcribe audio files to text using Whisper")
     
-    # Input options group
-    input_group = parser.add_mutually_exclusive_group(required=True)
+    # Input options group (required unless --list-languages is given; checked below)
+    input_group = parser.add_mutually_exclusive_group()
     input_group.add_argument("-f", "--file", help="Path to a single audio file")
     input_group.add_argument("-d", "--directory", help="Path to a directory containing audio files")
     input_group.add_argument("-b", "--batch", nargs='+', help="List of audio files to process")
+    input_group.add_argument("--stdin", action="store_true",
+                             help="Transcribe live audio from standard input (raw 16 kHz mono s16le PCM by default), "
+                                  "printing partial and final segments as they are recognised")
+    input_group.add_argument("--from-artifact",
+                             help="Export a stored .transcript artifact in --format without transcribing again")
     
     # Output options
-    parser.add_argument("-o", "--output", required=True, 
+    parser.add_argument("-o", "--output",
                         help="Output file (for single file) or directory (for batch processing)")
     
+    parser.add_argument("--format", choices=list(WRITERS), default="txt",
+                        help="Transcript format: plain text, timestamped text, SRT or VTT subtitles, TSV with "
+                             "millisecond times, JSON, or JSON Lines (default: txt)")
+    parser.add_argument("--max-chars", type=int,
+                        help="Split SRT/VTT cues longer than this many characters between words")
+    parser.add_argument("--max-duration", type=float,
+                        help="Split SRT/VTT cues longer than this many seconds between words")
+    parser.add_argument("--artifact", action="store_true",
+                        help="Also store each full result (segments, word timestamps, probabilities) as a compact "
+                             ".transcript artifact next to the output, for exporting other formats later")
+    
     # Model options
     parser.add_argument("-m", "--model", choices=["tiny", "base", "small", "medium", "large"], 
                         default="base", help="Whisper model size to use (default: base)")
@@ -229,6 +534,48 @@ def main():
     parser.add_argument("--list-languages", action="store_true",
                         help="List all supported languages and their codes")
     
+    # Live options
+    parser.add_argument("--stdin-format", default="pcm",
+                        help="Format of --stdin audio: 'pcm' or an ffmpeg demuxer such as 'ogg' or 'webm' for Opus "
+                             "(default: pcm)")
+    parser.add_argument("--step", type=float,
+                        help="Seconds of new --stdin audio between transcription passes; lower gives faster partial "
+                             "results at more compute (default: 2)")
+    
+    # Memory options
+    parser.add_argument("--stream", action="store_true",
+                        help="Decode and transcribe in 30-second windows to keep memory flat on long recordings")
+    
+    # Voice activity detection
+    parser.add_argument("--vad", action="store_true",
+                        help="Skip silence and other non-speech before transcribing")
+    
+    # Batched inference
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Transcribe batch files together, stacking up to N 30-second windows per model pass "
+                             "(best for many short clips; ignores --stream and --vad)")
+    
+    # Parallel options
+    parser.add_argument("--workers", type=int,
+                        help="Split a single long file at silences and transcribe the chunks in parallel across N processes")
+    
+    # Resume options
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Start over instead of skipping files and windows finished by an earlier interrupted run")
+    
+    # Cache options
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always re-run transcription instead of reusing cached results")
+    parser.add_argument("--cache-dir",
+                        help="Directory for cached transcription results (default: ~/.cache/speech-to-text-transcriber)")
+    
+    # Instrumentation options
+    parser.add_argument("--trace",
+                        help="Write per-stage timings and peak memory (probe, decode, model load, mel, encode, "
+                             "decode, write...) to this JSON file")
+    parser.add_argument("--profile",
+                        help="Run cProfile over the transcription and write its stats to this file")
+    
     args = parser.parse_args()
     
     # Show language list if requested
@@ -236,71 +583,149 @@ def main():
         print_supported_languages()
         sys.exit(0)
     
+    if not (args.file or args.directory or args.batch or args.stdin or args.from_artifact):
+        parser.error("one of the arguments -f/--file -d/--directory -b/--batch --stdin --from-artifact is required")
+    if not args.output and not args.stdin:
+        parser.error("the following arguments are required: -o/--output")
+    
     # Validate language code if provided
     if args.language and not is_language_supported(args.language):
         print(f"Error: Unsupported language code '{args.language}'")
         print("Use --list-languages to see all supported language codes")
         sys.exit(1)
     
+    # Progress bars driven by the decoding, loading and transcription events
+    progress = TqdmProgress()
+    
+    # Per-stage timing and memory spans, written when the run ends
+    tracer = Tracer("transcriber", profile=args.profile) if args.trace or args.profile else None
+    
     try:
-        # Determine if we're doing batch processing
-        is_batch = args.directory is not None or args.batch is not None
-        
-        if is_batch:
-            # Get list of files to process
-            if args.directory:
-                input_files = get_audio_files_from_directory(args.directory)
-                if not input_files:
-                    print(f"No audio files found in directory: {args.directory}")
-                    sys.exit(1)
-            else:  # args.batch
-                input_files = args.batch
-            
-            # Create output directory if it doesn't exist
-            os.makedirs(args.output, exist_ok=True)
-            
-            # Process batch
-            start_time = time.time()
-            results = process_batch(input_files, args.output, args.model, language=args.language)
-            elapsed_time = time.time() - start_time
-            
-            # Print summary
-            print("\n" + "="*50)
-            print(f"Batch Processing Summary:")
-            print(f"Total files: {len(input_files)}")
-            print(f"Successfully processed: {len(results['success'])}")
-            print(f"Failed: {len(results['failed'])}")
-            print(f"Total time: {elapsed_time:.2f} seconds")
-            print("="*50)
+        with tracing(tracer):
+            # Stored result: regenerate the output without loading a model
+            if args.from_artifact:
+                result = load_artifact(args.from_artifact).to_result(lazy=True)
+                with span(WRITE), open_writer(args.format, args.output, args.max_chars, args.max_duration) as writer:
+                    writer.write_result(result)
+                print(f"Transcript exported to {args.output}")
+                return
             
-            if results["failed"]:
-                print("\nFailed files:")
-                for file, error in results["failed"]:
-                    print(f"- {os.path.basename(file)}: {error}")
+            # Live audio: segments are printed as they are recognised, nothing is cached
+            if args.stdin:
+                transcribe_stdin(args.model, language=args.language, output_file=args.output,
+                                 output_format=args.format, input_format=args.stdin_format, step_seconds=args.step,
+                                 max_chars=args.max_chars, max_duration=args.max_duration)
+                return
             
-            # Print successful files with language info if available
-            if results["success"]:
-                print("\nSuccessful transcriptions:")
-                for file, output, lang_info in results["success"]:
-                    print(f"- {os.path.basename(file)}{lang_info} -> {output}")
+            # Reuse earlier results for recordings that were already transcribed
+            cache = None
+            if not args.no_cache:
+                cache = TranscriptionCache(args.cache_dir) if args.cache_dir else TranscriptionCache()
             
-        else:  # Single file processing
-            # Process single file
-            print(f"Processing single file: {args.file}")
-            result = transcribe_audio(args.file, args.model, language=args.language)
-            save_transcription(result, args.output)
+            # Determine if we're doing batch processing
+            is_batch = args.directory is not None or args.batch is not None
             
-            # Print language info if auto-detection was used
-            if args.language == "auto" and isinstance(result, dict) and "language" in result:
-                detected_code = result["language"]
-                detected_name = get_language_name(detected_code)
-                print(f"Detected language: {detected_name} ({detected_code})")
+            if is_batch:
+                # Get list of files to process
+                if args.directory:
+                    input_files = get_audio_files_from_directory(args.directory)
+                    if not input_files:
+                        print(f"No audio files found in directory: {args.directory}")
+                        sys.exit(1)
+                else:  # args.batch
+                    input_files = args.batch
                 
-            print("✅ Transcription completed successfully!")
-        
+                # Create output directory if it doesn't exist
+                os.makedirs(args.output, exist_ok=True)
+                
+                # Record progress in the output directory so a rerun resumes where this one stops
+                manifest = None if args.no_resume else BatchManifest(args.output)
+                
+                # Process batch
+                start_time = time.time()
+                results = process_batch(input_files, args.output, args.model, language=args.language,
+                                        streaming=args.stream, cache=cache, vad=args.vad,
+                                        batch_size=args.batch_size, progress=progress, output_format=args.format,
+                                        manifest=manifest, max_chars=args.max_chars, max_duration=args.max_duration,
+                                        save_artifacts=args.artifact)
+                elapsed_time = time.time() - start_time
+                
+                # Print summary
+                print("\n" + "="*50)
+                print(f"Batch Processing Summary:")
+                print(f"Total files: {len(input_files)}")
+                print(f"Successfully processed: {len(results['success'])}")
+                if results["resumed"]:
+                    print(f"Already completed (skipped): {results['resumed']}")
+                print(f"Failed: {len(results['failed'])}")
+                if cache is not None:
+                    print(f"Cache hits: {results['cache_hits']}")
+                if args.vad:
+                    print(f"Non-speech skipped: {results.get('skipped_seconds', 0):.2f} seconds")
+                print(f"Total audio: {results['audio_seconds']:.2f} seconds")
+                print(f"Total time: {elapsed_time:.2f} seconds")
+                print("="*50)
+                
+                if results["failed"]:
+                    print("\nFailed files:")
+                    for file, error in results["failed"]:
+                        print(f"- {os.path.basename(file)}: {error}")
+                
+                # Print successful files with language info if available
+                if results["success"]:
+                    print("\nSuccessful transcriptions:")
+                    for file, output, lang_info in results["success"]:
+                        print(f"- {os.path.basename(file)}{lang_info} -> {output}")
+                
+            else:  # Single file processing
+                # Process single file
+                print(f"Processing single file: {args.file}")
+                
+                # Checkpoint streamed windows and parallel chunks next to the output file
+                manifest = None
+                if not args.no_resume and (args.stream or (args.workers or 0) > 1):
+                    manifest = BatchManifest(os.path.dirname(os.path.abspath(args.output)))
+                
+                with open_writer(args.format, args.output, args.max_chars, args.max_duration) as writer:
+                    result = transcribe_audio(args.file, args.model, language=args.language, streaming=args.stream,
+                                              cache=cache, workers=args.workers, vad=args.vad, progress=progress,
+                                              writer=writer, manifest=manifest)
+                print(f"Transcription saved to {args.output}")
+                if args.artifact:
+                    artifact_path = os.path.splitext(args.output)[0] + ARTIFACT_SUFFIX
+                    with span(WRITE):
+                        save_artifact(result, artifact_path)
+                    print(f"Transcript artifact saved to {artifact_path}")
+                # Marked under the options its checkpoints were stored with, which clears them
+                if manifest is not None:
+                    options = transcription_options(args.language, streaming=args.stream, workers=args.workers,
+                                                    vad=args.vad)
+                    manifest.mark(args.file, manifest_options(args.model, options), "completed", args.output)
+                
+                # Print language info if auto-detection was used
+                if args.language == "auto" and isinstance(result, dict) and "language" in result:
+                    detected_code = result["language"]
+                    detected_name = get_language_name(detected_code)
+                    print(f"Detected language: {detected_name} ({detected_code})")
+                    
+                print("✅ Transcription completed successfully!")
+            
     except Exception as e:
+        progress.close()
         print(f"❌ Error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if tracer is not None:
+            tracer.close()
+            print("\nStage timings:")
+            tracer.print_summary()
+            if args.trace:
+                tracer.save(args.trace)
+                print(f"Trace saved to {args.trace}")
+            if args.profile:
+                print(f"Profile saved to {args.profile} (view with: python -m pstats {args.profile})")
+    
+    progress.close()
 
 if __name__ == "__main__":
     main()
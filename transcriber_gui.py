@@ -1,7 +1,6 @@
 import os
 import sys
 import threading
-import time
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from typing import List, Dict, Optional, Tuple
@@ -11,9 +10,17 @@ import queue
 from transcriber import (
     transcribe_audio, 
     get_audio_files_from_directory, 
-    save_transcription,
-    whisper
+    save_transcription
 )
+from model_registry import get_model
+from progress import DECODING, LOADING_MODEL, TRANSCRIBING, PercentProgress
+
+# Share of the file progress bar (in percent) covered by each stage
+FILE_PROGRESS_SPANS = {
+    DECODING: (0, 10),
+    LOADING_MODEL: (10, 15),
+    TRANSCRIBING: (15, 100)
+}
 
 class TranscriberApp:
     def __init__(self, root):
@@ -291,9 +298,9 @@ class TranscriberApp:
             self.file_progress_var.set(0)
             self.status_var.set("Loading model...")
             
-            # Load model
+            # Load model (reused across runs by the model registry)
             self.log(f"Loading Whisper {self.model_size.get()} model...")
-            self.whisper_model = whisper.load_model(self.model_size.get())
+            self.whisper_model = get_model(self.model_size.get())
             
             # Process files
             total_files = len(self.input_files)
@@ -353,24 +360,13 @@ class TranscriberApp:
             self.is_processing = False
     
     def transcribe_with_progress(self, input_file, progress_callback):
-        """Modified version of transcribe_audio that updates GUI progress"""
-        # This is a simplified version that calls our existing function
-        # but updates the progress bar
-        
-        # Simulate progress updates since the original function doesn't support callbacks
-        def progress_updater():
-            for i in range(101):
-                if not self.is_processing:
-                    break
-                progress_callback(i)
-                time.sleep(0.05)  # Adjust based on expected transcription time
-        
-        # Start progress updater in a separate thread
-        progress_thread = threading.Thread(target=progress_updater, daemon=True)
-        progress_thread.start()
+        """Run transcribe_audio and map its progress events onto the file progress bar"""
+        def on_percent(stage, percent):
+            start, end = FILE_PROGRESS_SPANS.get(stage, (0, 100))
+            progress_callback(start + (end - start) * percent / 100)
         
-        # Perform actual transcription
-        result = transcribe_audio(input_file, self.model_size.get(), self.whisper_model)
+        result = transcribe_audio(input_file, self.model_size.get(), self.whisper_model,
+                                  progress=PercentProgress(on_percent))
         
         # Ensure progress reaches 100%
         progress_callback(100)
@@ -0,0 +1,307 @@
+"""Compact columnar transcript artifact, loaded memory-mapped.
+
+A result's segments, word timestamps and speakers are stored in a
+``.transcript`` directory as one ``.npy`` file per column (start and end
+times, speaker ids, probabilities, ...) plus a single UTF-8 text blob that
+every segment and word points into with byte offsets:
+
+- ``meta.json``: format version, language, speaker names and which optional columns exist
+- ``text.utf8``: every segment's text, the full text (only when it is not
+  simply the segment texts joined, e.g. a diarized transcript), then every
+  word's text
+- ``segment_*.npy`` / ``word_*.npy``: one value per segment / word;
+  ``*_text.npy`` and ``segment_words.npy`` hold ``count + 1`` offsets, and
+  ``segment_has_words.npy`` records which segments carried a ``words`` list
+- ``turn_*.npy``: diarization speaker turns, when present
+
+Loading maps every file with ``np.load(mmap_mode='r')`` (the blob with
+``np.memmap``), so opening an artifact of any size reads nothing but
+``meta.json``; pages are read when a column is used. Any output format can
+then be regenerated from a stored artifact with :func:`export_artifact`
+without running the model again. Missing optional values round-trip: NaN
+marks a missing probability and -1 a missing speaker. Whisper's token ids
+and seek positions are not stored.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from segment_writers import WRITE_BATCH_SEGMENTS, export_result
+
+# Directory suffix of transcript artifacts
+ARTIFACT_SUFFIX = ".transcript"
+
+# Bumped when the layout changes incompatibly
+FORMAT_VERSION = 1
+
+META_FILE = "meta.json"
+TEXT_FILE = "text.utf8"
+
+# Optional per-segment statistics from whisper, stored as float32 (NaN when missing)
+SEGMENT_STATS = ("avg_logprob", "no_speech_prob", "compression_ratio", "temperature")
+
+# Decimals float32 columns are read back with, so 0.87 loads as 0.87 rather than 0.8700000047683716
+FLOAT32_DECIMALS = 6
+
+# Speaker id of segments, words and turns without a speaker
+NO_SPEAKER = -1
+
+class _TextBlob:
+    """Texts appended to one UTF-8 buffer, remembering byte offsets."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.size = 0
+
+    def add(self, texts: Iterable[str]) -> np.ndarray:
+        """Append texts and return their ``len + 1`` byte offsets."""
+        offsets = [self.size]
+        for text in texts:
+            data = text.encode("utf-8")
+            self.parts.append(data)
+            self.size += len(data)
+            offsets.append(self.size)
+        return np.array(offsets, dtype=np.int64)
+
+def _column(values: Iterable, dtype) -> np.ndarray:
+    return np.fromiter(values, dtype=dtype)
+
+def _stat(value) -> float:
+    return np.nan if value is None else value
+
+def _floats(column: np.ndarray) -> list:
+    """A float32 column as Python floats, rounded to the precision it was stored with."""
+    return np.round(column.astype(np.float64), FLOAT32_DECIMALS).tolist()
+
+def save_artifact(result: dict, path: str) -> str:
+    """Store a transcription result (optionally diarized) as a columnar artifact at ``path``.
+
+    The artifact is written to a temporary directory next to ``path`` and
+    renamed into place, so readers never see a partial one.
+    """
+    segments = result.get("segments") or []
+    words = [word for segment in segments for word in segment.get("words") or []]
+    turns = result.get("speaker_turns")
+
+    # Speaker labels of segments, words and turns share one id space
+    speakers = sorted({item["speaker"] for item in (*segments, *words, *(turns or [])) if item.get("speaker")})
+    speaker_ids = {speaker: i for i, speaker in enumerate(speakers)}
+
+    def speaker_column(items: List[dict]) -> np.ndarray:
+        return _column((speaker_ids.get(item.get("speaker"), NO_SPEAKER) for item in items), np.int32)
+
+    blob = _TextBlob()
+    segment_text = blob.add(segment["text"] for segment in segments)
+    # Whisper's text is normally its segments joined, which are already in the blob
+    text = result.get("text", "").encode("utf-8")
+    text_range = [0, blob.size] if text == b"".join(blob.parts) else blob.add([text.decode("utf-8")]).tolist()
+    columns: Dict[str, np.ndarray] = {
+        "segment_id": _column((segment.get("id", i) for i, segment in enumerate(segments)), np.int64),
+        "segment_start": _column((segment["start"] for segment in segments), np.float64),
+        "segment_end": _column((segment["end"] for segment in segments), np.float64),
+        "segment_speaker": speaker_column(segments),
+        "segment_text": segment_text,
+        # Words of segment i are words[segment_words[i]:segment_words[i + 1]]
+        "segment_words": np.cumsum([0] + [len(segment.get("words") or []) for segment in segments],
+                                   dtype=np.int64),
+        # Only segments that had a "words" key get one back, so partly word-timed results round-trip
+        "segment_has_words": _column(("words" in segment for segment in segments), np.bool_),
+        "word_start": _column((word["start"] for word in words), np.float64),
+        "word_end": _column((word["end"] for word in words), np.float64),
+        "word_probability": _column((_stat(word.get("probability")) for word in words), np.float32),
+        "word_speaker": speaker_column(words),
+        "word_text": blob.add(word["word"] for word in words)
+    }
+    for stat in SEGMENT_STATS:
+        columns[f"segment_{stat}"] = _column((_stat(segment.get(stat)) for segment in segments), np.float32)
+    if turns is not None:
+        columns["turn_start"] = _column((turn["start"] for turn in turns), np.float64)
+        columns["turn_end"] = _column((turn["end"] for turn in turns), np.float64)
+        columns["turn_speaker"] = speaker_column(turns)
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "language": result.get("language"),
+        "segments": len(segments),
+        "words": len(words),
+        "text": text_range,
+        "speakers": speakers,
+        "speaker_names": result.get("speaker_names"),
+        # Whether segments carried a "words" list, so results without word timestamps round-trip
+        "has_words": any("words" in segment for segment in segments),
+        "has_turns": turns is not None
+    }
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix=".artifact-")
+    try:
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+        with open(os.path.join(tmp_path, TEXT_FILE), "wb") as f:
+            f.write(b"".join(blob.parts))
+        with open(os.path.join(tmp_path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        # A directory cannot replace a non-empty one: move the old artifact aside first
+        if os.path.exists(path):
+            old_path = tempfile.mkdtemp(dir=parent, prefix=".artifact-old-")
+            os.replace(path, os.path.join(old_path, "old"))
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path, ignore_errors=True)
+        else:
+            os.replace(tmp_path, path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return path
+
+class TranscriptArtifact:
+    """A stored artifact with every column memory-mapped (nothing is read until used)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported transcript artifact version {self.meta.get('version')} in {path}")
+
+        self.language: Optional[str] = self.meta.get("language")
+        self.speakers: List[str] = self.meta["speakers"]
+        self.columns: Dict[str, np.ndarray] = {}
+        for entry in os.scandir(path):
+            if entry.name.endswith(".npy"):
+                self.columns[entry.name[:-4]] = np.load(entry.path, mmap_mode="r")
+
+        # np.memmap cannot map an empty file
+        text_path = os.path.join(path, TEXT_FILE)
+        if os.path.getsize(text_path):
+            self.blob = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        """Number of segments."""
+        return self.meta["segments"]
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """A memory-mapped column, e.g. ``artifact["segment_start"]``."""
+        return self.columns[column]
+
+    @property
+    def text(self) -> str:
+        """The full transcript text."""
+        start, end = self.meta["text"]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def _texts(self, offsets: np.ndarray) -> List[str]:
+        """Decode the texts between consecutive ``offsets`` with one read of the blob."""
+        if len(offsets) < 2:
+            return []
+        bounds = (offsets - offsets[0]).tolist()
+        data = self.blob[offsets[0]:offsets[-1]].tobytes()
+        return [data[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def _speakers(self, ids: np.ndarray) -> List[Optional[str]]:
+        names = self.speakers
+        return [names[i] if i != NO_SPEAKER else None for i in ids.tolist()]
+
+    def segment_texts(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Texts of segments ``start`` to ``stop``."""
+        stop = len(self) if stop is None else stop
+        return self._texts(self.columns["segment_text"][start:stop + 1])
+
+    def iter_segments(self, batch_size: int = WRITE_BATCH_SEGMENTS) -> Iterator[dict]:
+        """Rebuild whisper-style segment dicts, a batch of columns at a time."""
+        columns = self.columns
+        has_words = self.meta["has_words"]
+        for start in range(0, len(self), batch_size):
+            stop = min(start + batch_size, len(self))
+            batch = {name: columns[f"segment_{name}"][start:stop].tolist() for name in ("id", "start", "end")}
+            batch.update({stat: _floats(columns[f"segment_{stat}"][start:stop]) for stat in SEGMENT_STATS})
+            texts = self.segment_texts(start, stop)
+            speakers = self._speakers(columns["segment_speaker"][start:stop])
+
+            words: List[List[dict]] = []
+            # Artifacts written before the per-segment flag give every segment its words list
+            with_words = [has_words] * (stop - start)
+            if "segment_has_words" in columns:
+                with_words = columns["segment_has_words"][start:stop].tolist()
+            if has_words:
+                bounds = columns["segment_words"][start:stop + 1]
+                first = int(bounds[0])
+                flat = self._words(first, int(bounds[-1]))
+                words = [flat[a - first:b - first] for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+            for i in range(stop - start):
+                segment = {"id": batch["id"][i], "start": batch["start"][i], "end": batch["end"][i],
+                           "text": texts[i]}
+                for stat in SEGMENT_STATS:
+                    # NaN != NaN: statistics whisper did not report stay absent
+                    if batch[stat][i] == batch[stat][i]:
+                        segment[stat] = batch[stat][i]
+                if speakers[i] is not None:
+                    segment["speaker"] = speakers[i]
+                if with_words[i]:
+                    segment["words"] = words[i]
+                yield segment
+
+    def _words(self, start: int, stop: int) -> List[dict]:
+        """Word dicts ``start`` to ``stop`` across all segments."""
+        columns = self.columns
+        texts = self._texts(columns["word_text"][start:stop + 1])
+        starts = columns["word_start"][start:stop].tolist()
+        ends = columns["word_end"][start:stop].tolist()
+        probabilities = _floats(columns["word_probability"][start:stop])
+        speakers = self._speakers(columns["word_speaker"][start:stop])
+        words = []
+        for text, word_start, word_end, probability, speaker in zip(texts, starts, ends, probabilities, speakers):
+            word = {"word": text, "start": word_start, "end": word_end}
+            if probability == probability:
+                word["probability"] = probability
+            if speaker is not None:
+                word["speaker"] = speaker
+            words.append(word)
+        return words
+
+    def speaker_turns(self) -> Optional[List[dict]]:
+        """Diarization turns, or None when the result was not diarized."""
+        if not self.meta["has_turns"]:
+            return None
+        columns = self.columns
+        return [{"start": start, "end": end, "speaker": speaker}
+                for start, end, speaker in zip(columns["turn_start"].tolist(), columns["turn_end"].tolist(),
+                                               self._speakers(columns["turn_speaker"]))]
+
+    def to_result(self, lazy: bool = False) -> dict:
+        """The stored result as a dict like ``model.transcribe`` returns.
+
+        With ``lazy`` the ``segments`` entry is a generator, for a single
+        pass (e.g. by the segment writers) without materialising every
+        segment at once.
+        """
+        result = {"text": self.text, "language": self.language,
+                  "segments": self.iter_segments() if lazy else list(self.iter_segments())}
+        turns = self.speaker_turns()
+        if turns is not None:
+            result["speaker_turns"] = turns
+        if self.meta.get("speaker_names") is not None:
+            result["speaker_names"] = self.meta["speaker_names"]
+        return result
+
+def load_artifact(path: str) -> TranscriptArtifact:
+    """Open a stored artifact, memory-mapping its columns."""
+    return TranscriptArtifact(path)
+
+def export_artifact(path: str, output_base: str, formats: Iterable[str], max_chars: Optional[int] = None,
+                    max_duration: Optional[float] = None) -> Dict[str, str]:
+    """Regenerate output files from a stored artifact in one pass, without inference.
+
+    Returns the path written for each format (see ``segment_writers.export_result``).
+    """
+    return export_result(load_artifact(path).to_result(lazy=True), output_base, formats,
+                         max_chars=max_chars, max_duration=max_duration)
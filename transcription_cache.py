@@ -0,0 +1,157 @@
+"""Disk-backed, content-addressed cache of transcription results.
+
+Results are keyed by a SHA-256 hash of the audio bytes together with the
+model's registry key (size, device and precision) and the decode options, so re-submitting the same recording
+(retries, re-exports, duplicate uploads) returns the stored result instead
+of running the model again. Each entry is a small JSON file; the cache is
+trimmed to a total size budget by evicting the least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional
+
+# Default cache location and size budget (overridable through the environment)
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TRANSCRIBER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "speech-to-text-transcriber")
+)
+DEFAULT_MAX_MB = float(os.environ.get("TRANSCRIBER_CACHE_MAX_MB", 1024))
+
+# Bytes read per update when hashing audio files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def hash_file(file_path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _json_default(value):
+    """Serialize numpy scalars and arrays that may appear in model output."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def decode_options(language: Optional[str] = None, word_timestamps: bool = False, streaming: bool = False,
+                   chunked: bool = False, vad: bool = False, batched: bool = False) -> dict:
+    """Normalize the options that change a transcription into a key component.
+
+    Every entry point builds its key through this helper so that the same
+    recording submitted through the CLI, a batch or the web app shares one
+    cache entry.
+    """
+    return {
+        "language": None if language in (None, "", "auto") else language,
+        "word_timestamps": bool(word_timestamps),
+        "streaming": bool(streaming),
+        "chunked": bool(chunked),
+        "vad": bool(vad),
+        "batched": bool(batched)
+    }
+
+class TranscriptionCache:
+    """LRU cache of transcription result dicts stored as JSON files."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_mb: float = DEFAULT_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, input_file: str, model_size: str, options: Optional[dict] = None,
+                 device: Optional[str] = None, precision: Optional[str] = None) -> str:
+        """Build a cache key from the audio content, the model's registry key and options.
+
+        ``device`` and ``precision`` default as in ``model_registry``, so a
+        result computed on the CPU in fp32 is never reused for a GPU fp16
+        request, or the other way round.
+        """
+        from model_registry import registry
+
+        key_data = {
+            "audio": hash_file(input_file),
+            "model": list(registry.key(model_size, device, precision)),
+            "options": options or {}
+        }
+        encoded = json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached result for ``key``, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            # Touch the entry so eviction treats it as recently used
+            os.utime(path, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict) -> None:
+        """Store a result and evict old entries if over budget."""
+        # Write to a temp file and rename so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, default=_json_default)
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits its budget."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for reporting."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
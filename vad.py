@@ -0,0 +1,158 @@
+"""Energy-based voice activity detection in front of Whisper.
+
+Long silences and quiet hold periods still cost a full encoder pass per
+30-second window and can make Whisper hallucinate text. This module finds
+the spans of a waveform that contain speech, transcribes only those spans
+(concatenated into one compact waveform), and maps every timestamp in the
+result back onto the original timeline so subtitles stay aligned.
+"""
+
+import bisect
+from typing import List, Tuple
+
+import numpy as np
+
+from audio_utils import FRAME_SECONDS, SAMPLE_RATE, frame_energy
+from tracing import TRANSCRIBE, VAD, span
+
+# Frames louder than this many times the noise floor count as speech
+ENERGY_RATIO = 3.0
+
+# Absolute RMS below which a frame is always treated as silence
+MIN_ENERGY = 1e-3
+
+# Below this share of voiced frames over a floor that is not silence, the floor was measured on signal
+MIN_VOICED_FRACTION = 0.02
+
+# Shortest speech run kept, and shortest pause that splits two runs (seconds)
+MIN_SPEECH_SECONDS = 0.25
+MIN_SILENCE_SECONDS = 0.5
+
+# Audio kept on each side of a speech run so word edges are not clipped
+PAD_SECONDS = 0.2
+
+def detect_speech(audio: np.ndarray, energy_ratio: float = ENERGY_RATIO) -> List[Tuple[int, int]]:
+    """Return ``(start, end)`` sample ranges that contain speech.
+
+    Audio without a quiet stretch to measure a noise floor from (continuous
+    speech, a music bed, steady background noise, a fully voiced streamed
+    window) is returned whole rather than skipped.
+    """
+    energy = frame_energy(audio)
+    if len(energy) == 0:
+        return []
+
+    # Estimate the noise floor from the quietest tenth of the frames
+    noise_floor = np.percentile(energy, 10)
+    threshold = max(MIN_ENERGY, noise_floor * energy_ratio)
+
+    # Even the loud frames are not clearly above the floor: there is no silence to tell speech from
+    loud = np.percentile(energy, 90)
+    if loud > MIN_ENERGY and loud <= threshold:
+        return [(0, len(audio))]
+
+    voiced = energy > threshold
+    # Hardly anything beats a floor that is not silence: the "floor" is sustained signal, keep it all
+    if noise_floor > MIN_ENERGY and voiced.mean() < MIN_VOICED_FRACTION:
+        return [(0, len(audio))]
+
+    # Find runs of voiced frames
+    edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    min_silence = int(MIN_SILENCE_SECONDS / FRAME_SECONDS)
+    min_speech = int(MIN_SPEECH_SECONDS / FRAME_SECONDS)
+    pad = int(PAD_SECONDS / FRAME_SECONDS)
+
+    # Merge runs separated by short pauses, then drop short blips
+    runs = []
+    for start, end in zip(starts, ends):
+        if runs and start - runs[-1][1] < min_silence:
+            runs[-1][1] = end
+        else:
+            runs.append([start, end])
+
+    frame_length = int(FRAME_SECONDS * SAMPLE_RATE)
+    spans = []
+    for start, end in runs:
+        if end - start < min_speech:
+            continue
+        start = int(max(0, start - pad)) * frame_length
+        end = int(min(len(energy), end + pad)) * frame_length
+        if spans and start <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+class SpeechMap:
+    """Maps times in the concatenated speech waveform back to the original audio."""
+
+    def __init__(self, spans: List[Tuple[int, int]]):
+        self.compact_starts = []
+        self.original_starts = []
+        position = 0
+        for start, end in spans:
+            self.compact_starts.append(position / SAMPLE_RATE)
+            self.original_starts.append(start / SAMPLE_RATE)
+            position += end - start
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        """Convert a time in the compact waveform to a time in the original.
+
+        A time exactly on the boundary between two spans is the start of the
+        later span, or with ``end`` the end of the earlier one, so an end
+        time never jumps across the skipped gap.
+        """
+        if not self.compact_starts:
+            return t
+        search = bisect.bisect_left if end else bisect.bisect_right
+        i = max(0, search(self.compact_starts, t) - 1)
+        return self.original_starts[i] + (t - self.compact_starts[i])
+
+    def map_segments(self, segments: List[dict]) -> None:
+        """Rewrite segment and word timestamps in place."""
+        for segment in segments:
+            segment["start"] = self.to_original(segment["start"])
+            segment["end"] = self.to_original(segment["end"], end=True)
+            for word in segment.get("words") or []:
+                word["start"] = self.to_original(word["start"])
+                word["end"] = self.to_original(word["end"], end=True)
+
+def speech_within(spans: List[Tuple[int, int]], start: int, end: int) -> List[Tuple[int, int]]:
+    """The parts of ``spans`` inside samples [start, end), relative to ``start``."""
+    return [(max(s, start) - start, min(e, end) - start) for s, e in spans if s < end and e > start]
+
+def speech_stats(total_samples: int, spans: List[Tuple[int, int]]) -> dict:
+    """Total, speech and skipped durations in seconds."""
+    total_seconds = total_samples / SAMPLE_RATE
+    speech_seconds = sum(end - start for start, end in spans) / SAMPLE_RATE
+    return {
+        "total_seconds": total_seconds,
+        "speech_seconds": speech_seconds,
+        "skipped_seconds": total_seconds - speech_seconds
+    }
+
+def transcribe_spans(model, audio: np.ndarray, spans: List[Tuple[int, int]], transcribe_options: dict) -> dict:
+    """Transcribe the ``spans`` of ``audio`` back to back, keeping original timestamps."""
+    if not spans:
+        return {"text": "", "segments": [], "language": transcribe_options.get("language")}
+
+    speech = np.concatenate([audio[start:end] for start, end in spans])
+    with span(TRANSCRIBE, audio_seconds=len(speech) / SAMPLE_RATE):
+        result = model.transcribe(speech, **transcribe_options)
+    SpeechMap(spans).map_segments(result["segments"])
+    return result
+
+def transcribe_speech_only(model, audio: np.ndarray, transcribe_options: dict) -> dict:
+    """Transcribe only the speech in ``audio``, keeping original timestamps.
+
+    The result carries a ``vad`` entry with the total, speech and skipped
+    durations in seconds.
+    """
+    with span(VAD):
+        spans = detect_speech(audio)
+    result = transcribe_spans(model, audio, spans, transcribe_options)
+    result["vad"] = speech_stats(len(audio), spans)
+    return result
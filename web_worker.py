@@ -0,0 +1,130 @@
+"""Transcription jobs executed by the web app's inference worker processes."""
+
+import os
+
+from language_utils import get_language_name
+from live_transcriber import SharedModel, transcribe_live
+from transcriber import save_transcription
+from audio_utils import audio_duration, load_audio
+from transcription_cache import TranscriptionCache, decode_options
+from model_registry import PRELOAD_MODELS, registry
+from progress import LOADING_MODEL, TRANSCRIBING, PercentProgress, track_transcription
+from progress import report as report_progress
+from tracing import TRANSCRIBE, WRITE, Tracer, span, tracing
+from transcript_artifact import ARTIFACT_SUFFIX, save_artifact
+
+# Results of previously transcribed uploads, keyed by audio content
+result_cache = None
+
+# Directory for per-job cProfile stats (unset disables profiling)
+PROFILE_DIR = os.environ.get("TRANSCRIBER_PROFILE_DIR")
+
+def init_worker():
+    """Load and warm up the configured models once per worker process."""
+    global result_cache
+    result_cache = TranscriptionCache()
+    registry.preload(PRELOAD_MODELS)
+
+def process_file(job_id, payload, report):
+    """Process a single file and report job status updates"""
+    # Time every stage of the job; the per-stage summary goes on the job record
+    profile = os.path.join(PROFILE_DIR, f"{job_id}.prof") if PROFILE_DIR else None
+    tracer = Tracer(job_id, profile=profile)
+
+    try:
+        # Update job status
+        report({'status': 'processing', 'progress': 0})
+
+        with tracing(tracer):
+            fields = transcribe_job(job_id, payload, report)
+
+    except Exception as e:
+        # Update job status with error
+        fields = {'status': 'failed', 'error': str(e)}
+
+    # Keep the full trace next to the result for later inspection
+    tracer.close()
+    fields['trace_file'] = os.path.join(payload['result_folder'], f"{job_id}.trace.json")
+    tracer.save(fields['trace_file'])
+    fields['trace'] = tracer.summary()
+
+    report(fields)
+
+def process_live_session(session_id, payload, chunks, report):
+    """Transcribe a live stream forwarded by the web process, reporting each partial and final segment"""
+    for event in transcribe_live(SharedModel(payload['model']), chunks, input_format=payload['format'],
+                                 language=payload['language']):
+        report(event)
+
+def transcribe_job(job_id, payload, report):
+    """Transcribe one uploaded file and return the fields of the finished job record"""
+    file_path = payload['file_path']
+    model_size = payload['model']
+    language = payload['language']
+
+    # Forward progress events to the job record as whole percentages
+    progress_callback = PercentProgress(lambda stage, percent: report({'stage': stage, 'progress': percent}))
+
+    # Reuse the stored result if the same audio was uploaded before
+    cache_key = result_cache.make_key(file_path, model_size, decode_options(language))
+    result = result_cache.get(cache_key)
+    report({'cache_hit': result is not None})
+
+    # Transcribe the audio
+    if result is None:
+        result = transcribe_audio_for_web(file_path, model_size, language, progress_callback)
+        result_cache.put(cache_key, result)
+
+    # Save the transcription
+    output_file = os.path.join(payload['result_folder'], f"{job_id}.txt")
+    save_transcription(result, output_file)
+
+    # Keep the full result, so /download can export subtitles and other formats later
+    artifact_file = os.path.join(payload['result_folder'], f"{job_id}{ARTIFACT_SUFFIX}")
+    with span(WRITE):
+        save_artifact(result, artifact_file)
+
+    # Update job status
+    fields = {'status': 'completed', 'result_file': output_file, 'artifact_file': artifact_file}
+
+    # Add language info if auto-detection was used
+    if language == "auto" and "language" in result:
+        detected_code = result["language"]
+        detected_name = get_language_name(detected_code)
+        fields['detected_language'] = {
+            'code': detected_code,
+            'name': detected_name
+        }
+
+    return fields
+
+def transcribe_audio_for_web(file_path, model_size="base", language=None, progress_callback=None):
+    """Modified version of transcribe_audio for web use with progress callbacks"""
+    # Check if file exists
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Audio file not found: {file_path}")
+
+    # Prepare transcription options
+    transcribe_options = {}
+
+    # Handle language option
+    if language and language != "auto":
+        transcribe_options["language"] = language
+
+    # Decode once; the waveform is ready before a model becomes free
+    audio = load_audio(file_path, progress=progress_callback)
+
+    # Borrow the worker's Whisper model (loaded once per worker process)
+    report_progress(progress_callback, LOADING_MODEL, 0, 1)
+
+    with registry.use(model_size) as model:
+        report_progress(progress_callback, LOADING_MODEL, 1, 1)
+
+        # Transcribe the audio, reporting the seconds decoded by whisper
+        with track_transcription(progress_callback), span(TRANSCRIBE, audio_seconds=audio_duration(audio)):
+            result = model.transcribe(audio, **transcribe_options)
+
+    duration = audio_duration(audio)
+    report_progress(progress_callback, TRANSCRIBING, duration, duration)
+
+    return result